@@ -1,4 +1,5 @@
+import os
 import sys
 sys.path.append('../')
-
-
+# The shared test helpers in support.py, wherever the tests are run from.
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
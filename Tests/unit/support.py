@@ -0,0 +1,31 @@
+"""
+Helpers shared by the unit tests.
+"""
+
+from unittest import mock
+from cisco_device import CommandResult
+import fast_parsers
+import os
+
+# The captured outputs of NER0502X01, replayed by CiscoDevice(mode='replay').
+SNAPSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_data')
+
+# netmiko's genie parsing needs both of these.
+try:
+    from genie.conf.base import Device
+    from genie.libs.parser.utils import get_parser
+    HAS_GENIE = True
+except ImportError:
+    HAS_GENIE = False
+
+
+def use_fast_parsers(test_case):
+    """
+    Makes the 'genie' parser of CommandResult use the fast parsers until the
+    end of the test, so the checks run in milliseconds and without genie
+    installed. Tests of the genie path itself leave it alone and are skipped
+    unless HAS_GENIE.
+    """
+    patcher = mock.patch.dict(CommandResult.PARSERS, {'genie': lambda output, platform, command: fast_parsers.parse(command, output)})
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
@@ -0,0 +1,89 @@
+import unittest
+import asyncio
+from unittest import mock
+from async_cisco_device import AsyncCiscoDevice, run_fleet_async
+import importlib.util
+
+
+class FakeShell():
+    """
+    Stands in for an interactive IOS shell: every line written to stdin is
+    echoed back followed by its output and the prompt.
+    """
+
+    def __init__(self, outputs, prompt='NER0502X01#'):
+        self.outputs = outputs
+        self.prompt = prompt
+        self.written = []
+        self.queue = asyncio.Queue()
+        self.queue.put_nowait(f'\r\n{prompt}')
+        self.stdin = mock.Mock(write=self.write)
+        self.stdout = mock.Mock(read=self.read, at_eof=lambda: False)
+
+    def write(self, data):
+        command = data.strip()
+        self.written.append(command)
+        output = self.outputs.get(command, '')
+        self.queue.put_nowait(f'{command}\r\n{output}\r\n{self.prompt}')
+
+    async def read(self, size):
+        return await self.queue.get()
+
+
+@unittest.skipUnless(importlib.util.find_spec('asyncssh'), 'asyncssh is not installed')
+class TestAsyncCiscoDevice(unittest.TestCase):
+
+    OUTPUTS = {'show clock': '*10:00:00.000 CET Mon Mar 6 2023',
+               'show vlan': 'VLAN Name                             Status    Ports\n1    default                          active'}
+
+    def setUp(self):
+        self.shell = None
+
+        async def connect(*args, **kwargs):
+            self.shell = FakeShell(self.OUTPUTS)
+            connection = mock.Mock(wait_closed=mock.AsyncMock())
+            connection.create_process = mock.AsyncMock(return_value=self.shell)
+            return connection
+
+        patcher = mock.patch('asyncssh.connect', side_effect=connect)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_execute_command_strips_echo_and_prompt(self):
+        async def run():
+            async with AsyncCiscoDevice('NER0502X01') as device:
+                return await device.get_vlans()
+        self.assertEqual(asyncio.run(run()), self.OUTPUTS['show vlan'])
+
+    def test_concurrent_calls_share_one_fetch(self):
+        async def run():
+            async with AsyncCiscoDevice('NER0502X01') as device:
+                await asyncio.gather(device.get_clock(), device.get_clock(), device.get_vlans())
+                return await device.find_prompt()
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(self.shell.written.count('show clock'), 1)
+        self.assertEqual(self.shell.written[:2], ['terminal length 0', 'terminal width 511'])
+
+    def test_run_fleet_async(self):
+        async def task(device):
+            return await device.get_clock()
+        results = asyncio.run(run_fleet_async([f'NER{i:04}X01' for i in range(50)], task, concurrency=10))
+        self.assertEqual(len(results), 50)
+        self.assertTrue(all(result.result == self.OUTPUTS['show clock'] for result in results))
+        self.assertEqual(self.connect.call_count, 50)
+        self.assertIsNone(self.connect.call_args.kwargs['known_hosts'])
+
+    def test_run_fleet_async_times_out_a_hanging_login(self):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        async def task(device):
+            return await device.get_clock()
+        self.connect.side_effect = hang
+        results = asyncio.run(run_fleet_async(['NER0502X01'], task, timeout=0.1))
+        self.assertIsInstance(results[0].error, TimeoutError)
+        self.assertLess(results[0].elapsed, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
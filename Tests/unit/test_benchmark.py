@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+import benchmark
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+
+def broken_parser():
+    raise ValueError('State Error raised. Rule Line: 15. Input Line: Switch/Stack Mac Address : 00a7.42f5.1e80 - Local Mac Address')
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+        cases = {'parse[textfsm] show platform': broken_parser,
+                 'parse[fast] show version': lambda: None}
+        patcher = mock.patch.object(benchmark, 'parser_cases', return_value=cases)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def main(self, *argv):
+        with redirect_stdout(io.StringIO()) as output:
+            # A tolerance of 100%, timing noise is no regression here.
+            status = benchmark.main(['-n', '5', '-t', '1', '-f', 'parse[', '-b', self.baseline] + list(argv))
+        return status, output.getvalue()
+
+    def test_a_failing_parser_does_not_stop_the_run(self):
+        status, output = self.main('--update-baseline')
+        self.assertEqual(status, 0)
+        self.assertRegex(output, r'parse\[textfsm\] show platform +ERROR')
+        with open(self.baseline) as f:
+            self.assertEqual(list(json.load(f)), ['parse[fast] show version'])
+
+        status, output = self.main()
+        self.assertEqual(status, 0)
+        self.assertIn('parse[fast] show version', output)
+
+    def test_a_missing_baseline_is_an_error(self):
+        status, output = self.main()
+        self.assertEqual(status, 2)
+        self.assertIn('--update-baseline', output)
+        self.assertFalse(os.path.exists(self.baseline))
+
+    def test_a_case_that_used_to_work_is_a_regression(self):
+        with open(self.baseline, 'w') as f:
+            json.dump({'parse[textfsm] show platform': {'ops_per_sec': 1000.0}}, f)
+        status, output = self.main()
+        self.assertEqual(status, 1)
+        self.assertIn('REGRESSION: parse[textfsm] show platform raised', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+from check_runner import CheckRunner, DEFAULT_CHECKS
+from cisco_device import CiscoDevice, DeviceSnapshot
+from device_integration_tests import Access_Sw_Tests
+from support import SNAPSHOTS, HAS_GENIE, use_fast_parsers
+import threading
+import time
+
+CHECKS = [('check_os_version', {}),
+          ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/1'}),
+          ('check_interface_descriptions', {'standard': {'GigabitEthernet1/0/1': 'VCE1_LAN3'}}),
+          ('check_aaa_configuration', {})]
+
+
+class SlowTests(Access_Sw_Tests):
+    """
+    Checks finishing in reverse order, on several threads.
+    """
+
+    threads = set()
+
+    def check_one(self):
+        time.sleep(0.05)
+        self.threads.add(threading.get_ident())
+        return {'test_name': 'one'}
+
+    def check_two(self):
+        self.threads.add(threading.get_ident())
+        return {'test_name': 'two'}
+
+
+class TestCheckRunner(unittest.TestCase):
+
+    def setUp(self):
+        use_fast_parsers(self)
+        self.device_factory = lambda hostname: CiscoDevice(hostname, mode='replay', snapshot_dir=SNAPSHOTS)
+
+    def test_results_follow_check_order(self):
+        runner = CheckRunner(checks=[('check_one', {}), ('check_two', {})], device_factory=self.device_factory, test_class=SlowTests)
+        results = runner.run_checks(SlowTests(self.device_factory('NER0502X01')))
+        self.assertEqual([result['test_name'] for result in results], ['one', 'two'])
+        self.assertEqual(len(SlowTests.threads), 2)
+
+    def test_run_across_devices(self):
+        runner = CheckRunner(checks=CHECKS, device_factory=self.device_factory)
+        fleet_results = runner.run(['NER0502X01', 'NER0000X01'])
+        self.assertEqual([fleet_result.hostname for fleet_result in fleet_results], ['NER0502X01', 'NER0000X01'])
+        self.assertEqual([result['test_name'] for result in fleet_results[0].result],
+                         ['Platform OS Test',
+                          'Device Interface GigabitEthernet1/0/1 Status Test.',
+                          'GigabitEthernet1/0/1 description test',
+                          *[f'GigabitEthernet1/0/{port} description test' for port in range(2, 49)],
+                          'Device AAA Configuration Test'])
+        self.assertIsInstance(fleet_results[1].error, FileNotFoundError)
+
+    def test_unprivileged_session_is_not_checked(self):
+        test = mock.Mock(CHECK_COMMANDS={})
+        test.collect.return_value = DeviceSnapshot('NER0502X01', {}, privileged=False)
+        with self.assertRaises(PermissionError):
+            CheckRunner(checks=[('check_os_version', {})], require_privileged=True).run_checks(test)
+        test.check_os_version.assert_not_called()
+
+    def test_test_number_is_counted_once_per_check(self):
+        test = Access_Sw_Tests(self.device_factory('NER0502X01'))
+        before = Access_Sw_Tests.TEST_NUMBER
+        CheckRunner(checks=[('check_os_version', {})] * 50, max_workers=16).run_checks(test)
+        self.assertEqual(Access_Sw_Tests.TEST_NUMBER, before + 50)
+
+
+@unittest.skipUnless(HAS_GENIE, 'genie is not installed')
+class TestCheckRunnerGenie(unittest.TestCase):
+
+    def test_concurrent_checks_match_sequential_ones(self):
+        # genie parses on several threads at once here, as in production.
+        device_factory = lambda hostname: CiscoDevice(hostname, mode='replay', snapshot_dir=SNAPSHOTS)
+        results = CheckRunner(max_workers=16).run_checks(Access_Sw_Tests(device_factory('NER0502X01')))
+        test = Access_Sw_Tests(device_factory('NER0502X01'))
+        expected = []
+        for name, kwargs in DEFAULT_CHECKS:
+            result = getattr(test, name)(**kwargs)
+            expected.extend(result if isinstance(result, list) else [result])
+        self.assertEqual(results, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,64 +1,338 @@
 import unittest
+from unittest import mock
 from cisco_device import CiscoDevice
-import json
+from support import SNAPSHOTS, HAS_GENIE
+import os
 import sys
+import tempfile
+
+MOCK_DATA = os.path.join(SNAPSHOTS, 'NER0502X01')
+
 
 class TestCiscoDevice(unittest.TestCase):
     
     def setUp(self):
-        self.device = CiscoDevice('NER0502X01')
+        self.device = CiscoDevice('NER0502X01', mode='replay', snapshot_dir=SNAPSHOTS)
     
     def test_get_show_version(self):
-        #output = self.device.get_show_version()
-        with open('tests/mock_data/cisco_device_get_show_version.json', 'r') as f:
-            output = json.load(f)
-        self.assertIsInstance(output, dict)
-        #self.assertListEqual(list(output.keys()), output)
-        
-    def test_get_chassis_info(self):
-        #output = self.device.get_chassis_info()
-        with open('tests/mock_data/cisco_get_chassis_info.txt', 'r') as f:
-            output = f.readline()
+        output = self.device.get_show_version()
         self.assertIsInstance(output, str)
+        self.assertIn('Cisco IOS XE Software, Version 17.03.05', output)
+
+    def test_find_prompt(self):
+        self.assertTrue(self.device.find_prompt())
+
+    def test_missing_snapshot(self):
+        with self.assertRaises(FileNotFoundError):
+            self.device.get_clock()
+
+
+@unittest.skipUnless(HAS_GENIE, 'genie is not installed')
+class TestCiscoDeviceGenie(unittest.TestCase):
+    """
+    The getters on their default parser, genie, against the replayed outputs.
+    """
+
+    def setUp(self):
+        self.device = CiscoDevice('NER0502X01', mode='replay', snapshot_dir=SNAPSHOTS)
+
+    def test_get_chassis_info(self):
+        output = self.device.get_chassis_info()
+        self.assertEqual(output, 'C9300-48U')
 
     def test_get_image_id_info(self):
-        #output = self.device.get_image_id_info()
-        with open('tests/mock_data/cisco_get_image_id_info.txt', 'r') as f:
-            output = f.readline()
-        self.assertIsInstance(output, str)
+        output = self.device.get_image_id_info()
+        self.assertEqual(output, 'CAT9K_IOSXE')
         
     def test_get_platform_info(self):
-        #output = self.device.get_platform_info()
-        with open('tests/mock_data/cisco_get_platform_info.txt', 'r') as f:
-            output = f.readline()
-        self.assertIsInstance(output, str)
+        output = self.device.get_platform_info()
+        self.assertEqual(output, 'Catalyst L3 Switch')
         
     def test_get_number_of_sw_stack_info(self):
         output = self.device.get_number_of_sw_stack_info()
         self.assertIsInstance(output, int)
-        self.assertGreater(output, 0)
+        self.assertEqual(output, 3)
         
     def test_get_modes_of_sw_stack_info(self):
-        output = self.device.get_modes_of_sw_stack_info('genie')
-        self.assertIsInstance(output, dict)
-        self.assertGreater(len(output), 0)
+        output = self.device.get_modes_of_sw_stack_info()
+        self.assertEqual(output, {'1': 'INSTALL', '2': 'INSTALL', '3': 'INSTALL'})
         
     def test_get_os_version_info(self):
         output = self.device.get_os_version_info()
-        self.assertIsInstance(output, str)
+        self.assertEqual(output, '17.3.5')
+
+    def test_get_facts(self):
+        facts = self.device.get_facts()
+        self.assertEqual(facts.uptime, '1 year, 6 weeks, 2 days, 3 hours, 41 minutes')
+        self.assertEqual(facts, self.device.get_facts('fast'))
         
     def test_get_interface_description(self):
         output = self.device.get_interface_description('genie')
         self.assertIsInstance(output, dict)
+        self.assertEqual(output['interfaces']['GigabitEthernet1/0/1']['description'], 'VCE1_LAN3')
+
+    def test_get_interface_description_individual(self):
+        output = self.device.get_interface_description_individual(interface='GigabitEthernet1/0/10')
+        self.assertEqual(output, 'DEMARC_WANA')
+        with self.assertRaises(ValueError):
+            self.device.get_interface_description_individual(interface='GigabitEthernet9/0/1')
         
     def test_get_ip_interface_brief(self):
         output = self.device.get_ip_interface_brief('genie')
         self.assertIsInstance(output, dict)
-        
+        self.assertEqual(output['interface']['GigabitEthernet1/0/1']['status'], 'up')
+
     def test_get_interface_status(self):
         output = self.device.get_interface_status('genie')
         self.assertIsInstance(output, dict)
-
+        self.assertEqual(output['interfaces']['GigabitEthernet1/0/1'], {'name': 'VCE1_LAN3',
+                                                                        'status': 'connected',
+                                                                        'vlan': 'trunk',
+                                                                        'duplex_code': 'a-full',
+                                                                        'port_speed': 'a-1000',
+                                                                        'type': '10/100/1000BaseTX'})
+        self.assertEqual(output['interfaces']['GigabitEthernet1/0/2']['status'], 'disabled')
         
+    def test_get_cdp_neighbor(self):
+        output = self.device.get_cdp_neighbor('genie')
+        self.assertEqual(output['cdp']['index'][1]['local_interface'], 'GigabitEthernet1/0/9')
+
+
+class TestCiscoDeviceFastParsers(unittest.TestCase):
+    """
+    The getters with parser='fast', which needs no genie.
+    """
+
+    def setUp(self):
+        self.device = CiscoDevice('NER0502X01', mode='replay', snapshot_dir=SNAPSHOTS)
+
+    def test_show_version_getters(self):
+        self.assertEqual(self.device.get_chassis_info('fast'), 'C9300-48U')
+        self.assertEqual(self.device.get_image_id_info('fast'), 'CAT9K_IOSXE')
+        self.assertEqual(self.device.get_platform_info('fast'), 'Catalyst L3 Switch')
+        self.assertEqual(self.device.get_number_of_sw_stack_info('fast'), 3)
+        self.assertEqual(self.device.get_modes_of_sw_stack_info('fast'), {'1': 'INSTALL', '2': 'INSTALL', '3': 'INSTALL'})
+        self.assertEqual(self.device.get_os_version_info('fast'), '17.3.5')
+        self.assertEqual(self.device.get_facts('fast').uptime, '1 year, 6 weeks, 2 days, 3 hours, 41 minutes')
+
+    def test_interface_getters(self):
+        self.assertEqual(self.device.get_interface_description_individual('fast', interface='GigabitEthernet1/0/10'), 'DEMARC_WANA')
+        with self.assertRaises(ValueError):
+            self.device.get_interface_description_individual('fast', interface='GigabitEthernet9/0/1')
+        self.assertEqual(self.device.get_ip_interface_brief('fast')['interface']['GigabitEthernet1/0/1']['status'], 'up')
+        self.assertEqual(self.device.get_cdp_neighbor('fast')['cdp']['index'][1]['local_interface'], 'GigabitEthernet1/0/9')
+
+
+class TestCiscoDeviceRecord(unittest.TestCase):
+
+    def test_outputs_are_recorded_and_replayed(self):
+        net_connect = FakeConnection({'show clock': '*10:00:00.000 CET Mon Mar 6 2023',
+                                      'show power inline Gi1/0/1': 'Gi1/0/1 auto on 15.4'})
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            with mock.patch.object(CiscoDevice, '_open_connection', return_value=net_connect):
+                with CiscoDevice('NER0502X01', mode='record', snapshot_dir=snapshot_dir) as device:
+                    device.get_clock()
+                    device.get_power_inline_interface(interface='Gi1/0/1')
+                    device.find_prompt()
+
+            with mock.patch.object(CiscoDevice, '_open_connection') as open_connection:
+                device = CiscoDevice('NER0502X01', mode='replay', snapshot_dir=snapshot_dir)
+                self.assertEqual(device.get_clock(), '*10:00:00.000 CET Mon Mar 6 2023')
+                self.assertEqual(device.get_power_inline_interface(interface='Gi1/0/1'), 'Gi1/0/1 auto on 15.4')
+                self.assertTrue(device.find_prompt())
+                open_connection.assert_not_called()
+
+    def test_snapshot_dir_is_required(self):
+        with self.assertRaises(ValueError):
+            CiscoDevice('NER0502X01', mode='replay')
+        with self.assertRaises(ValueError):
+            CiscoDevice('NER0502X01', mode='offline', snapshot_dir='snapshots')
+
+
+class TestCiscoDeviceSession(unittest.TestCase):
+
+    def setUp(self):
+        self.device = CiscoDevice('NER0502X01')
+        patcher = mock.patch.object(CiscoDevice, '_open_connection')
+        self.open_connection = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.net_connect = self.open_connection.return_value
+        self.net_connect.is_alive.return_value = True
+        self.net_connect.send_command.return_value = 'output'
+
+    def test_commands_share_one_session(self):
+        self.device.get_clock()
+        self.device.get_vlans()
+        self.device.find_prompt()
+        self.assertEqual(self.open_connection.call_count, 1)
+        self.assertEqual(self.net_connect.send_command.call_count, 2)
+
+    def test_context_manager_closes_session(self):
+        with self.device as device:
+            device.get_clock()
+        self.net_connect.disconnect.assert_called_once()
+        self.assertIsNone(self.device.net_connect)
+
+    def test_reconnects_when_session_is_dead(self):
+        self.device.connect()
+        self.net_connect.is_alive.return_value = False
+        self.device.get_clock()
+        self.assertEqual(self.open_connection.call_count, 2)
+
+    def test_retries_once_when_session_drops_mid_command(self):
+        self.net_connect.send_command.side_effect = [OSError('Socket is closed'), 'output']
+        self.assertEqual(self.device.get_clock(), 'output')
+        self.assertEqual(self.open_connection.call_count, 2)
+
+
+class TestCiscoDeviceCache(unittest.TestCase):
+
+    SHOW_VERSION = {'version': {'version': '17.3.5',
+                                'platform': 'Catalyst L3 Switch',
+                                'image_id': 'CAT9K_IOSXE',
+                                'chassis': 'C9300-48U',
+                                'switch_num': {'1': {'mode': 'INSTALL'},
+                                               '2': {'mode': 'INSTALL'},
+                                               '3': {'mode': 'INSTALL'}}}}
+
+    def setUp(self):
+        self.device = CiscoDevice('NER0502X01')
+        patcher = mock.patch.object(CiscoDevice, '_send_command', return_value='Cisco IOS XE Software, Version 17.03.05')
+        self.send_command = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('cisco_device.get_structured_data_genie', return_value=self.SHOW_VERSION)
+        self.genie = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_show_version_is_sent_once(self):
+        self.device.get_chassis_info()
+        self.device.get_image_id_info()
+        self.device.get_platform_info()
+        self.device.get_number_of_sw_stack_info()
+        self.device.get_modes_of_sw_stack_info()
+        self.device.get_os_version_info()
+        self.assertEqual(self.send_command.call_count, 1)
+
+    def test_invalidate_cache(self):
+        self.device.get_os_version_info()
+        self.device.invalidate_cache('show version')
+        self.device.get_os_version_info()
+        self.assertEqual(self.send_command.call_count, 2)
+
+    def test_expired_entries_are_refetched(self):
+        device = CiscoDevice('NER0502X01', cache_ttl=0)
+        device.get_os_version_info()
+        device.get_os_version_info()
+        self.assertEqual(self.send_command.call_count, 2)
+
+    def test_show_version_is_parsed_once(self):
+        self.device.get_os_version_info()
+        self.device.get_platform_info()
+        self.assertEqual(self.genie.call_count, 1)
+
+    def test_parsers_share_one_fetch(self):
+        with mock.patch('cisco_device.get_structured_data', return_value=[{'status': 'OK'}]):
+            self.device.get_ps_info('genie')
+            self.device.get_ps_info('textfsm')
+            result = self.device.capture_command('show environment power all')
+        self.assertEqual(self.send_command.call_count, 1)
+        self.assertEqual(result.textfsm, [{'status': 'OK'}])
+        self.assertEqual(result.raw, 'Cisco IOS XE Software, Version 17.03.05')
+
+    def test_fast_parser(self):
+        with open(os.path.join(MOCK_DATA, 'show_version.txt'), 'r') as f:
+            self.send_command.return_value = f.read()
+        self.assertEqual(self.device.get_number_of_sw_stack_info('fast'), 3)
+        self.assertEqual(self.device.get_os_version_info('fast'), '17.3.5')
+        self.genie.assert_not_called()
+
+    def test_get_facts(self):
+        facts = self.device.get_facts()
+        self.assertEqual(facts.os_version, '17.3.5')
+        self.assertEqual(facts.chassis, 'C9300-48U')
+        self.assertEqual(facts.number_of_stack_members, 3)
+        self.assertEqual(facts.stack_modes['2'], 'INSTALL')
+
+
+class FakeConnection():
+    """
+    Stands in for a netmiko session: every written command is queued and
+    read back as "<echo>\n<output>\n<prompt>".
+    """
+
+    RETURN = '\n'
+
+    def __init__(self, outputs, prompt='NER0502X01#'):
+        self.outputs = outputs
+        self.prompt = prompt
+        self.written = []
+        self._queue = []
+
+    def is_alive(self):
+        return True
+
+    def find_prompt(self):
+        return self.prompt
+
+    def write_channel(self, data):
+        command = data.strip()
+        self.written.append(command)
+        self._queue.append(f'{command}\n{self.outputs[command]}\n{self.prompt}')
+
+    def send_command(self, command, **kwargs):
+        self.written.append(command)
+        return self.outputs[command]
+
+    def read_until_pattern(self, pattern, read_timeout=10.0):
+        return self._queue.pop(0)
+
+    def normalize_linefeeds(self, output):
+        return output
+
+    def strip_command(self, command, output):
+        return output.split('\n', 1)[1]
+
+    def strip_prompt(self, output):
+        return output.rsplit('\n', 1)[0]
+
+    def disconnect(self):
+        pass
+
+
+class TestCiscoDeviceExecuteCommands(unittest.TestCase):
+
+    OUTPUTS = {'show clock': '*10:00:00.000 CET Mon Mar 6 2023',
+               'show vlan': 'VLAN Name Status Ports',
+               'show switch': 'Switch/Stack Mac Address : 6c71.0dc2.1c80'}
+
+    def setUp(self):
+        self.device = CiscoDevice('NER0502X01')
+        self.net_connect = FakeConnection(self.OUTPUTS)
+        patcher = mock.patch.object(CiscoDevice, '_open_connection', return_value=self.net_connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_outputs_are_keyed_by_command(self):
+        output = self.device.execute_commands(list(self.OUTPUTS))
+        self.assertEqual(output, self.OUTPUTS)
+        self.assertEqual(list(output), list(self.OUTPUTS))
+
+    def test_commands_are_pipelined_in_windows(self):
+        commands = [f'show clock {i}' for i in range(10)]
+        self.net_connect.outputs = {command: command.upper() for command in commands}
+        output = self.device.execute_commands(commands)
+        self.assertEqual(output[commands[9]], 'SHOW CLOCK 9')
+        self.assertEqual(self.net_connect.written, commands)
+
+    def test_cached_commands_are_not_sent(self):
+        self.device.execute_commands(['show clock', 'show vlan'])
+        self.device.execute_commands(['show clock', 'show vlan', 'show switch'])
+        self.assertEqual(self.net_connect.written, ['show clock', 'show vlan', 'show switch'])
+
+    def test_invalid_parser(self):
+        with self.assertRaises(ValueError):
+            self.device.execute_commands(['show clock'], parser='xml')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest import mock
+from check_runner import CheckRunner
+from cisco_device import CiscoDevice
+from compliance_cache import ComplianceCache, NORMALIZERS
+from device_integration_tests import Access_Sw_Tests
+from rules import RuleSet
+from support import SNAPSHOTS, use_fast_parsers
+import os
+import shutil
+import tempfile
+
+CHECKS = [('check_os_version', {}),
+          ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/1'}),
+          ('check_cdp_neighbor_number', {})]
+
+
+class TestComplianceCache(unittest.TestCase):
+
+    def setUp(self):
+        use_fast_parsers(self)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # A copy of the captured outputs, so the test can change them.
+        self.snapshots = os.path.join(directory, 'snapshots')
+        shutil.copytree(SNAPSHOTS, self.snapshots)
+        self.cache = ComplianceCache(os.path.join(directory, 'cache'))
+        self.runner = CheckRunner(checks=CHECKS, cache=self.cache)
+
+    def run_checks(self):
+        test = Access_Sw_Tests(CiscoDevice('NER0502X01', mode='replay', snapshot_dir=self.snapshots))
+        with mock.patch.object(Access_Sw_Tests, 'check_os_version', autospec=True, side_effect=Access_Sw_Tests.check_os_version) as check:
+            results = self.runner.run_checks(test)
+        return results, check.call_count
+
+    def edit(self, command, old, new):
+        path = os.path.join(self.snapshots, 'NER0502X01', command.replace(' ', '_') + '.txt')
+        with open(path) as f:
+            output = f.read()
+        with open(path, 'w') as f:
+            f.write(output.replace(old, new))
+
+    def test_unchanged_inputs_are_not_evaluated_again(self):
+        first, calls = self.run_checks()
+        self.assertEqual(calls, 1)
+        self.edit('show version', '3 hours, 41 minutes', '4 hours, 2 minutes')
+        second, calls = self.run_checks()
+        self.assertEqual(calls, 0)
+        self.assertEqual(first, second)
+
+    def test_changed_input_is_evaluated_again(self):
+        self.run_checks()
+        self.edit('show version', 'Version 17.3.5,', 'Version 17.6.4,')
+        results, calls = self.run_checks()
+        self.assertEqual(calls, 1)
+        self.assertEqual(results[0]['test_status'], 'FAILED')
+
+    def test_changed_only(self):
+        self.run_checks()
+        self.edit('show ip interface brief', 'YES unset  up                    up', 'YES unset  down                  down')
+        self.runner.changed_only = True
+        results, _ = self.run_checks()
+        self.assertEqual([result['test_name'] for result in results], ['Device Interface GigabitEthernet1/0/1 Status Test.'])
+
+    def test_standards_change_invalidates_everything(self):
+        self.run_checks()
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write('SW_9300_OS_VERSION = "17.6.4"\n')
+        self.addCleanup(os.remove, f.name)
+        self.runner.cache = ComplianceCache(self.cache.directory, sources=[f.name])
+        _, calls = self.run_checks()
+        self.assertEqual(calls, 1)
+
+    def rule_set(self, expected='up'):
+        # A new RuleSet each time, as every run of the service builds its own.
+        return RuleSet([{'name': 'Uplink Status', 'command': 'show ip interface brief',
+                         'path': 'interface.GigabitEthernet1/0/1.status', 'expected': expected}])
+
+    def run_rules(self, rule_set):
+        self.runner.checks = [('check_rules', {'rules': rule_set})]
+        test = Access_Sw_Tests(CiscoDevice('NER0502X01', mode='replay', snapshot_dir=self.snapshots))
+        with mock.patch.object(Access_Sw_Tests, 'check_rules', autospec=True, side_effect=Access_Sw_Tests.check_rules) as check:
+            results = self.runner.run_checks(test)
+        return results, check.call_count
+
+    def test_rule_sets_are_cached_by_their_rules(self):
+        self.assertEqual(ComplianceCache.check_id('check_rules', {'rules': self.rule_set()}),
+                         ComplianceCache.check_id('check_rules', {'rules': self.rule_set()}))
+        self.assertEqual(self.run_rules(self.rule_set())[1], 1)
+        # Only the command the rules read is part of the digest.
+        self.edit('show version', 'Version 17.3.5,', 'Version 17.6.4,')
+        self.assertEqual(self.run_rules(self.rule_set())[1], 0)
+        self.edit('show ip interface brief', 'YES unset  up                    up', 'YES unset  down                  down')
+        results, calls = self.run_rules(self.rule_set())
+        self.assertEqual(calls, 1)
+        self.assertEqual(results[0]['test_status'], 'FAILED')
+        self.assertEqual(self.run_rules(self.rule_set(expected='down'))[1], 1)
+
+    def test_parser_upgrade_invalidates_everything(self):
+        self.run_checks()
+        with mock.patch('compliance_cache._package_version', return_value='99.9'):
+            self.runner.cache = ComplianceCache(self.cache.directory)
+        _, calls = self.run_checks()
+        self.assertEqual(calls, 1)
+
+    def test_cdp_hold_times_are_ignored(self):
+        with open(os.path.join(SNAPSHOTS, 'NER0502X01', 'show_cdp_neighbor.txt')) as f:
+            output = f.read()
+        normalize = NORMALIZERS['show cdp neighbor']
+        self.assertEqual(normalize(output), normalize(output.replace('157', '121').replace('128', '95 ')))
+        self.assertNotEqual(normalize(output), normalize(output.replace('C1111-8PL', 'C819HG-4G')))
+
+
+if __name__ == '__main__':
+    unittest.main()
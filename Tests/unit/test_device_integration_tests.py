@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+from cisco_device import CiscoDevice
+from device_integration_tests import Access_Sw_Tests
+from rules import RuleSet
+from support import SNAPSHOTS, HAS_GENIE, use_fast_parsers
+
+
+class TestAccessSwTests(unittest.TestCase):
+
+    def setUp(self):
+        use_fast_parsers(self)
+        self.device = CiscoDevice('NER0502X01', mode='replay', snapshot_dir=SNAPSHOTS)
+        self.test = Access_Sw_Tests(self.device)
+
+    def test_commands_are_collected_once(self):
+        with mock.patch.object(CiscoDevice, '_send_command', wraps=self.device._send_command) as send_command:
+            for interface in ('GigabitEthernet1/0/1', 'GigabitEthernet1/0/3', 'GigabitEthernet2/0/1'):
+                self.test.check_device_interface_status(interface=interface)
+                self.test.check_interface_description(interface=interface)
+            self.test.check_os_version()
+            self.test.check_modes_of_sw_stack()
+        commands = [call.args[0] for call in send_command.call_args_list]
+        self.assertEqual(sorted(commands), sorted(Access_Sw_Tests.REQUIRED_COMMANDS))
+
+    def test_checks_read_the_snapshot(self):
+        self.assertEqual(self.test.check_os_version()['test_status'], 'PASSED')
+        self.assertEqual(self.test.check_number_of_sw_per_stack()['response'], 3)
+        self.assertEqual(self.test.check_cdp_cellular_router_interface()['test_status'], 'PASSED')
+        self.assertEqual(self.test.check_aaa_configuration()['response'], True)
+        self.assertEqual(self.test.check_interface_description(interface='GigabitEthernet1/0/1')['test_status'], 'PASSED')
+
+    def test_unknown_interface_description(self):
+        with self.assertRaises(ValueError):
+            self.test.check_interface_description(interface='GigabitEthernet9/0/1')
+
+    def test_interface_description_audit(self):
+        results = {result['test_name']: result for result in self.test.check_interface_descriptions()}
+        self.assertEqual(len(results), 144)
+        self.assertEqual(results['GigabitEthernet1/0/1 description test']['test_status'], 'PASSED')
+        self.assertEqual(results['GigabitEthernet1/0/23 description test']['response'], 'PoE Initiatives')
+
+    def test_interface_description_audit_reports_missing_and_extra(self):
+        standard = {'GigabitEthernet1/0/1': 'VCE1_LAN3', 'GigabitEthernet1/0/99': 'WAP'}
+        results = {result['test_name']: result for result in self.test.check_interface_descriptions(standard)}
+        self.assertEqual(results['GigabitEthernet1/0/99 description test']['response'], 'Interface not found on the device')
+        self.assertEqual(results['GigabitEthernet1/0/2 description test']['test_status'], 'FAILED')
+        self.assertNotIn('GigabitEthernet2/0/1 description test', results)
+        self.assertNotIn('GigabitEthernet1/1/1 description test', results)
+        self.assertEqual(len(results), 49)
+
+    def test_standard_rules(self):
+        results = self.test.check_rules()
+        self.assertEqual([result['test_name'] for result in results],
+                         ['System Image Test', 'Platform Info Test', 'Stack Member Model Test'])
+        self.assertTrue(all(result['test_status'] == 'PASSED' for result in results))
+
+    def test_rule_commands_leave_the_snapshot_alone(self):
+        # Other checks read the snapshot on other threads meanwhile.
+        snapshot = self.device.collect(['show version'])
+        test = Access_Sw_Tests(self.device, snapshot=snapshot)
+        rules = RuleSet([{'name': 'Vlan7', 'command': 'show ip interface brief', 'path': 'interface.Vlan7.status', 'expected': 'up'}])
+        self.assertEqual(test.check_rules(rules)[0]['test_status'], 'PASSED')
+        self.assertNotIn('show ip interface brief', snapshot)
+        self.assertIn('show ip interface brief', test.collect(rules.commands))
+
+    def test_given_snapshot_is_used(self):
+        snapshot = self.device.collect(['show version'])
+        test = Access_Sw_Tests(mock.Mock(hostname='NER0502X01'), snapshot=snapshot)
+        self.assertEqual(test.check_os_version()['response'], '17.3.5')
+        test.device.collect.assert_not_called()
+
+
+@unittest.skipUnless(HAS_GENIE, 'genie is not installed')
+class TestAccessSwTestsGenie(unittest.TestCase):
+    """
+    The checks on the captured outputs parsed by genie, as in production.
+    """
+
+    def test_checks(self):
+        test = Access_Sw_Tests(CiscoDevice('NER0502X01', mode='replay', snapshot_dir=SNAPSHOTS))
+        self.assertEqual(test.check_os_version()['response'], '17.3.5')
+        self.assertEqual(test.check_number_of_sw_per_stack()['response'], 3)
+        self.assertEqual(test.check_cdp_cellular_router_interface()['test_status'], 'PASSED')
+        self.assertEqual(test.check_device_interface_status(interface='GigabitEthernet1/0/1')['test_status'], 'PASSED')
+        self.assertEqual(test.check_interface_description(interface='GigabitEthernet1/0/1')['test_status'], 'PASSED')
+        self.assertEqual(test.check_platform()['test_status'], 'PASSED')
+        self.assertEqual(test.check_psu_status()['test_status'], 'PASSED')
+        self.assertTrue(all(result['test_status'] == 'PASSED' for result in test.check_rules()))
+
+
+if __name__ == '__main__':
+    unittest.main()
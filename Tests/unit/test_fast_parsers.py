@@ -0,0 +1,129 @@
+import unittest
+import ast
+import os
+import fast_parsers
+
+MOCK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_data', 'NER0502X01')
+# Genie output of "show interfaces description" captured from the same stack.
+GENIE_CAPTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test.py')
+
+try:
+    from genie.conf.base import Device
+    from genie.libs.parser.utils import get_parser
+    HAS_GENIE = True
+except ImportError:
+    HAS_GENIE = False
+
+# Where genie misreads the captured outputs and the fast parsers do not: it
+# splits the interface names that run into the IP-Address column, and takes
+# the "IP" of the IP Phone platform for a capability.
+GENIE_MISREADS = {f'show ip interface brief -> interface -> FortyGigabitEthernet{module}/1/{port}'
+                  for module in (1, 2, 3) for port in (1, 2)}
+GENIE_MISREADS |= {f'show ip interface brief -> interface -> FortyGigabitEthernet{module}/1' for module in (1, 2, 3)}
+GENIE_MISREADS |= {f'show cdp neighbor -> cdp -> index -> 5 -> {key}' for key in ('capability', 'platform', 'port_id')}
+
+
+def read_output(command):
+    with open(os.path.join(MOCK_DATA, command.replace(' ', '_') + '.txt'), 'r') as f:
+        return f.read()
+
+
+class TestFastParsers(unittest.TestCase):
+
+    def test_interfaces_description_matches_genie_capture(self):
+        with open(GENIE_CAPTURE, 'r') as f:
+            # Skip the ">>> pprint(...)" line of the interpreter session.
+            expected = ast.literal_eval(f.read().split('\n', 1)[1])
+        output = fast_parsers.parse('show interfaces description', read_output('show interfaces description'))
+        self.assertEqual(output, expected)
+
+    def test_ip_interface_brief(self):
+        output = fast_parsers.parse('show ip interface brief', read_output('show ip interface brief'))
+        self.assertEqual(output['interface']['Vlan7'], {'ip_address': '10.60.31.132',
+                                                       'interface_is_ok': 'YES',
+                                                       'method': 'NVRAM',
+                                                       'status': 'up',
+                                                       'protocol': 'up'})
+        self.assertEqual(output['interface']['GigabitEthernet1/0/2']['status'], 'administratively down')
+        self.assertEqual(len(output['interface']), 199)
+
+    def test_cdp_neighbor(self):
+        output = fast_parsers.parse('show cdp neighbor', read_output('show cdp neighbor'))
+        self.assertEqual(len(output['cdp']['index']), 5)
+        self.assertEqual(output['cdp']['index'][1], {'device_id': 'NER0502C01.nike.com',
+                                                     'local_interface': 'GigabitEthernet1/0/9',
+                                                     'hold_time': 157,
+                                                     'capability': 'R I',
+                                                     'platform': 'C1111-8PL',
+                                                     'port_id': 'GigabitEthernet0/0/1'})
+        self.assertEqual(output['cdp']['index'][5]['platform'], 'IP Phone')
+        self.assertEqual(output['cdp']['index'][5]['port_id'], 'Port 1')
+        self.assertEqual(output['cdp']['total_entries'], 5)
+
+    def test_version(self):
+        output = fast_parsers.parse('show version', read_output('show version'))['version']
+        self.assertEqual(output['version'], '17.3.5')
+        self.assertEqual(output['version_short'], '17.3')
+        self.assertEqual(output['xe_version'], '17.03.05')
+        self.assertEqual(output['platform'], 'Catalyst L3 Switch')
+        self.assertEqual(output['image_id'], 'CAT9K_IOSXE')
+        self.assertEqual(output['chassis'], 'C9300-48U')
+        self.assertEqual(output['system_image'], 'flash:packages.conf')
+        self.assertEqual(output['hostname'], 'NER0502X01')
+        self.assertEqual(output['curr_config_register'], '0x102')
+        self.assertEqual(sorted(output['switch_num']), ['1', '2', '3'])
+        self.assertEqual(output['switch_num']['1'], {'active': True,
+                                                     'ports': '65',
+                                                     'model': 'C9300-48U',
+                                                     'sw_ver': '17.03.05',
+                                                     'sw_image': 'CAT9K_IOSXE',
+                                                     'mode': 'INSTALL',
+                                                     'uptime': '1 year, 6 weeks, 2 days, 3 hours, 45 minutes',
+                                                     'mac_address': '6c:71:0d:c2:1c:80',
+                                                     'mb_assembly_num': '73-17954-06',
+                                                     'mb_sn': 'FOC23105HVR',
+                                                     'model_rev_num': 'B0',
+                                                     'mb_rev_num': 'A0',
+                                                     'model_num': 'C9300-48U',
+                                                     'system_sn': 'FOC2311X0AB',
+                                                     'clei_code_num': 'CMM1R00ARB'})
+        self.assertFalse(output['switch_num']['2']['active'])
+        self.assertEqual(output['switch_num']['2']['system_sn'], 'FOC2311X0AC')
+        self.assertEqual(output['mem_size'], {'non-volatile configuration': '2048', 'physical': '8388608'})
+        self.assertEqual(output['number_of_intfs']['Gigabit Ethernet'], '168')
+        self.assertEqual(output['license_package']['dna-essentials']['license_type'], 'Subscription Smart License')
+        self.assertEqual(output['rtr_type'], 'C9300-48U')
+
+    def test_unparsable_output_is_empty(self):
+        for command in ('show version', 'show cdp neighbor', 'show ip interface brief', 'show interfaces description'):
+            self.assertEqual(fast_parsers.parse(command, '% Invalid input detected'), {})
+
+    def test_command_spelling_is_normalized(self):
+        self.assertTrue(fast_parsers.has_parser('show  cdp neighbors'))
+        self.assertFalse(fast_parsers.has_parser('show clock'))
+
+    @unittest.skipUnless(HAS_GENIE, 'genie is not installed')
+    def test_fast_parsers_match_genie(self):
+        device = Device('NER0502X01', os='iosxe')
+        device.custom.setdefault('abstraction', {})['order'] = ['os']
+        for command in ('show ip interface brief', 'show interfaces description', 'show cdp neighbor', 'show version'):
+            output = read_output(command)
+            expected = device.parse(command, output=output)
+            self.assert_same(fast_parsers.parse(command, output), expected, command)
+
+    def assert_same(self, fast, genie, path):
+        # Both parsers must return the same keys, holding the same values,
+        # except where genie misreads the output.
+        if isinstance(fast, dict) and isinstance(genie, dict):
+            for key in fast.keys() | genie.keys():
+                if f'{path} -> {key}' in GENIE_MISREADS:
+                    continue
+                self.assertIn(key, fast, f'{path} -> {key} is missing from the fast parser')
+                self.assertIn(key, genie, f'{path} -> {key} is not returned by genie')
+                self.assert_same(fast[key], genie[key], f'{path} -> {key}')
+        else:
+            self.assertEqual(fast, genie, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+import threading
+import time
+from cisco_device import CiscoDevice
+from fleet import FleetRunner
+
+
+class FakeDevice():
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def execute_commands(self, commands, parser=None):
+        return {command: f'{self.hostname}: {command}' for command in commands}
+
+
+class TestFleetRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = FleetRunner(max_workers=4, timeout=5, device_factory=FakeDevice, poll_interval=0.05)
+
+    def test_runs_commands_on_every_host(self):
+        hostnames = [f'NER{i:04}X01' for i in range(20)]
+        results = self.runner.run_all(hostnames, commands=['show clock'])
+        self.assertEqual([result.hostname for result in results], hostnames)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(results[3].result['show clock'], 'NER0003X01: show clock')
+
+    def test_failures_are_isolated(self):
+        def task(device):
+            if device.hostname == 'NER0002X01':
+                raise ConnectionError('unreachable')
+            return device.hostname
+
+        results = self.runner.run_all(['NER0001X01', 'NER0002X01', 'NER0003X01'], task=task)
+        self.assertEqual([result.ok for result in results], [True, False, True])
+        self.assertIsInstance(results[1].error, ConnectionError)
+
+    def test_slow_hosts_time_out(self):
+        self.runner.timeout = 0.2
+        task = lambda device: time.sleep(1 if device.hostname == 'slow' else 0)
+        results = self.runner.run_all(['fast', 'slow'], task=task)
+        self.assertTrue(results[0].ok)
+        self.assertIsInstance(results[1].error, TimeoutError)
+
+    def test_hung_hosts_do_not_stall_the_queue(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        devices = []
+
+        def task(device):
+            devices.append(device)
+            if device.hostname.startswith('hung'):
+                release.wait(10)
+            return device.hostname
+
+        self.runner.max_workers = 2
+        self.runner.timeout = 0.2
+        start = time.monotonic()
+        # More hung hosts than workers, ahead of the healthy ones.
+        results = self.runner.run_all([f'hung{i}' for i in range(4)] + ['NER0001X01', 'NER0002X01'], task=task)
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertTrue(all(isinstance(result.error, TimeoutError) for result in results[:4]))
+        self.assertEqual([result.result for result in results[4:]], ['NER0001X01', 'NER0002X01'])
+        self.assertTrue(all(getattr(device, 'closed', False) for device in devices if device.hostname.startswith('hung')))
+
+    def test_a_timed_out_host_does_not_log_in_again(self):
+        closed, finished = threading.Event(), threading.Event()
+        self.addCleanup(closed.set)
+
+        def send_command(command, **kwargs):
+            # Hangs until the session is closed under it.
+            closed.wait(5)
+            raise OSError('Socket is closed')
+
+        net_connect = mock.Mock(send_command=mock.Mock(side_effect=send_command),
+                                disconnect=mock.Mock(side_effect=closed.set))
+
+        def task(device):
+            try:
+                return device.execute_command('show version', use_cache=False)
+            finally:
+                finished.set()
+
+        self.runner.device_factory = CiscoDevice
+        self.runner.timeout = 0.2
+        with mock.patch.object(CiscoDevice, '_open_connection', return_value=net_connect) as open_connection:
+            results = self.runner.run_all(['NER0502X01'], task=task)
+            self.assertTrue(finished.wait(5))
+        self.assertIsInstance(results[0].error, TimeoutError)
+        self.assertEqual(open_connection.call_count, 1)
+
+    def test_callback_receives_every_result(self):
+        seen = []
+        list(self.runner.run(['NER0001X01', 'NER0002X01'], task=lambda device: 1, callback=seen.append))
+        self.assertEqual(sorted(result.hostname for result in seen), ['NER0001X01', 'NER0002X01'])
+
+    def test_task_or_commands_required(self):
+        with self.assertRaises(ValueError):
+            list(self.runner.run(['NER0001X01']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+from cisco_device import CiscoDevice
+from instrumentation import Instrumentation
+import json
+import os
+import re
+import tempfile
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_summary(self):
+        timings = Instrumentation()
+        for seconds in (0.002, 0.004, 0.3):
+            timings.record('show version', 'transfer', seconds, 'NER0502X01')
+        timings.record_bytes('show version', 1200)
+        summary = timings.summary()
+        transfer = summary['commands']['show version']['transfer']
+        self.assertEqual(summary['hosts'], 1)
+        self.assertEqual(transfer['count'], 3)
+        self.assertAlmostEqual(transfer['p50_ms'], 4.0)
+        self.assertEqual(transfer['histogram']['<=5ms'], 2)
+        self.assertEqual(transfer['histogram']['<=500ms'], 1)
+        self.assertEqual(summary['commands']['show version']['bytes']['total'], 1200)
+        self.assertEqual(summary['phases']['transfer']['count'], 3)
+
+    def test_invalid_phase(self):
+        with self.assertRaises(ValueError):
+            Instrumentation().record('show version', 'download', 0.1)
+
+    def test_to_json(self):
+        timings = Instrumentation()
+        timings.record('show clock', 'parse', 0.001)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'timings.json')
+            timings.to_json(path)
+            with open(path) as f:
+                self.assertIn('show clock', json.load(f)['commands'])
+
+
+class TestCiscoDeviceInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.timings = Instrumentation()
+        self.device = CiscoDevice('NER0502X01', instrumentation=self.timings)
+        patcher = mock.patch.object(CiscoDevice, '_open_connection')
+        self.net_connect = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.net_connect.is_alive.return_value = True
+        self.net_connect.find_prompt.return_value = 'NER0502X01#'
+        self.net_connect.send_command.return_value = 'NER0502X01 uptime is 1 week'
+
+    def test_command_phases_are_recorded(self):
+        self.device.execute_command('show version', parser='fast')
+        phases = self.timings.summary()['commands']['show version']
+        self.assertEqual(set(phases), {'prompt', 'transfer', 'parse', 'bytes'})
+        self.assertEqual(phases['bytes']['total'], 27)
+        self.net_connect.send_command.assert_called_once_with('show version', expect_string=re.escape('NER0502X01#'))
+
+
+class TestCiscoDeviceLoginInstrumentation(unittest.TestCase):
+
+    @mock.patch('cisco_device.ConnectHandler')
+    @mock.patch('cisco_device.socket.create_connection')
+    def test_login_phases_are_recorded(self, create_connection, connect_handler):
+        timings = Instrumentation()
+        device = CiscoDevice('NER0502X01', instrumentation=timings)
+        device.cisco_device['port'] = 8022
+        self.assertIs(device.connect(), connect_handler.return_value)
+        # The timed socket is the one netmiko logs in over.
+        create_connection.assert_called_once_with(('NER0502X01', 8022), timeout=10)
+        self.assertIs(connect_handler.call_args.kwargs['sock'], create_connection.return_value)
+        phases = timings.summary()['commands'][Instrumentation.LOGIN]
+        self.assertEqual(set(phases), {'connect', 'authenticate'})
+
+    @mock.patch('cisco_device.ConnectHandler', side_effect=EOFError('Login failed'))
+    @mock.patch('cisco_device.socket.create_connection')
+    def test_socket_is_closed_when_the_login_fails(self, create_connection, connect_handler):
+        device = CiscoDevice('NER0502X01', instrumentation=Instrumentation())
+        with self.assertRaises(EOFError):
+            device.connect()
+        create_connection.return_value.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest import mock
+from fleet import FleetResult
+import main
+import json
+import os
+import tempfile
+
+
+def result(test_name):
+    return {'test_name': test_name, 'response': 'ok', 'test_status': 'PASSED',
+            'bold': False, 'italic': False, 'font_color': 'FF000000'}
+
+
+class TestRunTests(unittest.TestCase):
+
+    DEVICES = {'NER0502': ['NER0502X01'], 'NER0503': ['NER0503X01'], 'NER0504': ['NER0504X01']}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+        # The devices finish in the reverse of the input order.
+        finished = [FleetResult('NER0504X01', [result('Platform OS Test'), result('PSU Test')]),
+                    FleetResult('NER0503X01', error=EOFError('Socket is closed')),
+                    FleetResult('NER0502X01', [result('Platform OS Test'), result('PSU Test')])]
+        patcher = mock.patch.object(main, 'CheckRunner')
+        patcher.start().return_value.stream.return_value = iter(finished)
+        self.addCleanup(patcher.stop)
+
+    def run_tests(self, report):
+        args = main.parse_args(['-d', *self.DEVICES, '-r', report])
+        reports = []
+        written, failed = main.run_tests(self.DEVICES, args, 'now', on_report=reports.append)
+        self.assertEqual(failed, ['NER0503X01'])
+        return reports
+
+    def read(self, name):
+        with open(f'{name}_now_store_test_results.jsonl') as f:
+            return [(line['hostname'], line['test_name']) for line in map(json.loads, f)]
+
+    def test_aggregated_report_is_in_input_order(self):
+        self.assertEqual(self.run_tests('aggregated'), ['stores_now_store_test_results.xlsx'])
+        self.assertEqual(self.read('stores'), [('NER0502X01', 'Platform OS Test'), ('NER0502X01', 'PSU Test'),
+                                               ('NER0504X01', 'Platform OS Test'), ('NER0504X01', 'PSU Test')])
+
+    def test_store_reports_do_not_wait_for_the_other_stores(self):
+        self.assertEqual(self.run_tests('store'), ['NER0504_now_store_test_results.xlsx',
+                                                   'NER0503_now_store_test_results.xlsx',
+                                                   'NER0502_now_store_test_results.xlsx'])
+        self.assertEqual(self.read('NER0504'), [('NER0504X01', 'Platform OS Test'), ('NER0504X01', 'PSU Test')])
+
+
+if __name__ == '__main__':
+    unittest.main()
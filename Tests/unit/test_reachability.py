@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+from reachability import ReachabilitySweep, _checksum
+import asyncio
+import socket
+import time
+
+
+class TestReachabilitySweep(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(128)
+        self.addCleanup(self.server.close)
+        self.port = self.server.getsockname()[1]
+
+    def test_tcp(self):
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+        results = ReachabilitySweep(port=self.port).sweep(['127.0.0.1', 'localhost'])
+        self.assertEqual(list(results), ['127.0.0.1', 'localhost'])
+        self.assertTrue(results['127.0.0.1'].reachable)
+        self.assertEqual(results['127.0.0.1'].method, 'tcp')
+        self.assertLess(results['127.0.0.1'].rtt, 0.5)
+
+        result = ReachabilitySweep(port=closed_port, retries=3).sweep(['127.0.0.1'])['127.0.0.1']
+        self.assertFalse(result.reachable)
+        self.assertIsInstance(result.error, ConnectionRefusedError)
+        # A refused connection is an answer, it is not retried.
+        self.assertEqual(result.attempts, 1)
+
+    def test_unresolvable_host(self):
+        result = ReachabilitySweep(port=self.port).sweep(['NER0502X01.invalid'])['NER0502X01.invalid']
+        self.assertFalse(result.reachable)
+        self.assertEqual(result.attempts, 0)
+        self.assertIsInstance(result.error, OSError)
+
+    def test_retries_after_a_timeout(self):
+        sweep = ReachabilitySweep(port=self.port, timeout=0.1, retries=2)
+        with mock.patch('reachability.asyncio.open_connection', new=lambda *args: asyncio.sleep(1)):
+            result = sweep.sweep(['127.0.0.1'])['127.0.0.1']
+        self.assertFalse(result.reachable)
+        self.assertEqual(result.attempts, 3)
+        self.assertIsInstance(result.error, asyncio.TimeoutError)
+
+    def test_hosts_are_probed_concurrently_within_the_rate(self):
+        hosts = [f'127.0.0.{i}' for i in range(1, 21)]
+        start = time.monotonic()
+        with mock.patch('reachability.asyncio.open_connection', new=lambda *args: asyncio.sleep(1)):
+            ReachabilitySweep(port=self.port, timeout=0.3, retries=0).sweep(hosts)
+        self.assertLess(time.monotonic() - start, 1)
+
+        start = time.monotonic()
+        ReachabilitySweep(port=self.port, rate=50).sweep(hosts)
+        self.assertGreaterEqual(time.monotonic() - start, 19 / 50)
+
+    def test_concurrent_sweeps_keep_their_own_icmp_socket(self):
+        class FakeIcmpSocket():
+            def __init__(self, loop):
+                self.closed = False
+
+            async def echo(self, address, timeout):
+                await asyncio.sleep(0.1 if address == '127.0.0.3' else 0)
+                if self.closed:
+                    raise OSError('echo on a closed socket')
+                return 0.001
+
+            def close(self):
+                self.closed = True
+
+        sweep = ReachabilitySweep(methods=('icmp',), retries=0)
+
+        async def both():
+            return await asyncio.gather(sweep.sweep_async(['127.0.0.1']), sweep.sweep_async(['127.0.0.2', '127.0.0.3']))
+
+        with mock.patch('reachability._IcmpSocket', new=FakeIcmpSocket):
+            first, second = asyncio.run(both())
+        self.assertTrue(first['127.0.0.1'].reachable)
+        self.assertTrue(all(result.reachable for result in second.values()))
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            ReachabilitySweep(methods=('udp',))
+
+    def test_checksum(self):
+        packet = bytes.fromhex('0800000012340001') + b'abc'
+        checksum = _checksum(packet)
+        self.assertEqual(_checksum(packet[:2] + checksum.to_bytes(2, 'big') + packet[4:]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
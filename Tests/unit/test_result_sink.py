@@ -0,0 +1,125 @@
+import unittest
+from unittest import mock
+from result_sink import JsonlSink, XlsxSink, PdfSink, CsvSink, SlackSink, FanoutSink, read_jsonl, replay
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+PASSED = {'test_status': 'PASSED', 'response': '17.3.5', 'test_name': 'Platform OS Test',
+          'bold': False, 'italic': False, 'font_color': 'FF000000'}
+FAILED = {'test_status': 'FAILED', 'response': {'1': 'BUNDLE'}, 'test_name': 'Device Mode Test.',
+          'bold': False, 'italic': False, 'font_color': 'FFFF0000'}
+
+
+class TestResultSink(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.jsonl = os.path.join(self.directory, 'results.jsonl')
+
+    def test_jsonl_lines_are_on_disk_before_close(self):
+        sink = JsonlSink(self.jsonl)
+        sink.write('NER0502X01', PASSED)
+        with open(self.jsonl) as f:
+            self.assertEqual(json.loads(f.readline())['test_name'], 'Platform OS Test')
+        sink.write('NER0502X01', FAILED)
+        sink.close()
+        self.assertEqual([hostname for hostname, _ in read_jsonl(self.jsonl)], ['NER0502X01', 'NER0502X01'])
+
+    def test_read_jsonl_skips_a_truncated_line(self):
+        with JsonlSink(self.jsonl) as sink:
+            sink.write('NER0502X01', PASSED)
+        with open(self.jsonl, 'a') as f:
+            f.write('{"hostname": "NER05')
+        self.assertEqual(len(list(read_jsonl(self.jsonl))), 1)
+
+    def test_replay_to_csv(self):
+        with JsonlSink(self.jsonl) as sink:
+            sink.write('NER0502X01', PASSED)
+            sink.write('NER0502X01', FAILED)
+        path = os.path.join(self.directory, 'results.csv')
+        replay(self.jsonl, CsvSink(path))
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], CsvSink.HEADER)
+        self.assertEqual(rows[2], ['NER0502X01', 'Device Mode Test.', "{'1': 'BUNDLE'}", 'FAILED'])
+
+    def test_xlsx_is_saved_once(self):
+        xls_writer = mock.Mock()
+        with FanoutSink(XlsxSink(xls_writer), JsonlSink(self.jsonl)) as sink:
+            sink.write('NER0502X01', PASSED)
+            sink.write('NER0502X01', FAILED)
+        self.assertEqual(xls_writer.write_single_row_data.call_count, 3)
+        xls_writer.save.assert_called_once()
+
+    def test_pdf_has_a_table_per_device(self):
+        pdf_report = mock.Mock()
+        with PdfSink(pdf_report) as sink:
+            sink.write('NER0502X01', PASSED)
+            sink.write('NER0502X01', FAILED)
+            sink.write('NER0503X01', PASSED)
+        self.assertEqual([call.args[0] for call in pdf_report.add_heading.call_args_list], ['NER0502X01', 'NER0503X01'])
+        self.assertEqual(pdf_report.add_row.call_args_list[1].args, (['Device Mode Test.', {'1': 'BUNDLE'}, 'FAILED'], 'FFFF0000'))
+        pdf_report.close.assert_called_once()
+
+    @mock.patch('slack2.requests.post')
+    def test_slack_posts_failed_results_in_batches(self, post):
+        post.return_value.status_code = 200
+        with SlackSink('https://hooks.slack.com/services/T/B/X', batch_size=2) as sink:
+            for _ in range(3):
+                sink.write('NER0502X01', FAILED)
+                sink.write('NER0502X01', PASSED)
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(post.call_args_list[0].kwargs['json']['text'].count('Device Mode Test.'), 2)
+        self.assertEqual(post.call_args_list[0].kwargs['timeout'], 10)
+
+    @mock.patch('sys.stdout', new_callable=io.StringIO)
+    @mock.patch('slack2.requests.post')
+    def test_slack_keeps_a_batch_that_failed_to_post(self, post, stdout):
+        post.return_value.status_code = 500
+        sink = SlackSink('https://hooks.slack.com/services/T/B/X', batch_size=1)
+        sink.write('NER0502X01', FAILED)
+        self.assertIn('not posted', stdout.getvalue())
+        post.return_value.status_code = 200
+        sink.write('NER0503X01', FAILED)
+        text = post.call_args.kwargs['json']['text']
+        self.assertIn('NER0502X01', text)
+        self.assertIn('NER0503X01', text)
+        sink.close()
+        self.assertEqual(post.call_count, 2)
+
+    @mock.patch('sys.stdout', new_callable=io.StringIO)
+    @mock.patch('slack2.requests.post')
+    def test_slack_errors_do_not_stop_the_other_sinks(self, post, stdout):
+        ok, error = mock.Mock(status_code=200), mock.Mock(status_code=500, text='server error')
+        post.side_effect = [ok, error, ConnectionError('Slack is down'), ok, ok]
+        with FanoutSink(JsonlSink(self.jsonl), SlackSink('https://hooks.slack.com/services/T/B/X', batch_size=1)) as sink:
+            for store in range(5):
+                sink.write(f'NER{store:04}X01', FAILED)
+        self.assertEqual(len(list(read_jsonl(self.jsonl))), 5)
+        # The batches that failed went out with the next one.
+        self.assertEqual(post.call_args_list[3].kwargs['json']['text'].count('Device Mode Test.'), 3)
+        self.assertEqual(post.call_count, 5)
+
+    def test_csv_gzip(self):
+        path = os.path.join(self.directory, 'results.csv.gz')
+        with CsvSink(path) as sink:
+            sink.write('NER0502X01', PASSED)
+        with gzip.open(path, 'rt', newline='') as f:
+            self.assertEqual(list(csv.reader(f))[1], ['NER0502X01', 'Platform OS Test', '17.3.5', 'PASSED'])
+
+    def test_stdout(self):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with JsonlSink() as sink:
+                sink.write('NER0502X01', PASSED)
+            self.assertFalse(stdout.closed)
+            self.assertIn('"Platform OS Test"', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest import mock
+from cisco_device import CommandResult, DeviceSnapshot
+from rules import Rule, RuleSet
+import fast_parsers
+import os
+import tempfile
+
+MOCK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_data', 'NER0502X01')
+
+
+def snapshot_of(*commands):
+    results = {}
+    for command in commands:
+        with open(os.path.join(MOCK_DATA, command.replace(' ', '_') + '.txt'), 'r') as f:
+            result = CommandResult(command, f.read())
+        # Parsed with the fast parser, which returns genie's shape.
+        result._parsed['genie'] = fast_parsers.parse(command, result.raw)
+        results[command] = result
+    return DeviceSnapshot('NER0502X01', results)
+
+
+class TestRuleSet(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = snapshot_of('show version', 'show ip interface brief')
+
+    def evaluate(self, *rules):
+        return [result['test_status'] for result in RuleSet(rules).evaluate(self.snapshot)]
+
+    def test_comparators(self):
+        self.assertEqual(self.evaluate(
+            {'name': 'eq', 'command': 'show version', 'path': 'version.version', 'expected': '17.3.5'},
+            {'name': 'ne', 'command': 'show version', 'path': 'version.version', 'comparator': 'ne', 'expected': '17.3.5'},
+            {'name': 'regex', 'command': 'show version', 'path': 'version.uptime', 'comparator': 'regex', 'expected': r'^1 year'},
+            {'name': 'count', 'command': 'show version', 'path': 'version.switch_num', 'comparator': 'count', 'expected': 3},
+            {'name': 'list path', 'command': 'show ip interface brief', 'path': ['interface', 'Vlan7', 'status'], 'expected': 'up'}),
+            ['PASSED', 'FAILED', 'PASSED', 'PASSED', 'PASSED'])
+
+    def test_wildcards(self):
+        self.assertEqual(self.evaluate(
+            {'name': 'all', 'command': 'show version', 'path': 'version.switch_num.*.mode', 'expected': 'INSTALL'},
+            {'name': 'any', 'command': 'show version', 'path': 'version.switch_num.*.active', 'expected': True, 'quantifier': 'any'},
+            {'name': 'not all', 'command': 'show version', 'path': 'version.switch_num.*.active', 'expected': True}),
+            ['PASSED', 'PASSED', 'FAILED'])
+
+    def test_standard_constant(self):
+        rule = Rule('image', 'show version', 'version.system_image', standard='SW_9300_SYSTEM_IMAGE')
+        self.assertEqual(rule.expected, 'flash:packages.conf')
+        with self.assertRaises(ValueError):
+            Rule('image', 'show version', 'version.system_image', standard='SW_UNKNOWN')
+
+    def test_missing_path_and_command(self):
+        results = RuleSet([{'name': 'path', 'command': 'show version', 'path': 'version.nothing', 'expected': 1},
+                           {'name': 'command', 'command': 'show clock', 'path': 'time', 'expected': 1}]).evaluate(self.snapshot)
+        self.assertEqual(results[0]['response'], 'version.nothing not found')
+        self.assertEqual(results[1]['response'], "'show clock' was not collected")
+
+    def test_rules_are_grouped_by_command(self):
+        rules = RuleSet([{'name': 'a', 'command': 'show version', 'path': 'version.version'},
+                         {'name': 'b', 'command': 'show ip interface brief', 'path': 'interface'},
+                         {'name': 'c', 'command': 'show version', 'path': 'version.os'}])
+        self.assertEqual(rules.commands, ['show version', 'show ip interface brief'])
+        self.assertEqual([result['test_name'] for result in rules.evaluate(self.snapshot)], ['a', 'b', 'c'])
+
+    def test_invalid_comparator(self):
+        with self.assertRaises(ValueError):
+            RuleSet([{'name': 'a', 'command': 'show version', 'path': 'version', 'comparator': 'like'}])
+
+    def test_from_yaml(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rules.yaml')
+            with open(path, 'w') as f:
+                f.write('rules:\n'
+                        '  - name: System Image Test\n'
+                        '    command: show version\n'
+                        '    path: version.system_image\n'
+                        '    standard: SW_9300_SYSTEM_IMAGE\n')
+            self.assertEqual(self.evaluate(*RuleSet.from_yaml(path).rules), ['PASSED'])
+
+    def test_thousands_of_rules(self):
+        compile = Rule.compile
+        with mock.patch.object(Rule, 'compile', autospec=True, side_effect=compile) as compiled:
+            rules = RuleSet([{'name': f'{interface} status', 'command': 'show ip interface brief',
+                              'path': ['interface', interface, 'status'], 'comparator': 'in', 'expected': ['up', 'down']}
+                             for interface in list(self.snapshot.parse('show ip interface brief', 'genie')['interface']) * 20])
+            self.assertEqual(compiled.call_count, len(rules))
+            with mock.patch.object(self.snapshot, 'parse', wraps=self.snapshot.parse) as parse:
+                results = rules.evaluate(self.snapshot)
+                rules.evaluate(self.snapshot)
+            # Every rule is compiled once, up front, and the output is parsed
+            # once per evaluation, however many rules read it.
+            self.assertEqual(compiled.call_count, len(rules))
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(len(results), len(rules))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+from cisco_device import CiscoDevice
+from service import DevicePool, AuditService, make_server
+from support import SNAPSHOTS, use_fast_parsers
+import json
+import threading
+import urllib.request
+
+CHECKS = [('check_os_version', {}),
+          ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/1'})]
+
+
+class TestDevicePool(unittest.TestCase):
+
+    def test_sessions_are_reused(self):
+        devices = []
+
+        def device_factory(hostname):
+            devices.append(mock.Mock(hostname=hostname))
+            return devices[-1]
+
+        pool = DevicePool(device_factory=device_factory, idle_timeout=60)
+        for _ in range(3):
+            with pool.lease('NER0502X01') as device:
+                pass
+        self.assertEqual(len(devices), 1)
+        self.assertEqual(device.connect.call_count, 3)
+        self.assertEqual(device.invalidate_cache.call_count, 3)
+        device.close.assert_not_called()
+
+        self.assertEqual(pool.reap(), [])
+        pool.idle_timeout = 0
+        self.assertEqual(pool.reap(), ['NER0502X01'])
+        device.close.assert_called_once()
+
+    def test_idle_sessions_are_reaped_on_lease(self):
+        devices = {}
+
+        def device_factory(hostname):
+            devices[hostname] = mock.Mock(hostname=hostname)
+            return devices[hostname]
+
+        pool = DevicePool(device_factory=device_factory, idle_timeout=0)
+        with pool.lease('NER0502X01'):
+            pass
+        with pool.lease('NER0503X01'):
+            pass
+        devices['NER0502X01'].close.assert_called_once()
+        self.assertNotIn('NER0502X01', pool.hostnames())
+
+    def test_an_abandoned_device_is_replaced(self):
+        devices = []
+
+        def device_factory(hostname):
+            devices.append(mock.Mock(hostname=hostname, abandoned=False))
+            return devices[-1]
+
+        pool = DevicePool(device_factory=device_factory)
+        with pool.lease('NER0502X01') as device:
+            device.abandoned = True
+        with pool.lease('NER0502X01') as device:
+            pass
+        self.assertEqual(len(devices), 2)
+        self.assertIs(device, devices[1])
+
+    def test_a_failed_session_is_closed(self):
+        pool = DevicePool(device_factory=lambda hostname: mock.Mock())
+        with self.assertRaises(EOFError):
+            with pool.lease('NER0502X01') as device:
+                raise EOFError('Socket is closed')
+        device.close.assert_called_once()
+
+
+class TestAuditService(unittest.TestCase):
+
+    def setUp(self):
+        use_fast_parsers(self)
+        self.service = AuditService(['NER0502X01', 'NER0503X01'], checks=CHECKS,
+                                    device_factory=lambda hostname: CiscoDevice(hostname, mode='replay', snapshot_dir=SNAPSHOTS))
+        self.addCleanup(self.service.stop)
+
+    def test_audit(self):
+        audit = self.service.audit()
+        self.assertEqual([result['test_status'] for result in audit['results']['NER0502X01']], ['PASSED', 'PASSED'])
+        # There is no snapshot of NER0503X01.
+        self.assertIn('NER0503X01', audit['errors'])
+        self.assertIs(self.service.last_audit, audit)
+
+    def test_http_api(self):
+        server = make_server(self.service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+
+        request = urllib.request.Request(url + '/audit', data=json.dumps({'hostnames': ['NER0502X01']}).encode(), method='POST')
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(list(json.load(response)['results']), ['NER0502X01'])
+        with urllib.request.urlopen(url + '/results/NER0502X01') as response:
+            self.assertEqual(json.load(response)[0]['test_name'], 'Platform OS Test')
+        with urllib.request.urlopen(url + '/health') as response:
+            self.assertEqual(json.load(response)['warm_sessions'], ['NER0502X01'])
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + '/results/NER0503X01')
+        self.assertEqual(error.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
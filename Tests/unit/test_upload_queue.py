@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+from upload_queue import UploadQueue
+import os
+import tempfile
+import threading
+
+
+class TestUploadQueue(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.reports = []
+        for store in ('NER0502', 'NER0503'):
+            path = os.path.join(directory.name, f'{store}_store_test_results.xlsx')
+            open(path, 'w').close()
+            self.reports.append(path)
+        self.box_client = mock.Mock()
+        self.box_client.upload_file.side_effect = lambda client, folder_id, file_name: {'file_name': file_name, 'file_id': file_name[-30:]}
+        self.box_client.get_url_link.side_effect = lambda client, file_id: {'url': f'https://box/{file_id}'}
+
+    def test_reports_are_uploaded_in_the_background(self):
+        release = threading.Event()
+        self.box_client.get_client.side_effect = lambda: release.wait(5) and mock.sentinel.client
+        with UploadQueue('1', box_client=self.box_client) as uploads:
+            for report in self.reports:
+                # put() does not wait for Box.
+                uploads.put(report)
+            self.assertEqual(uploads.results, [])
+            release.set()
+        self.assertEqual(sorted(upload.file_name for upload in uploads.results), self.reports)
+        self.assertTrue(all(upload.url.startswith('https://box/') for upload in uploads.results))
+        self.assertFalse(any(os.path.exists(report) for report in self.reports))
+        self.box_client.get_client.assert_called_once()
+        self.box_client.get_folder_contents.assert_not_called()
+
+    def test_a_failed_upload_keeps_the_report(self):
+        self.box_client.upload_file.side_effect = [ConnectionError('Box is down'), {'file_id': '2'}]
+        with UploadQueue('1', box_client=self.box_client, max_workers=1) as uploads:
+            for report in self.reports:
+                uploads.put(report)
+        self.assertEqual([upload.ok for upload in uploads.results], [False, True])
+        self.assertTrue(os.path.exists(self.reports[0]))
+        self.assertFalse(os.path.exists(self.reports[1]))
+
+    def test_failed_authentication(self):
+        self.box_client.get_client.return_value = None
+        with UploadQueue('1', box_client=self.box_client) as uploads:
+            uploads.put(self.reports[0])
+        self.assertIsInstance(uploads.results[0].error, ConnectionError)
+        self.box_client.upload_file.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
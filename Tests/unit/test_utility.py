@@ -0,0 +1,213 @@
+import unittest
+from unittest import mock
+from openpyxl import load_workbook
+from utility import CSVWriter, XLSWriter, PDFCreator, PDFReport, JsonToCsvConverter, JsonStreamToCsvConverter, iter_json_records
+import csv
+import gzip
+import json
+import os
+import re
+import tempfile
+
+
+class TestXLSWriter(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'report.xlsx')
+
+    def write(self, xls_writer):
+        xls_writer.add_sheet('Results')
+        xls_writer.write_single_row_data('Results', ['DEVICE', 'RESULT'], bold=True, font_color='FF000000')
+        for index in range(3):
+            xls_writer.write_single_row_data('Results', ['NER0502X01', 'FAILED' if index else 'PASSED'],
+                                             font_color='FFFF0000' if index else 'FF000000')
+        xls_writer.save()
+
+    def test_write_only(self):
+        self.write(XLSWriter(self.filename, write_only=True))
+        sheet = load_workbook(self.filename)['Results']
+        self.assertEqual([row for row in sheet.iter_rows(values_only=True)][:2],
+                         [('DEVICE', 'RESULT'), ('NER0502X01', 'PASSED')])
+        self.assertTrue(sheet['A1'].font.bold)
+        self.assertEqual(sheet['B4'].font.color.rgb, 'FFFF0000')
+        self.assertEqual(sheet.max_row, 4)
+
+    def test_rows_are_appended_to_an_existing_file(self):
+        xls_writer = XLSWriter(self.filename)
+        self.write(xls_writer)
+        xls_writer = XLSWriter(self.filename)
+        xls_writer.write_single_row_data('Results', ['NER0503X01', 'PASSED'])
+        xls_writer.save()
+        sheet = load_workbook(self.filename)['Results']
+        # The first row of a new sheet is left empty, as max_row is already 1.
+        self.assertEqual(sheet.max_row, 6)
+        self.assertEqual(sheet['A6'].value, 'NER0503X01')
+        self.assertEqual(sheet['A5'].font.color.rgb, 'FFFF0000')
+
+
+class TestCSVWriter(unittest.TestCase):
+
+    HEADER = ['device', 'mac', 'interface']
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def rows(self, count, device='NER0502X01'):
+        for index in range(count):
+            yield [device, f'0000.0c07.{index:04x}', f'GigabitEthernet1/0/{index % 48 + 1}']
+
+    def read(self, filename, opener=open):
+        with opener(filename, 'rt', encoding='UTF8', newline='') as f:
+            return list(csv.reader(f))
+
+    def test_generator_is_written_in_chunks(self):
+        filename = os.path.join(self.directory, 'mac.csv')
+        writer = CSVWriter(filename, self.HEADER, self.rows(2500), buffer_size=1000)
+        with mock.patch.object(writer, 'flush', wraps=writer.flush) as flush:
+            self.assertEqual(writer.write(), 2500)
+        # Two full buffers and the rest on close.
+        self.assertEqual(flush.call_count, 3)
+        rows = self.read(filename)
+        self.assertEqual(rows[0], self.HEADER)
+        self.assertEqual(rows[-1], ['NER0502X01', '0000.0c07.09c3', 'GigabitEthernet1/0/4'])
+        self.assertEqual(len(rows), 2501)
+
+    def test_append(self):
+        filename = os.path.join(self.directory, 'mac.csv')
+        CSVWriter(filename, self.HEADER, self.rows(3), mode='a').write()
+        with CSVWriter(filename, self.HEADER, mode='a') as writer:
+            writer.writerow(['NER0503X01', '0000.0c07.ac01', 'Vlan10'])
+        rows = self.read(filename)
+        self.assertEqual([row[0] for row in rows], ['device'] + ['NER0502X01'] * 3 + ['NER0503X01'])
+
+    def test_gzip(self):
+        filename = os.path.join(self.directory, 'mac.csv.gz')
+        CSVWriter(filename, self.HEADER, self.rows(10)).write()
+        CSVWriter(filename, self.HEADER, self.rows(5, device='NER0503X01'), mode='a').write()
+        rows = self.read(filename, opener=gzip.open)
+        self.assertEqual(len(rows), 16)
+        self.assertEqual(rows[-1][0], 'NER0503X01')
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            CSVWriter('mac.csv', self.HEADER, mode='r')
+
+    def test_rows_need_an_open_writer(self):
+        writer = CSVWriter(os.path.join(self.directory, 'mac.csv'), self.HEADER)
+        for write in (lambda: writer.writerow(['NER0502X01']), lambda: writer.writerows(self.rows(1)), writer.flush):
+            with self.assertRaises(ValueError):
+                write()
+        with writer:
+            writer.writerow(['NER0502X01', '0000.0c07.ac01', 'Vlan10'])
+        with self.assertRaises(ValueError):
+            writer.writerow(['NER0503X01', '0000.0c07.ac01', 'Vlan10'])
+
+
+class TestPDFReport(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'report.pdf')
+
+    def pages(self):
+        with open(self.filename, 'rb') as f:
+            return len(re.findall(rb'/Type /Page\b', f.read()))
+
+    def test_table_is_broken_over_pages(self):
+        rows = ((['NER0502X01', f'Device Interface GigabitEthernet1/0/{index} Status Test.', 'PASSED'], 'FF000000')
+                for index in range(200))
+        with PDFReport(self.filename, title='NER0502') as report:
+            with mock.patch.object(report, '_draw_row', wraps=report._draw_row) as draw_row:
+                report.add_heading('NER0502X01')
+                report.add_table(['DEVICE', 'TEST', 'RESULT'], rows)
+            pages = report.page_number
+        self.assertGreater(pages, 1)
+        self.assertEqual(self.pages(), pages)
+        headers = [call for call in draw_row.call_args_list if call.args[3] == 'Helvetica-Bold']
+        # The header is repeated at the top of every page.
+        self.assertEqual(len(headers), pages)
+        self.assertEqual(draw_row.call_count, 200 + pages)
+
+    def test_long_cells_are_wrapped_and_cut(self):
+        report = PDFReport(self.filename, max_cell_lines=4)
+        self.addCleanup(report.close)
+        lines = report._cell_lines('x' * 500, 100, 'Helvetica')
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[-1], '...')
+        self.assertEqual(report._cell_lines({'status': 'up'}, 100, 'Helvetica'), ["{'status': 'up'}"])
+
+    def test_pdf_creator_writes_one_page_per_page(self):
+        pdf = PDFCreator(self.filename)
+        for y in (100, 200):
+            pdf.add_page({'x': 72, 'y': y, 'text': 'NER0502X01'})
+        pdf.create_pdf()
+        self.assertEqual(self.pages(), 2)
+
+
+class TestJsonToCsv(unittest.TestCase):
+
+    RECORDS = [{'hostname': 'NER0502X01', 'serial': 'FOC1234X0AB'},
+               {'hostname': 'NER0503X01', 'serial': 'FOC1234X0AC', 'uptime': 1234567},
+               {'hostname': 'NER0504X01', 'interfaces': ['Gi1/0/1', 'Gi1/0/2'], 'site': None}]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.csv_file = os.path.join(self.directory, 'devices.csv')
+
+    def write(self, name, text, opener=open):
+        path = os.path.join(self.directory, name)
+        with opener(path, 'wt', encoding='UTF8') as f:
+            f.write(text)
+        return path
+
+    def read(self):
+        with open(self.csv_file, newline='') as f:
+            return list(csv.reader(f))
+
+    def test_array_is_read_across_chunks(self):
+        path = self.write('devices.json', json.dumps(self.RECORDS + [1.25, 'x' * 50], indent=2))
+        # Chunks smaller than the records, and a number split over two chunks.
+        for chunk_size in (1, 7, 1 << 20):
+            self.assertEqual(list(iter_json_records(path, chunk_size=chunk_size)), self.RECORDS + [1.25, 'x' * 50])
+
+    def test_json_lines_and_wrapped_arrays(self):
+        path = self.write('devices.jsonl.gz', ''.join(json.dumps(record) + '\n' for record in self.RECORDS), opener=gzip.open)
+        self.assertEqual(list(iter_json_records(path, chunk_size=16)), self.RECORDS)
+        path = self.write('devices.json', json.dumps({'count': 3, 'next': None, 'results': self.RECORDS}))
+        self.assertEqual(list(iter_json_records(path, key='results', chunk_size=16)), self.RECORDS)
+        with self.assertRaises(ValueError):
+            list(iter_json_records(path, key='response'))
+        with self.assertRaises(ValueError):
+            list(iter_json_records(self.write('broken.json', '[{"hostname": "NER0502X01"},')))
+
+    def test_columns_are_the_union_of_the_keys(self):
+        path = self.write('devices.json', json.dumps(self.RECORDS))
+        self.assertEqual(JsonStreamToCsvConverter(path, chunk_size=16).convert(self.csv_file), 3)
+        self.assertEqual(self.read(), [['hostname', 'serial', 'uptime', 'interfaces', 'site'],
+                                       ['NER0502X01', 'FOC1234X0AB', '', '', ''],
+                                       ['NER0503X01', 'FOC1234X0AC', '1234567', '', ''],
+                                       ['NER0504X01', '', '', '["Gi1/0/1", "Gi1/0/2"]', '']])
+
+    def test_fieldnames_leave_out_the_other_keys(self):
+        path = self.write('devices.json', json.dumps(self.RECORDS))
+        JsonStreamToCsvConverter(path, fieldnames=['hostname', 'uptime']).convert(self.csv_file)
+        self.assertEqual(self.read(), [['hostname', 'uptime'], ['NER0502X01', ''], ['NER0503X01', '1234567'], ['NER0504X01', '']])
+        with self.assertRaises(ValueError):
+            JsonStreamToCsvConverter(self.write('numbers.json', '[1, 2]')).convert(self.csv_file)
+
+    def test_converter_keeps_every_key(self):
+        # Keys missing from the first record used to make DictWriter raise.
+        JsonToCsvConverter(json.dumps(self.RECORDS[:2])).convert(self.csv_file)
+        self.assertEqual(self.read()[0], ['hostname', 'serial', 'uptime'])
+        self.assertEqual(self.read()[2], ['NER0503X01', 'FOC1234X0AC', '1234567'])
+
+
+if __name__ == '__main__':
+    unittest.main()
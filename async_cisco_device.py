@@ -0,0 +1,485 @@
+"""
+The async_cisco_device module provides AsyncCiscoDevice, an asyncio based
+counterpart of CiscoDevice with the same get_* surface.
+
+Sessions run over asyncssh instead of one thread per device, so a single event
+loop can keep thousands of devices busy at the same time. Outputs are captured
+into the same CommandResult objects CiscoDevice uses and cached per device for
+cache_ttl seconds; parsing runs in the loop's default executor so genie does
+not stall the other sessions.
+
+Example:
+
+    async def os_version(device):
+        return await device.get_os_version_info()
+
+    results = asyncio.run(run_fleet_async(hostnames, os_version, concurrency=2000))
+
+Note: asyncssh is only needed by this module, and is only imported when the
+first session is opened, so the module can be imported without it.
+"""
+
+import asyncio
+import re
+import time
+import environment
+from cisco_device import CommandCache, CommandResult, DeviceFacts
+from fleet import FleetResult
+
+
+AD_USERNAME = environment.AD_USERNAME
+AD_PASSWORD = environment.AD_PASSWORD
+
+
+class AsyncCiscoDevice():
+
+    PLATFORM = 'cisco_ios'
+    # Any line ending in a user or privileged exec prompt, used until the
+    # device's own prompt is known.
+    PROMPT_PATTERN = re.compile(r'(?:^|\n)([^\r\n]+[>#])[ \t]*$')
+
+    def __init__(self, hostname, cache_ttl=300, timeout=60, known_hosts=None):
+        """
+        The constructor for the AsyncCiscoDevice class.
+
+        Args:
+            hostname (str): The hostname or IP address of the remote device.
+            cache_ttl (int, optional): How many seconds command outputs are
+                reused before the device is asked again. None keeps them until
+                invalidate_cache() is called, 0 disables caching. Defaults to 300.
+            timeout (float, optional): Seconds to wait for the login or for a
+                command's prompt to come back. Defaults to 60.
+            known_hosts (str, optional): The known_hosts file the host keys
+                are checked against. Defaults to None, which does not check
+                them, as netmiko does not by default either.
+        """
+        self.hostname = hostname
+        self.username = AD_USERNAME
+        self.password = AD_PASSWORD
+        self.timeout = timeout
+        self.known_hosts = known_hosts
+        self.cache = CommandCache(ttl=cache_ttl)
+        self.prompt = None
+        self._connection = None
+        self._process = None
+        self._buffer = ''
+        self._lock = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def lock(self):
+        # Created lazily so the device can be built outside of a running loop.
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def is_alive(self):
+        return self._process is not None and not self._process.stdout.at_eof()
+
+    async def connect(self):
+        """
+        Opens the SSH session and an interactive shell on the remote device,
+        unless one is already open, and prepares the terminal the same way
+        netmiko does (no paging, wide lines).
+        """
+        if self.is_alive():
+            return
+        await self.close()
+        import asyncssh
+        self._connection = await asyncio.wait_for(
+            asyncssh.connect(self.hostname, username=self.username, password=self.password,
+                             known_hosts=self.known_hosts),
+            self.timeout)
+        self._process = await self._connection.create_process(term_type='vt100')
+        self._buffer = ''
+        self.prompt = (await self._read_until(self.PROMPT_PATTERN)).group(1).strip()
+        for command in ('terminal length 0', 'terminal width 511'):
+            await self._run(command)
+
+    async def close(self):
+        """
+        Closes the SSH session to the remote device, if one is open.
+        """
+        connection, self._connection, self._process = self._connection, None, None
+        if connection is None:
+            return
+        try:
+            connection.close()
+            await connection.wait_closed()
+        except Exception:
+            pass
+
+    async def _read_until(self, pattern):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            match = pattern.search(self._buffer)
+            if match:
+                self._buffer = self._buffer[match.end():]
+                return match
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"{self.hostname} did not return a prompt within {self.timeout} seconds")
+            chunk = await asyncio.wait_for(self._process.stdout.read(65536), remaining)
+            if not chunk:
+                raise EOFError(f"{self.hostname} closed the session")
+            self._buffer += chunk.replace('\r\n', '\n').replace('\r', '')
+
+    async def _run(self, command):
+        self._process.stdin.write(command + '\n')
+        pattern = re.compile(r'(?:^|\n)' + re.escape(self.prompt) + r'[ \t]*$')
+        match = await self._read_until(pattern)
+        output = match.string[:match.start()]
+        # Drop the echoed command line.
+        return output.split('\n', 1)[1] if '\n' in output else ''
+
+    async def _send_command(self, command):
+        import asyncssh
+        await self.connect()
+        try:
+            return await self._run(command)
+        except (OSError, EOFError, asyncssh.Error):
+            # The session went away under us, log in again and retry once.
+            await self.close()
+            await self.connect()
+            return await self._run(command)
+
+    def invalidate_cache(self, command=None):
+        """
+        Forgets cached outputs so the next call goes to the device again.
+
+        Args:
+            command (str, optional): Only forget the output of this command.
+                Defaults to None, which clears the whole cache.
+        """
+        self.cache.invalidate(command)
+
+    async def capture_command(self, command, use_cache=True):
+        """
+        Runs a command on the remote device and returns its raw output wrapped
+        in a CommandResult. Concurrent calls on the same device are serialized
+        on its shell, and a command already fetched by one of them is served
+        from the cache to the others.
+        """
+        async with self.lock:
+            if use_cache:
+                hit, result = self.cache.get(command)
+                if hit:
+                    return result
+            result = CommandResult(command, await self._send_command(command), platform=self.PLATFORM)
+            self.cache.set(command, result)
+            return result
+
+    async def execute_command(self, command, parser=None, use_cache=True):
+        """
+        Executes a command on the remote device and returns the output, parsed
+        with 'genie', 'textfsm' or 'fast' when a parser is given. See
+        CiscoDevice.execute_command for the details.
+
+        Raises:
+            ValueError: If an invalid parser is selected.
+        """
+        if parser not in CommandResult.PARSERS and parser not in (None, ''):
+            raise ValueError(f"Invalid parser selected: {parser}")
+        result = await self.capture_command(command, use_cache)
+        if not parser:
+            return result.raw
+        return await asyncio.get_running_loop().run_in_executor(None, result.parse, parser)
+
+    async def execute_commands(self, commands, parser=None, use_cache=True):
+        """
+        Executes a list of commands over the device's session and returns the
+        outputs keyed by command, in the order the commands were given.
+        """
+        outputs = {}
+        for command in commands:
+            if command not in outputs:
+                outputs[command] = await self.execute_command(command, parser, use_cache)
+        return {command: outputs[command] for command in commands}
+
+    async def find_prompt(self):
+        await self.connect()
+
+        if self.prompt.endswith('#'):
+            return True
+        elif self.prompt.endswith('>'):
+            return False
+        else:
+            # handle unexpected prompt format
+            raise ValueError(f"Unexpected prompt format: {self.prompt}")
+
+    async def get_show_version(self, parser=None):
+        """
+        Retrieve the version information from a network device.
+
+        This method retrieves the version information of a network device by sending the "show version" command to the device. The output of the command can be parsed using either the "genie" or "textfsm" parser. If no parser is specified, the raw output of the command is returned.
+
+        Args:
+        parser (str, optional): The parser to use for parsing the output of the "show version" command. Valid values are "genie" or "textfsm". If no parser is specified, the raw output of the command is returned.
+
+        Returns:
+        str: The version information of the network device. If a parser is specified, the parsed output of the "show version" command is returned. If no parser is specified, the raw output of the command is returned.
+        """
+        command = "show version"
+        return await self.execute_command(command, parser)
+    
+    async def get_chassis_info(self, parser='genie'):
+        command = "show version"
+        return (await self.execute_command(command, parser))['version']['chassis']
+
+    async def get_chassis(self, parser='genie'):
+        command = "show chassis"
+        return await self.execute_command(command, parser)
+    
+
+    async def get_image_id_info(self, parser='genie'):
+        command = "show version"
+        return (await self.execute_command(command, parser))['version']['image_id']
+
+    async def get_platform_info(self, parser='genie'):
+        command = "show version"
+        return (await self.execute_command(command, parser))['version']['platform']
+    
+    async def get_platform(self, parser='genie'):
+        command = "show platform"
+        return await self.execute_command(command, parser) 
+
+                
+    async def get_number_of_sw_stack_info(self, parser='genie'):
+        command = "show version"
+        response = (await self.execute_command(command, parser))['version']['switch_num']
+        return len(response.keys())
+
+    async def get_modes_of_sw_stack_info(self, parser='genie'):
+        command = "show version"
+        response = (await self.execute_command(command, parser))['version']['switch_num']
+        switch_stack_modes={}
+        for sw_id in response.keys():
+            switch_stack_modes[sw_id]=response[sw_id]['mode']
+        return switch_stack_modes
+    
+    async def get_os_version_info(self, parser='genie'):
+        command = "show version"
+        return (await self.execute_command(command, parser))['version']['version']
+
+    async def get_facts(self, parser='genie'):
+        """
+        Returns the device facts (OS version, platform, stack modes, ...) as a
+        DeviceFacts object built from a single parse of "show version".
+        """
+        command = "show version"
+        return DeviceFacts.from_show_version(await self.execute_command(command, parser))
+    
+
+    async def get_interface_description(self, parser=None):
+        """
+        Retrieve the interface descriptions from a network device.
+
+        This method retrieves the descriptions of the interfaces on a network device by sending the "show interfaces description" command to the device. The output of the command can be parsed using either the "genie" or "textfsm" parser. If no parser is specified, the raw output of the command is returned.
+
+        Args:
+        parser (str, optional): The parser to use for parsing the output of the "show interfaces description" command. Valid values are "genie" or "textfsm". If no parser is specified, the raw output of the command is returned.
+
+        Returns:
+        Union[str, Dict, List[List[str]]]: The interface descriptions of the network device. If a parser is specified, the parsed output of the "show interfaces description" command is returned. If no parser is specified, the raw output of the command is returned.
+        """
+        command = "show interfaces description"
+        return await self.execute_command(command, parser)
+    
+    async def get_interface_description_individual(self, parser='genie', interface=None):
+        command = "show interfaces description"
+        response = await self.execute_command(command, parser)
+        if interface is None:
+            raise KeyError("interface is not specified")
+        try:
+            return response['interfaces'][interface]['description']
+        except KeyError:
+            raise ValueError(f"interface {interface} not found")
+        
+    async def get_ip_interface_brief(self, parser=None):
+        command = "show ip interface brief"
+        return await self.execute_command(command, parser)
+    
+    async def get_interface_status(self, parser=None):
+        command = "show interfaces status"
+        return await self.execute_command(command, parser)
+        
+    async def get_interfaces_status(self, parser=None):
+        command = "show interfaces"
+        return await self.execute_command(command, parser)
+
+    async def get_interfaces_summary(self, parser=None):
+        command = "show interfaces summary"
+        return await self.execute_command(command, parser)
+
+
+    async def get_cdp_neighbor(self, parser=None):
+        command = "show cdp neighbor"
+        return await self.execute_command(command, parser)
+
+    async def get_cdp_interface(self, parser=None):
+        command = "show cdp interface"
+        return await self.execute_command(command, parser)
+
+    async def get_lldp_neighbor(self, parser=None):
+        command = "show lldp neighbor"
+        return await self.execute_command(command, parser)
+
+
+    async def get_ps_info(self, parser=None):
+        command = "show environment power all"
+        return await self.execute_command(command, parser)
+    
+    async def get_stack_info(self, parser=None):
+        command = "show switch stack-ports"
+        return await self.execute_command(command, parser)
+
+    async def get_mac_address_table(self, parser=None):
+        command = "show mac address-table"
+        return await self.execute_command(command, parser)
+
+    async def get_mac_address_table_count(self, parser=None):
+        command = "show mac address-table count"
+        return await self.execute_command(command, parser)
+
+    async def get_vlans(self, parser=None):
+        command = "show vlan"
+        return await self.execute_command(command, parser)
+
+    async def get_routing_table_info(self, parser=None):
+        command = "show ip route"
+        return await self.execute_command(command, parser)
+    
+    async def get_ip_protocols(self, parser=None):
+        command = "show ip protocols"
+        return await self.execute_command(command, parser)
+    
+    async def get_eigrp_neighbors(self, parser=None):
+        command = "show ip eigrp neighbors"
+        return await self.execute_command(command, parser)
+    
+    async def get_eigrp_interfaces(self, parser=None):
+        command = "show ip eigrp interfaces"
+        return await self.execute_command(command, parser)
+
+    async def get_inventory_info(self, parser=None):
+        command = "show inventory"
+        return await self.execute_command(command, parser)
+    
+    async def get_licence(self, parser=None):
+        command = "show license"
+        return await self.execute_command(command, parser)
+    
+    async def get_licence_status(self, parser=None):
+        command = "show license status"
+        return await self.execute_command(command, parser)
+    
+    async def get_ntp_associations(self, parser=None):
+        command = "show ntp associations"
+        return await self.execute_command(command, parser)
+
+    async def get_power_inline(self, parser=None):
+        command = "show power inline"
+        return await self.execute_command(command, parser)
+
+    async def get_power_inline_interface(self, parser=None, interface=None):
+        command = "show power inline " + interface
+        return await self.execute_command(command, parser)
+
+    async def get_snmp(self, parser=None):
+        command = "show snmp"
+        return await self.execute_command(command, parser)
+
+    async def get_snmp_group(self, parser=None):
+        command = "show snmp group"
+        return await self.execute_command(command, parser)
+    
+    async def get_snmp_user(self, parser=None):
+        command = "show snmp user"
+        return await self.execute_command(command, parser)
+    
+    async def get_switch_info(self, parser=None):
+        command = "show switch"
+        return await self.execute_command(command, parser)
+
+    async def get_switch_detail(self, parser=None):
+        command = "show switch detail"
+        return await self.execute_command(command, parser)
+
+    async def get_tacacs(self, parser=None):
+        command = "show tacacs"
+        return await self.execute_command(command, parser)
+
+    async def get_access_lists(self, parser=None):
+        command = "show access-lists"
+        return await self.execute_command(command, parser)
+
+    async def get_arp(self, parser=None):
+        command = "show arp"
+        return await self.execute_command(command, parser)
+
+    async def get_arp_summary(self, parser=None):
+        command = "show arp summary"
+        return await self.execute_command(command, parser)
+
+    async def get_clock(self, parser=None):
+        command = "show clock"
+        return await self.execute_command(command, parser)
+
+    async def get_vrf_detail(self, parser=None):
+        command = "show vrf detail"
+        return await self.execute_command(command, parser)
+
+    async def get_ip_vrf_detail(self, parser=None):
+        command = "show ip vrf detail"
+        return await self.execute_command(command, parser)
+
+
+async def run_fleet_async(hostnames, task, concurrency=1000, timeout=300, device_factory=AsyncCiscoDevice):
+    """
+    Runs an async task against every host on the current event loop, with at
+    most `concurrency` sessions open at the same time.
+
+    Args:
+        hostnames (Iterable[str]): The hosts to run against.
+        task (coroutine function): Awaited with the connected device, its
+            return value becomes FleetResult.result.
+        concurrency (int, optional): The number of devices worked on at the
+            same time. Defaults to 1000.
+        timeout (float, optional): Seconds a single host may take, including
+            the login. Defaults to 300.
+        device_factory (callable, optional): Builds the device object for a
+            hostname. Defaults to AsyncCiscoDevice.
+
+    Returns:
+        List[FleetResult]: The outcome for each host, in the order the
+        hostnames were given.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_host(hostname):
+        async with semaphore:
+            start = time.monotonic()
+
+            async def work():
+                async with device_factory(hostname) as device:
+                    return await task(device)
+
+            try:
+                # The timeout covers the login too, a hanging login is cut
+                # short like a hanging task.
+                result = await asyncio.wait_for(work(), timeout)
+                return FleetResult(hostname, result=result, elapsed=time.monotonic() - start)
+            except asyncio.TimeoutError:
+                return FleetResult(hostname,
+                                   error=TimeoutError(f"{hostname} did not finish within {timeout} seconds"),
+                                   elapsed=time.monotonic() - start)
+            except Exception as e:
+                return FleetResult(hostname, error=e, elapsed=time.monotonic() - start)
+
+    return await asyncio.gather(*(run_host(hostname) for hostname in hostnames))
@@ -0,0 +1,259 @@
+"""
+Benchmarks for the CiscoDevice parsing paths and the Access_Sw_Tests
+evaluation, driven by the captured device outputs in Tests/unit/mock_data.
+Devices are replayed from those snapshots, so no network is involved.
+
+For every case the benchmark reports ops/sec, p50 and p99 latency and the peak
+memory allocated by one run. The import cases time a fresh interpreter
+importing the CLI entry points, i.e. the startup cost before any work is done;
+they also fail the run when they go over IMPORT_BUDGETS_MS. A case that
+raises, e.g. a parser failing on a captured output, is reported as ERROR and
+skipped. The numbers are compared with a stored baseline
+and the script exits with status 1 when a case got slower than the baseline by
+more than the tolerance, so it can gate parser changes in CI.
+
+Usage:
+    python benchmark.py --update-baseline   # first, store the current numbers as the baseline
+    python benchmark.py                     # run and compare with the baseline
+    python benchmark.py --filter fast       # only run the cases matching 'fast'
+    python benchmark.py --filter import     # only time the imports
+
+Baselines are machine specific, so none is committed: record one with
+--update-baseline on the host that runs the comparison, before the change
+being measured. Without a baseline the script stops with status 2 rather
+than pass a comparison it cannot make.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from cisco_device import CiscoDevice, CommandResult, SnapshotStore
+import fast_parsers
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOTS = os.path.join(ROOT, 'Tests', 'unit', 'mock_data')
+HOSTNAME = 'NER0502X01'
+BASELINE = os.path.join(ROOT, 'benchmark_baseline.json')
+
+COMMANDS = ['show version',
+            'show ip interface brief',
+            'show interfaces description',
+            'show cdp neighbor',
+            'show platform',
+            'show environment power all']
+
+# The most a fresh interpreter may take to import each module, in ms.
+IMPORT_BUDGETS_MS = {'main': 1000,
+                     'service': 1000,
+                     'utility': 300,
+                     'cisco_device': 300}
+
+
+def available_parsers():
+    parsers = ['fast']
+    try:
+        import genie
+        parsers.append('genie')
+    except ImportError:
+        pass
+    try:
+        import ntc_templates
+        parsers.append('textfsm')
+    except ImportError:
+        pass
+    return parsers
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+
+def measure(function, iterations, warmup=3, memory=True):
+    """
+    Runs the function `warmup` times untimed, then `iterations` times timed,
+    and once more under tracemalloc for the peak memory, unless memory is
+    False.
+    """
+    for _ in range(warmup):
+        function()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'ops_per_sec': iterations / sum(samples),
+            'p50_ms': percentile(samples, 0.50) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000,
+            'peak_kib': None if peak is None else peak / 1024}
+
+
+def parser_cases(parsers):
+    store = SnapshotStore(SNAPSHOTS)
+    cases = {}
+    for command in COMMANDS:
+        raw = store.read(HOSTNAME, command)
+        for parser in parsers:
+            if parser == 'fast' and not fast_parsers.has_parser(command):
+                continue
+            # A fresh CommandResult per run, so the memoized parse is not reused.
+            cases[f'parse[{parser}] {command}'] = lambda raw=raw, command=command, parser=parser: \
+                CommandResult(command, raw).parse(parser)
+    return cases
+
+
+def compliance_case():
+    """
+    The checks of a production run on one device: CheckRunner.run_checks()
+    with DEFAULT_CHECKS, collecting the outputs once and evaluating the
+    checks on a shared pool, against a fresh replayed device per run.
+    """
+    from check_runner import CheckRunner
+    from concurrent.futures import ThreadPoolExecutor
+    from device_integration_tests import Access_Sw_Tests
+
+    runner = CheckRunner()
+    # The pool outlives the runs, as it does across the devices of a run.
+    pool = ThreadPoolExecutor(max_workers=runner.max_workers)
+
+    def run():
+        device = CiscoDevice(HOSTNAME, mode='replay', snapshot_dir=SNAPSHOTS)
+        return runner.run_checks(Access_Sw_Tests(device), pool)
+
+    return {'compliance Access_Sw_Tests': run}
+
+
+def import_cases():
+    """
+    One case per module of IMPORT_BUDGETS_MS, importing it in a new
+    interpreter, as running the CLI would.
+    """
+    def run(module):
+        subprocess.run([sys.executable, '-c', f'import {module}'], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+
+    return {f'import {module}': lambda module=module: run(module) for module in IMPORT_BUDGETS_MS}
+
+
+def over_budget(results):
+    """
+    Returns the names of the import cases whose p50 is over their budget.
+    """
+    return [name for name, result in results.items()
+            if name.startswith('import ') and result['p50_ms'] > IMPORT_BUDGETS_MS[name[len('import '):]]]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the names of the cases whose ops/sec fell below the baseline by
+    more than the tolerance.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['ops_per_sec'] < baseline[name]['ops_per_sec'] * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def run_cases(cases, iterations, import_iterations, baseline=None):
+    """
+    Measures and prints every case. A case that raises, e.g. a parser that
+    cannot parse the captured output, is reported and skipped, the other
+    cases still run.
+
+    Returns:
+        Tuple[Dict, Dict]: The results and the errors, keyed by case name.
+    """
+    baseline = baseline or {}
+    results, errors = {}, {}
+    for name, case in cases.items():
+        try:
+            if name.startswith('import '):
+                result = measure(case, import_iterations, warmup=1, memory=False)
+            else:
+                result = measure(case, iterations)
+        except Exception as e:
+            errors[name] = e
+            print(f"{name:<52} {'ERROR':>10} {e!r:.60}")
+            continue
+        results[name] = result
+        change = ''
+        if name in baseline:
+            change = f"{result['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1:+.0%}"
+        peak = '-' if result['peak_kib'] is None else f"{result['peak_kib']:.1f}"
+        print(f"{name:<52} {result['ops_per_sec']:>10.1f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} {peak:>9} {change:>8}")
+    return results, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the parsers and compliance checks on captured outputs")
+    parser.add_argument("-n", "--iterations", type=int, default=200, help="Timed runs per case")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.2, help="Allowed ops/sec drop against the baseline, 0.2 = 20%%")
+    parser.add_argument("-b", "--baseline", default=BASELINE, help="Baseline JSON file")
+    parser.add_argument("-f", "--filter", default='', help="Only run the cases whose name contains this text")
+    parser.add_argument("--import-iterations", type=int, default=10, help="Timed runs per import case, each starts an interpreter")
+    parser.add_argument("--update-baseline", action='store_true', help="Store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, nothing to compare with. '
+              f'Record one first with: python benchmark.py --update-baseline')
+        return 2
+
+    parsers = available_parsers()
+    cases = parser_cases(parsers)
+    if 'genie' in parsers and 'textfsm' in parsers:
+        cases.update(compliance_case())
+    else:
+        print('genie and textfsm are required for the compliance case, skipping it')
+    cases.update(import_cases())
+    cases = {name: case for name, case in cases.items() if args.filter in name}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    print(f"{'CASE':<52} {'OPS/SEC':>10} {'P50 MS':>9} {'P99 MS':>9} {'PEAK KIB':>9} {'VS BASE':>8}")
+    results, errors = run_cases(cases, args.iterations, args.import_iterations, baseline)
+
+    if args.update_baseline:
+        baseline.update(results)
+        for name in errors:
+            baseline.pop(name, None)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f'REGRESSION: {name} is more than {args.tolerance:.0%} slower than the baseline')
+    # A case that worked when the baseline was recorded and now raises is a
+    # regression too, one that never worked is only reported.
+    broken = [name for name in errors if name in baseline]
+    for name in broken:
+        print(f'REGRESSION: {name} raised {errors[name]!r}')
+    slow_imports = over_budget(results)
+    for name in slow_imports:
+        print(f"OVER BUDGET: {name} takes {results[name]['p50_ms']:.0f} ms, "
+              f"the budget is {IMPORT_BUDGETS_MS[name[len('import '):]]} ms")
+    return 1 if regressions or broken or slow_imports else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
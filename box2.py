@@ -92,6 +92,7 @@ class BoxClient():
         file_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), file_name)
         a_file = root_folder.upload(file_path, file_name=file_name)
         return {'file_name': file_name,
+                'file_id': a_file.id,
                 'folder_id': folder_id,
                 'Action':'File Uploaded'}
 
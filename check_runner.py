@@ -0,0 +1,192 @@
+"""
+The check_runner module runs the Access_Sw_Tests checks concurrently, within a
+device and across devices.
+
+For every device the required commands are collected once (see
+Access_Sw_Tests.collect), then the checks are evaluated against that snapshot
+on a shared thread pool. Devices are worked on in parallel with FleetRunner.
+However the checks are scheduled, the results of a device always come back in
+the order the checks are listed, so the report is the same from run to run.
+
+With a ComplianceCache, checks whose inputs did not change since the last run
+are not evaluated again; their stored results are reused, or left out of the
+report with changed_only=True.
+
+Example:
+
+    runner = CheckRunner(max_workers=8, device_workers=16)
+    for fleet_result in runner.run(['NER0502X01', 'NER0503X01']):
+        for result in fleet_result.result:
+            print(fleet_result.hostname, result['test_name'], result['test_status'])
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from cisco_device import CiscoDevice
+from compliance_cache import ComplianceCache
+from device_integration_tests import Access_Sw_Tests
+from fleet import FleetRunner
+from rules import RuleSet
+
+
+# (method name, keyword arguments) of every check, in report order.
+DEFAULT_CHECKS = [('check_os_version', {}),
+                  ('check_cdp_neighbor_number', {}),
+                  ('check_cdp_cellular_router_interface', {}),
+                  ('check_platform', {}),
+                  ('check_number_of_sw_per_stack', {}),
+                  ('check_modes_of_sw_stack', {}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/1'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/3'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/4'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/5'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/9'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet1/0/10'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet2/0/1'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet2/0/3'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet2/0/4'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet2/0/5'}),
+                  ('check_device_interface_status', {'interface': 'GigabitEthernet2/0/10'}),
+                  ('check_interface_descriptions', {}),
+                  ('check_rules', {}),
+                  ('check_aaa_configuration', {}),
+                  ('check_psu_status', {}),
+                  ('check_number_of_psu', {})]
+
+
+class CheckRunner():
+
+    def __init__(self, checks=None, max_workers=8, device_workers=8, timeout=300,
+                 device_factory=CiscoDevice, test_class=Access_Sw_Tests, cache=None, changed_only=False,
+                 require_privileged=False):
+        """
+        The constructor for the CheckRunner class.
+
+        Args:
+            checks (List[Tuple[str, Dict]], optional): The checks to run, as
+                (method name, keyword arguments). Defaults to DEFAULT_CHECKS.
+            max_workers (int, optional): Threads evaluating checks, shared by
+                all devices. Defaults to 8.
+            device_workers (int, optional): Devices worked on at the same time.
+                Defaults to 8.
+            timeout (float, optional): Seconds a single device may take, see
+                FleetRunner. Defaults to 300.
+            device_factory (callable, optional): Builds the device object for a
+                hostname. Defaults to CiscoDevice.
+            test_class (type, optional): The test class the checks belong to.
+                Defaults to Access_Sw_Tests.
+            cache (ComplianceCache, optional): Stores the results between runs
+                and skips the checks whose inputs did not change. Defaults to
+                None.
+            changed_only (bool, optional): Leave the results of the skipped
+                checks out of the report. Defaults to False.
+            require_privileged (bool, optional): Fail a device whose session
+                is not privileged instead of running its checks. The prompt
+                is read on the session the outputs are collected over, so no
+                separate login is needed to find out. Defaults to False.
+        """
+        self.checks = DEFAULT_CHECKS if checks is None else checks
+        self.max_workers = max_workers
+        self.device_workers = device_workers
+        self.timeout = timeout
+        self.device_factory = device_factory
+        self.test_class = test_class
+        self.cache = cache
+        self.changed_only = changed_only
+        self.require_privileged = require_privileged
+
+    def run_checks(self, test, pool=None):
+        """
+        Runs the checks of one test object concurrently.
+
+        Args:
+            test (Access_Sw_Tests): The test object of the device.
+            pool (ThreadPoolExecutor, optional): The pool to run the checks on.
+                Defaults to None, which uses a pool of its own.
+
+        Returns:
+            List[Dict]: The check results in the order of the checks. Checks
+            returning a list of results, e.g. check_interface_descriptions,
+            contribute all of them in place.
+
+        Raises:
+            PermissionError: If require_privileged and the session is not
+                privileged.
+            Exception: The first exception raised by a check, in check order.
+        """
+        # Collect before fanning out, so the checks do not race to collect,
+        # along with the commands of the rules given to check_rules.
+        rule_commands = [command for name, kwargs in self.checks for value in kwargs.values()
+                         if isinstance(value, RuleSet) for command in value.commands]
+        snapshot = test.collect(rule_commands)
+        if self.require_privileged and not snapshot.privileged:
+            raise PermissionError(f'{snapshot.hostname} did not give a privileged prompt')
+        stored, entries, cached = {}, {}, {}
+        if self.cache is not None:
+            stored = self.cache.load(snapshot.hostname)
+            for index, (name, kwargs) in enumerate(self.checks):
+                check_id = ComplianceCache.check_id(name, kwargs)
+                digest = self.cache.digest(snapshot, check_id, ComplianceCache.check_commands(name, kwargs, test.CHECK_COMMANDS))
+                entries[check_id] = {'digest': digest}
+                if stored.get(check_id, {}).get('digest') == digest:
+                    cached[index] = stored[check_id]['result']
+
+        own_pool = pool is None
+        if own_pool:
+            pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {index: pool.submit(getattr(test, name), **kwargs)
+                       for index, (name, kwargs) in enumerate(self.checks) if index not in cached}
+            results = []
+            for index, (name, kwargs) in enumerate(self.checks):
+                result = cached[index] if index in cached else futures[index].result()
+                if self.cache is not None:
+                    entries[ComplianceCache.check_id(name, kwargs)]['result'] = result
+                if self.changed_only and index in cached:
+                    continue
+                results.extend(result if isinstance(result, list) else [result])
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+        if self.cache is not None:
+            self.cache.save(snapshot.hostname, entries)
+        return results
+
+    def stream(self, hostnames):
+        """
+        Runs the checks against every host and yields a FleetResult per host as
+        soon as the host is done, so results can be written out while the run
+        goes on. Within a host the results keep the check order.
+
+        Yields:
+            FleetResult: The outcome for each host, see run().
+        """
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        runner = FleetRunner(max_workers=self.device_workers, timeout=self.timeout, device_factory=self.device_factory)
+        try:
+            yield from runner.run(hostnames, task=lambda device: self.run_checks(self.test_class(device), pool))
+        finally:
+            pool.shutdown(wait=False)
+
+    def run(self, hostnames, callback=None):
+        """
+        Runs the checks against every host.
+
+        Args:
+            hostnames (Iterable[str]): The hosts to run against.
+            callback (callable, optional): Called with every FleetResult as soon
+                as its host is done.
+
+        Returns:
+            List[FleetResult]: One per host, in the order the hostnames were
+            given. FleetResult.result holds the list of check results, or
+            FleetResult.error the exception that stopped the host.
+        """
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        runner = FleetRunner(max_workers=self.device_workers, timeout=self.timeout, device_factory=self.device_factory)
+        try:
+            return runner.run_all(hostnames,
+                                  task=lambda device: self.run_checks(self.test_class(device), pool),
+                                  callback=callback)
+        finally:
+            pool.shutdown(wait=False)
@@ -1,6 +1,13 @@
-from netmiko import ConnectHandler
 from pprint import pprint 
+from dataclasses import dataclass, field
+import os
+import re
+import socket
+import threading
+import time
+import urllib.parse
 import environment
+import fast_parsers
 
 
 AD_USERNAME = environment.AD_USERNAME
@@ -9,36 +16,516 @@ VERBOSE = environment.VERBOSE
 DEBUG = environment.DEBUG
 
 
+# netmiko, and genie behind it, take most of a second to import. They are
+# only imported by the first connection or parse, so replayed runs and
+# callers that never connect do not pay for them.
+def ConnectHandler(**kwargs):
+    from netmiko import ConnectHandler
+    return ConnectHandler(**kwargs)
+
+
+def get_structured_data(raw_output, platform=None, command=None):
+    from netmiko.utilities import get_structured_data
+    return get_structured_data(raw_output, platform=platform, command=command)
+
+
+def get_structured_data_genie(raw_output, platform, command):
+    from netmiko.utilities import get_structured_data_genie
+    return get_structured_data_genie(raw_output, platform=platform, command=command)
+
+
+class CommandCache():
+    """
+    Keeps command outputs for a limited time so that several get_* calls
+    asking for the same data share one round trip to the device.
+
+    Entries are keyed by command. A ttl of None keeps entries until they are
+    invalidated, a ttl of 0 disables caching.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key):
+        """
+        Returns a (hit, value) tuple for the given key. Expired entries are
+        dropped and reported as a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        stored_at, value = entry
+        if self.ttl is not None and time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return False, None
+        return True, value
+
+    def set(self, key, value):
+        if self.ttl == 0:
+            return
+        self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, command=None):
+        """
+        Drops the cached output of a single command, or the whole cache when
+        no command is given.
+        """
+        if command is None:
+            self._entries.clear()
+            return
+        self._entries.pop(command, None)
+
+
+class CommandResult():
+    """
+    The raw output of one command, captured once. Parsed views are built on
+    first access of .genie, .textfsm or .fast and memoized, so asking for
+    several parsers never sends the command to the device again.
+
+    When a parser has no template for the command, the parsed view falls back
+    to the raw output, the same way netmiko's use_genie/use_textfsm do. The
+    'fast' parser falls back to genie for commands fast_parsers does not cover.
+
+    When an Instrumentation is given, the time of every parse is recorded in it.
+    """
+
+    # Same helpers netmiko uses for use_genie/use_textfsm.
+    PARSERS = {
+        'genie': lambda output, platform, command: get_structured_data_genie(output, platform=platform, command=command),
+        'textfsm': lambda output, platform, command: get_structured_data(output, platform=platform, command=command),
+        'fast': lambda output, platform, command: (fast_parsers.parse(command, output) if fast_parsers.has_parser(command)
+                                                   else get_structured_data_genie(output, platform=platform, command=command)),
+    }
+
+    def __init__(self, command, raw, platform='cisco_ios', instrumentation=None):
+        self.command = command
+        self.raw = raw
+        self.platform = platform
+        self.instrumentation = instrumentation
+        self._parsed = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'CommandResult(command={self.command!r}, bytes={len(self.raw)})'
+
+    @property
+    def genie(self):
+        return self.parse('genie')
+
+    @property
+    def textfsm(self):
+        return self.parse('textfsm')
+
+    @property
+    def fast(self):
+        return self.parse('fast')
+
+    def parse(self, parser=None):
+        """
+        Returns the output parsed with the given parser, or the raw output when
+        no parser is given.
+
+        Raises:
+            ValueError: If an invalid parser is selected.
+        """
+        if parser is None or parser == '':
+            return self.raw
+        if parser not in self.PARSERS:
+            raise ValueError(f"Invalid parser selected: {parser}")
+        with self._lock:
+            # Held while parsing, so checks running on several threads still
+            # parse each output only once.
+            if parser not in self._parsed:
+                if self.instrumentation is None:
+                    self._parsed[parser] = self.PARSERS[parser](self.raw, self.platform, self.command)
+                else:
+                    with self.instrumentation.timer(self.command, 'parse'):
+                        self._parsed[parser] = self.PARSERS[parser](self.raw, self.platform, self.command)
+        return self._parsed[parser]
+
+
+class SnapshotStore():
+    """
+    Raw CLI outputs on disk, one file per (host, command), laid out as
+    <directory>/<hostname>/<command>.txt with the spaces of the command
+    replaced by underscores, e.g. snapshots/NER0502X01/show_version.txt.
+
+    CiscoDevice writes to it in 'record' mode and serves from it in 'replay'
+    mode, which needs no network at all.
+    """
+
+    # The device prompt is stored next to the command outputs under this name.
+    PROMPT = '_prompt'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, hostname, command):
+        name = urllib.parse.quote(' '.join(command.split()).replace(' ', '_'), safe='')
+        return os.path.join(self.directory, hostname, name + '.txt')
+
+    def read(self, hostname, command):
+        try:
+            with open(self.path(hostname, command), 'r', newline='') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No snapshot of '{command}' for {hostname} in {self.directory}")
+
+    def write(self, hostname, command, output):
+        path = self.path(hostname, command)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            f.write(output)
+
+
+@dataclass
+class DeviceFacts():
+    """
+    A typed view of the facts the compliance checks need, built from a
+    single genie parse of "show version".
+    """
+    hostname: str = None
+    os_version: str = None
+    platform: str = None
+    image_id: str = None
+    chassis: str = None
+    system_image: str = None
+    uptime: str = None
+    stack_modes: dict = field(default_factory=dict)
+
+    @property
+    def number_of_stack_members(self):
+        return len(self.stack_modes)
+
+    @classmethod
+    def from_show_version(cls, parsed):
+        version = parsed['version']
+        switch_num = version.get('switch_num', {})
+        return cls(hostname=version.get('hostname'),
+                   os_version=version.get('version'),
+                   platform=version.get('platform'),
+                   image_id=version.get('image_id'),
+                   chassis=version.get('chassis'),
+                   system_image=version.get('system_image'),
+                   uptime=version.get('uptime'),
+                   stack_modes={sw_id: switch_num[sw_id].get('mode') for sw_id in switch_num})
+
+
+class DeviceSnapshot():
+    """
+    The outputs of a set of commands collected from one device at one point in
+    time, see CiscoDevice.collect(). Checks evaluated against a snapshot read
+    and parse the collected outputs instead of going back to the device, so a
+    run costs one round trip per distinct command however many checks use it.
+    """
+
+    def __init__(self, hostname, results, privileged=None):
+        self.hostname = hostname
+        self.results = results
+        self.privileged = privileged
+
+    def __repr__(self):
+        return f'DeviceSnapshot(hostname={self.hostname!r}, commands={list(self.results)!r})'
+
+    def __contains__(self, command):
+        return command in self.results
+
+    def parse(self, command, parser=None):
+        """
+        Returns the collected output of a command, parsed with the given parser
+        or raw when no parser is given. Each parser runs at most once per output.
+
+        Raises:
+            KeyError: If the command was not collected.
+            ValueError: If an invalid parser is selected.
+        """
+        if command not in self.results:
+            raise KeyError(f"'{command}' was not collected from {self.hostname}")
+        return self.results[command].parse(parser)
+
+
 class CiscoDevice():
 
-    def __init__(self, hostname):
+    PLATFORM = 'cisco_ios'
+    # Commands written ahead of the prompt in one go. IOS buffers type-ahead
+    # input, but only a limited amount of it, so long batches are split.
+    PIPELINE_WINDOW = 8
+
+    MODES = ('live', 'record', 'replay')
+
+    def __init__(self, hostname, cache_ttl=300, mode='live', snapshot_dir=None, instrumentation=None):
         """
         The constructor for the CiscoDevice class.
 
         Args:
             hostname (str): The hostname or IP address of the remote device.
+            cache_ttl (int, optional): How many seconds command outputs are
+                reused before the device is asked again. None keeps them until
+                invalidate_cache() is called, 0 disables caching. Defaults to 300.
+            mode (str, optional): 'live' talks to the device, 'record' talks to
+                the device and saves every raw output to snapshot_dir, 'replay'
+                serves the outputs saved in snapshot_dir without connecting.
+                Defaults to 'live'.
+            snapshot_dir (str, optional): The snapshot directory used by the
+                'record' and 'replay' modes.
+            instrumentation (Instrumentation, optional): Records the time spent
+                connecting, authenticating, finding the prompt, transferring and
+                parsing every command. One instance can be shared by many
+                devices. Defaults to None, which records nothing.
+
+        Raises:
+            ValueError: If an invalid mode is selected, or snapshot_dir is
+                missing for 'record' or 'replay'.
         """
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid mode selected: {mode}")
+        if mode != 'live' and not snapshot_dir:
+            raise ValueError(f"A snapshot_dir is required in {mode} mode")
 
         self.hostname = hostname
         self.cisco_device = { 
-                "device_type": "cisco_ios",
+                "device_type": self.PLATFORM,
                 "host": hostname,
                 "username": AD_USERNAME,
                 "password": AD_PASSWORD,
                 "secret": AD_PASSWORD,
             }
+        self.net_connect = None
+        self.abandoned = False
+        self.cache = CommandCache(ttl=cache_ttl)
+        self.mode = mode
+        self.snapshots = SnapshotStore(snapshot_dir) if snapshot_dir else None
+        self.instrumentation = instrumentation
+
+    def __enter__(self):
+        self.connect()
+        return self
 
-    def execute_command(self, command, parser=None):
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        """
+        Opens the SSH session to the remote device, or returns the one that is
+        already open. A session that has dropped since the last command is
+        replaced by a new one, so callers never see a stale connection.
+
+        Returns:
+            BaseConnection: The authenticated netmiko connection, or None in
+            'replay' mode.
+
+        Raises:
+            ConnectionAbortedError: If the device was abandoned.
+        """
+        if self.abandoned:
+            raise ConnectionAbortedError(f'{self.hostname} was abandoned, it is not logged into again')
+        if self.mode == 'replay':
+            return None
+        if self.net_connect is not None and not self.net_connect.is_alive():
+            self.close()
+        if self.net_connect is None:
+            self.net_connect = self._open_connection()
+        return self.net_connect
+
+    def close(self):
+        """
+        Closes the SSH session to the remote device, if one is open.
+        """
+        if self.net_connect is None:
+            return
+        try:
+            self.net_connect.disconnect()
+        except Exception:
+            pass
+        finally:
+            self.net_connect = None
+
+    def abandon(self):
+        """
+        Closes the session for good: a caller still working on the device
+        fails on its next command instead of logging in again.
+        """
+        self.abandoned = True
+        self.close()
+
+    def _open_connection(self):
+        if self.instrumentation is None:
+            return ConnectHandler(**self.cisco_device)
+
+        # The TCP connection is opened, and timed, here and handed to netmiko,
+        # so the login still takes a single connection and the rest of it is
+        # the SSH handshake and TACACS.
+        start = time.perf_counter()
+        sock = socket.create_connection((self.hostname, self.cisco_device.get('port', 22)),
+                                        timeout=self.cisco_device.get('conn_timeout', 10))
+        connected = time.perf_counter()
+        try:
+            net_connect = ConnectHandler(**self.cisco_device, sock=sock)
+        except Exception:
+            sock.close()
+            raise
+        logged_in = time.perf_counter()
+        self.instrumentation.record(self.instrumentation.LOGIN, 'connect', connected - start, self.hostname)
+        self.instrumentation.record(self.instrumentation.LOGIN, 'authenticate', logged_in - connected, self.hostname)
+        return net_connect
+
+    def _run_on_session(self, net_connect, command):
+        if self.instrumentation is None:
+            return net_connect.send_command(command)
+
+        # send_command looks up the prompt before every command; doing that
+        # here with the same search pattern lets the two phases be timed apart.
+        with self.instrumentation.timer(command, 'prompt', self.hostname):
+            prompt = net_connect.find_prompt()
+        with self.instrumentation.timer(command, 'transfer', self.hostname):
+            output = net_connect.send_command(command, expect_string=re.escape(prompt.strip()))
+        self.instrumentation.record_bytes(command, len(output.encode()))
+        return output
+
+    def _send_command(self, command):
+        if self.mode == 'replay':
+            return self.snapshots.read(self.hostname, command)
+        net_connect = self.connect()
+        try:
+            output = self._run_on_session(net_connect, command)
+        except (OSError, EOFError):
+            # The session went away under us, log in again and retry once.
+            self.close()
+            output = self._run_on_session(self.connect(), command)
+        if self.mode == 'record':
+            self.snapshots.write(self.hostname, command, output)
+        return output
+
+    def _send_pipelined(self, commands, read_timeout=30.0):
+        """
+        Writes the commands to the session without waiting for the prompt in
+        between and then reads the outputs back in order, using the prompt as
+        the separator. Returns a dict of raw outputs keyed by command.
+        """
+        net_connect = self.connect()
+        prompt_start = time.perf_counter()
+        prompt_pattern = re.escape(net_connect.find_prompt())
+        if self.instrumentation is not None:
+            # One prompt lookup serves the whole batch, it is booked on its first command.
+            self.instrumentation.record(commands[0], 'prompt', time.perf_counter() - prompt_start, self.hostname)
+        raw_outputs = {}
+        for start in range(0, len(commands), self.PIPELINE_WINDOW):
+            window = commands[start:start + self.PIPELINE_WINDOW]
+            for command in window:
+                net_connect.write_channel(command + net_connect.RETURN)
+            for command in window:
+                read_start = time.perf_counter()
+                output = net_connect.read_until_pattern(pattern=prompt_pattern, read_timeout=read_timeout)
+                if self.instrumentation is not None:
+                    self.instrumentation.record(command, 'transfer', time.perf_counter() - read_start, self.hostname)
+                    self.instrumentation.record_bytes(command, len(output.encode()))
+                output = net_connect.normalize_linefeeds(output)
+                output = net_connect.strip_command(command, output)
+                raw_outputs[command] = net_connect.strip_prompt(output)
+        if self.mode == 'record':
+            for command, output in raw_outputs.items():
+                self.snapshots.write(self.hostname, command, output)
+        return raw_outputs
+
+    def invalidate_cache(self, command=None):
+        """
+        Forgets cached outputs so the next call goes to the device again.
+
+        Args:
+            command (str, optional): Only forget the outputs of this command.
+                Defaults to None, which clears the whole cache.
+        """
+        self.cache.invalidate(command)
+
+    def capture_command(self, command, use_cache=True):
+        """
+        Runs a command on the remote device and returns its raw output wrapped
+        in a CommandResult, which parses lazily on first access. Results are
+        cached per command for the device's cache_ttl.
+
+        Args:
+            command (str): The command to be executed on the remote device.
+            use_cache (bool, optional): Whether a cached result may be returned
+                instead of running the command. Defaults to True.
+
+        Returns:
+            CommandResult: The captured output of the command.
+        """
+        if use_cache:
+            hit, result = self.cache.get(command)
+            if hit:
+                return result
+        result = CommandResult(command, self._send_command(command), platform=self.PLATFORM,
+                               instrumentation=self.instrumentation)
+        self.cache.set(command, result)
+        return result
+
+    def capture_commands(self, commands, use_cache=True, pipeline=True):
+        """
+        Runs a list of commands over one session and returns a CommandResult
+        per command. Commands that are not cached are pipelined: they are
+        written to the device back to back and the outputs are read afterwards,
+        so a batch costs roughly one round trip instead of one per command. If
+        the pipelined read fails, the batch falls back to one command at a time.
+
+        Args:
+            commands (List[str]): The commands to be executed on the remote device.
+            use_cache (bool, optional): Whether cached results may be returned
+                instead of running the commands. Defaults to True.
+            pipeline (bool, optional): Whether to pipeline the commands.
+                Defaults to True.
+
+        Returns:
+            Dict[str, CommandResult]: The results keyed by command, in the order
+            the commands were given.
+        """
+        results = {}
+        pending = []
+        for command in commands:
+            hit, result = self.cache.get(command) if use_cache else (False, None)
+            if hit:
+                results[command] = result
+            elif command not in pending:
+                pending.append(command)
+
+        if pipeline and len(pending) > 1 and self.mode != 'replay':
+            try:
+                raw_outputs = self._send_pipelined(pending)
+            except Exception:
+                # The session is in an unknown state after a failed read.
+                self.close()
+            else:
+                for command in pending:
+                    results[command] = CommandResult(command, raw_outputs[command], platform=self.PLATFORM,
+                                                     instrumentation=self.instrumentation)
+                    self.cache.set(command, results[command])
+                pending = []
+
+        for command in pending:
+            results[command] = self.capture_command(command, use_cache=False)
+
+        return {command: results[command] for command in commands}
+
+    def execute_command(self, command, parser=None, use_cache=True):
 
         """
         Executes a command on the remote device and returns the output.
-        Optionally, the output can be parsed using either the 'genie' or
-        'textfsm' parser.
+        The command runs over the device's persistent session, which is
+        opened on first use and kept until close() is called. Optionally,
+        the output can be parsed using either the 'genie' or 'textfsm' parser.
+        The raw output is captured once and cached for the device's cache_ttl;
+        each parser runs at most once on it, so callers must not modify the
+        returned objects.
 
         Args:
             command (str): The command to be executed on the remote device.
             parser (str, optional): The parser to use for the command output. 
-                Either 'genie' or 'textfsm'. Defaults to None.
+                Either 'genie', 'textfsm' or 'fast'. 'fast' uses the built-in
+                parsers from fast_parsers, which return genie's dict shape
+                without importing genie. Defaults to None.
+            use_cache (bool, optional): Whether a cached output may be returned
+                instead of running the command. Defaults to True.
 
         Returns:
             Union[str, Dict, List[List[str]]]: The output of the command, parsed
@@ -50,18 +537,9 @@ class CiscoDevice():
             ConnectionError: If there is a problem connecting to the device.
         """
         try:
-            if parser == 'genie':
-                with ConnectHandler(**self.cisco_device) as net_connect:
-                    return net_connect.send_command(command, use_genie=True)
-                
-            if parser == 'textfsm':
-                with ConnectHandler(**self.cisco_device) as net_connect:
-                    return net_connect.send_command(command, use_textfsm=True)
-            elif parser is None or parser == '':
-                with ConnectHandler(**self.cisco_device) as net_connect:
-                    return net_connect.send_command(command)
-            else:
+            if parser not in CommandResult.PARSERS and parser not in (None, ''):
                 raise ValueError(f"Invalid parser selected: {parser}")
+            return self.capture_command(command, use_cache).parse(parser)
         except ValueError as e:
             raise e
         except TypeError as e:
@@ -71,18 +549,67 @@ class CiscoDevice():
         except Exception as e:
             raise e
 
+    def execute_commands(self, commands, parser=None, use_cache=True, pipeline=True):
+        """
+        Executes a list of commands over one session and returns their outputs,
+        see capture_commands() for how the batch is sent.
+
+        Args:
+            commands (List[str]): The commands to be executed on the remote device.
+            parser (str, optional): The parser to use for every command output.
+                Either 'genie', 'textfsm' or 'fast'. Defaults to None.
+            use_cache (bool, optional): Whether cached outputs may be returned
+                instead of running the commands. Defaults to True.
+            pipeline (bool, optional): Whether to pipeline the commands.
+                Defaults to True.
+
+        Returns:
+            Dict[str, Union[str, Dict, List]]: The outputs keyed by command, in
+            the order the commands were given.
+
+        Raises:
+            ValueError: If an invalid parser is selected.
+        """
+        if parser not in CommandResult.PARSERS and parser not in (None, ''):
+            raise ValueError(f"Invalid parser selected: {parser}")
+        results = self.capture_commands(commands, use_cache=use_cache, pipeline=pipeline)
+        return {command: result.parse(parser) for command, result in results.items()}
+
+    def collect(self, commands, prompt=True, use_cache=True):
+        """
+        Runs every command once, see capture_commands(), and returns the
+        outputs as a DeviceSnapshot to evaluate checks against.
+
+        Args:
+            commands (List[str]): The commands to be collected.
+            prompt (bool, optional): Whether to also record if the session is
+                privileged, see find_prompt(). Defaults to True.
+            use_cache (bool, optional): Whether cached outputs may be used.
+                Defaults to True.
+
+        Returns:
+            DeviceSnapshot: The collected outputs.
+        """
+        results = self.capture_commands(commands, use_cache=use_cache)
+        privileged = self.find_prompt() if prompt else None
+        return DeviceSnapshot(self.hostname, results, privileged=privileged)
+
     def find_prompt(self):
 
-        with ConnectHandler(**self.cisco_device) as net_connect:
-                    prompt =  net_connect.find_prompt()
-                    
-                    if prompt.endswith('#'):
-                        return True
-                    elif prompt.endswith('>'):
-                        return False
-                    else:
-                        # handle unexpected prompt format
-                        raise ValueError(f"Unexpected prompt format: {prompt}")
+        if self.mode == 'replay':
+            prompt = self.snapshots.read(self.hostname, SnapshotStore.PROMPT)
+        else:
+            prompt =  self.connect().find_prompt()
+            if self.mode == 'record':
+                self.snapshots.write(self.hostname, SnapshotStore.PROMPT, prompt)
+        
+        if prompt.endswith('#'):
+            return True
+        elif prompt.endswith('>'):
+            return False
+        else:
+            # handle unexpected prompt format
+            raise ValueError(f"Unexpected prompt format: {prompt}")
                     
                 
     def get_show_version(self, parser=None):
@@ -138,6 +665,14 @@ class CiscoDevice():
     def get_os_version_info(self, parser='genie'):
         command = "show version"
         return self.execute_command(command, parser)['version']['version']
+
+    def get_facts(self, parser='genie'):
+        """
+        Returns the device facts (OS version, platform, stack modes, ...) as a
+        DeviceFacts object built from a single parse of "show version".
+        """
+        command = "show version"
+        return DeviceFacts.from_show_version(self.execute_command(command, parser))
     
 
     def get_interface_description(self, parser=None):
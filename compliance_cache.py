@@ -0,0 +1,164 @@
+"""
+The compliance_cache module lets scheduled runs skip the checks whose inputs
+did not change since the last run.
+
+A check result is stored under a digest of everything it depends on: the raw
+outputs of the commands the check reads (see Access_Sw_Tests.CHECK_COMMANDS),
+whether the session was privileged, the check's arguments, the sources of
+the standards, rules, checks and fast parsers, and the versions of the
+installed parser packages. On the next run a check whose digest is the same
+is not evaluated again, its stored result is reused. Editing standards.py,
+any check or parser, or upgrading genie, invalidates every stored result.
+A RuleSet argument is identified by its rules, see RuleSet.fingerprint.
+
+Values that change on every run without changing compliance, like the uptime
+in "show version" or the CDP hold times, are left out of the digest.
+
+Results are stored as one JSON file per host in the cache directory. The
+cache is used through CheckRunner(cache=ComplianceCache(directory)).
+"""
+
+from importlib import metadata
+import hashlib
+import json
+import os
+import re
+import threading
+import device_integration_tests
+import fast_parsers
+import rules
+import standards
+
+
+_UPTIME = re.compile(r'^.*(?: uptime is |Uptime for this control processor is ).*$', re.M)
+
+
+def _without_uptime(output):
+    return _UPTIME.sub('', output)
+
+
+def _without_hold_times(output):
+    lines = output.splitlines()
+    for index, line in enumerate(lines):
+        if 'Hold' in line and 'Capability' in line:
+            start, end = line.index('Hold') - 2, line.index('Capability')
+            break
+    else:
+        return output
+    # IOS wraps long device IDs onto their own line, so the columns stay put.
+    return '\n'.join(lines[:index + 1] + [line[:start] + re.sub(r'\d', ' ', line[start:end]) + line[end:]
+                                          for line in lines[index + 1:]])
+
+
+# Removes the parts of an output that change between runs without changing
+# any check result, keyed by command.
+NORMALIZERS = {
+    'show version': _without_uptime,
+    'show cdp neighbor': _without_hold_times,
+    'show cdp neighbors': _without_hold_times,
+}
+
+DEFAULT_SOURCES = (standards.__file__, rules.__file__, device_integration_tests.__file__, fast_parsers.__file__)
+
+# The packages that parse the outputs; their versions are part of every digest.
+PARSER_PACKAGES = ('genie', 'genie.libs.parser', 'ntc_templates')
+
+
+def _package_version(package):
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _argument_id(value):
+    # The id of a check argument json cannot encode.
+    if isinstance(value, rules.RuleSet):
+        return f'RuleSet:{value.fingerprint}'
+    return str(value)
+
+
+class ComplianceCache():
+
+    def __init__(self, directory, sources=DEFAULT_SOURCES):
+        """
+        The constructor for the ComplianceCache class.
+
+        Args:
+            directory (str): Where the stored results are kept, one file per host.
+            sources (Iterable[str], optional): Files whose content is part of
+                every digest. Defaults to the standards, rules,
+                device_integration_tests and fast_parsers modules.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        version = hashlib.sha256()
+        for source in sources:
+            with open(source, 'rb') as f:
+                version.update(f.read())
+        for package in PARSER_PACKAGES:
+            version.update(f'\0{package}={_package_version(package)}'.encode())
+        self.version = version.hexdigest()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, hostname):
+        return os.path.join(self.directory, hostname + '.json')
+
+    def load(self, hostname):
+        """
+        Returns the results stored for a host as {check id: {'digest', 'result'}}.
+        A missing or unreadable file gives an empty dict.
+        """
+        try:
+            with open(self._path(hostname), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, hostname, entries):
+        """
+        Stores the results of a host, replacing the previous ones. The file is
+        written under a temporary name first, so an interrupted run never
+        leaves a half written file behind.
+        """
+        path = self._path(hostname)
+        with self._lock:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(entries, f, default=str)
+            os.replace(path + '.tmp', path)
+
+    def digest(self, snapshot, check_id, commands=None):
+        """
+        Returns the digest of the inputs of a check.
+
+        Args:
+            snapshot (DeviceSnapshot): The collected device outputs.
+            check_id (str): The check and its arguments, see check_id().
+            commands (List[str], optional): The commands the check reads.
+                Defaults to None, which uses every command of the snapshot.
+        """
+        digest = hashlib.sha256()
+        digest.update(self.version.encode())
+        digest.update(check_id.encode())
+        digest.update(repr(snapshot.privileged).encode())
+        for command in sorted(snapshot.results if commands is None else commands):
+            raw = snapshot.parse(command) if command in snapshot else ''
+            raw = NORMALIZERS.get(' '.join(command.split()), str)(raw)
+            digest.update(b'\0' + command.encode() + b'\0' + raw.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def check_id(name, kwargs):
+        return name + json.dumps(kwargs, sort_keys=True, default=_argument_id)
+
+    @staticmethod
+    def check_commands(name, kwargs, check_commands):
+        """
+        Returns the commands a check reads: those of the RuleSets among its
+        arguments when it is given any, e.g. check_rules(rules=...), and
+        check_commands[name] otherwise. None when they are not known.
+        """
+        rule_sets = [value for value in kwargs.values() if isinstance(value, rules.RuleSet)]
+        if rule_sets:
+            return [command for rule_set in rule_sets for command in rule_set.commands]
+        return check_commands.get(name)
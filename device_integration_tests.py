@@ -1,6 +1,12 @@
-from cisco_device import CiscoDevice
+from cisco_device import CiscoDevice, DeviceFacts, DeviceSnapshot
+from rules import RuleSet
 import standards
 import environment
+import threading
+
+
+# standards.RULES compiled once for every device.
+STANDARD_RULES = RuleSet(standards.RULES)
 
 
 class Cellular_Router_Tests():
@@ -22,18 +28,80 @@ class Cellular_Router_Tests():
 class Access_Sw_Tests():
 
     TEST_NUMBER = 1
+    # Checks may run on several threads, see check_runner.
+    _TEST_NUMBER_LOCK = threading.Lock()
+
+    # Every command the checks read. They are collected from the device once,
+    # in one batch, and all checks are evaluated against that snapshot.
+    REQUIRED_COMMANDS = ['show version',
+                         'show ip interface brief',
+                         'show interfaces description',
+                         'show cdp neighbor',
+                         'show platform',
+                         'show environment power all']
+
+    # The commands each check reads, used to tell whether a check's inputs
+    # changed since the last run, see compliance_cache. Checks not listed
+    # depend on every collected command.
+    CHECK_COMMANDS = {'check_os_version': ['show version'],
+                      'check_number_of_sw_per_stack': ['show version'],
+                      'check_modes_of_sw_stack': ['show version'],
+                      'check_device_interface_status': ['show ip interface brief'],
+                      'check_cdp_neighbor_number': ['show cdp neighbor'],
+                      'check_cdp_cellular_router_interface': ['show cdp neighbor'],
+                      'check_platform': ['show platform'],
+                      'check_interface_description': ['show interfaces description'],
+                      'check_interface_descriptions': ['show interfaces description'],
+                      'check_rules': STANDARD_RULES.commands,
+                      'check_aaa_configuration': [],
+                      'check_psu_status': ['show environment power all'],
+                      'check_number_of_psu': ['show environment power all', 'show version']}
     
-    def __init__(self, device:object) -> None:
-        
+    def __init__(self, device:object, snapshot=None) -> None:
+        """
+        Args:
+            device (CiscoDevice): The device under test.
+            snapshot (DeviceSnapshot, optional): Outputs already collected from
+                the device. Defaults to None, which collects REQUIRED_COMMANDS
+                on the first check.
+        """
         self.device = device
+        self._snapshot = snapshot
+
+    @property
+    def snapshot(self):
+        if self._snapshot is None:
+            self.collect()
+        return self._snapshot
+
+    def collect(self, commands=()):
+        """
+        Collects REQUIRED_COMMANDS, the commands of STANDARD_RULES and the
+        given commands from the device, replacing the snapshot the checks are
+        evaluated against.
+
+        Args:
+            commands (List[str], optional): More commands to collect, e.g. the
+                commands of the rules given to check_rules().
+        """
+        self._snapshot = self.device.collect(list(dict.fromkeys(self.REQUIRED_COMMANDS + STANDARD_RULES.commands + list(commands))))
+        return self._snapshot
+
+    @classmethod
+    def count_test(cls):
+        with cls._TEST_NUMBER_LOCK:
+            cls.TEST_NUMBER +=1
+
+    def _facts(self):
+        return DeviceFacts.from_show_version(self.snapshot.parse('show version', 'genie'))
 
 
     def check_os_version(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : System OS Version Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_os_version_info()
+        response = self._facts().os_version
         if response == standards.SW_9300_OS_VERSION:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'PASSED',
                     'response': response,
                     'test_name': 'Platform OS Test',
@@ -42,7 +110,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
         else:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'FAILED',
                     'response': response,
                     'test_name': 'Platform OS Test',
@@ -55,9 +123,9 @@ class Access_Sw_Tests():
     def check_number_of_sw_per_stack(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Switch Stack Member Count - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_number_of_sw_stack_info()
+        response = self._facts().number_of_stack_members
         if response == standards.SW_NUM_OF_STACK_MEMBER:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'PASSED',
                     'response': response,
                     'test_name': 'Number of CDP Neighbor per device.',
@@ -66,7 +134,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
         else:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'FAILED',
                     'response': response,
                     'test_name': 'Number of CDP Neighbor per device.',
@@ -78,9 +146,9 @@ class Access_Sw_Tests():
     def check_modes_of_sw_stack(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Switch Stack Mode Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_modes_of_sw_stack_info()
+        response = self._facts().stack_modes
         if all(value == standards.SW_MODE for value in response.values()):
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'PASSED',
                     'response': str(response),
                     'test_name': 'Device Mode Test.',
@@ -89,7 +157,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
         else:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'FAILED',
                     'response': str(response),
                     'test_name': 'Device Mode Test.',
@@ -102,9 +170,9 @@ class Access_Sw_Tests():
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Switch Interface Status Test- {interface} - \033[1;33m{self.device.hostname}\033[0m')
         if interface:
-            response = self.device.get_ip_interface_brief('genie')['interface'][interface]
+            response = self.snapshot.parse('show ip interface brief', 'genie')['interface'][interface]
             if response['status'] == 'up' and response['protocol'] == 'up':
-                Access_Sw_Tests.TEST_NUMBER +=1
+                Access_Sw_Tests.count_test()
                 return {'test_status': 'PASSED',
                     'response': 'Status: ' + str(response['status']) + '  -  ' + ' Protocol : ' + str(response['protocol']),
                     'test_name': f'Device Interface {interface} Status Test.',
@@ -113,7 +181,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
             else:
-                Access_Sw_Tests.TEST_NUMBER +=1
+                Access_Sw_Tests.count_test()
                 return {'test_status': 'FAILED',
                     'response': 'Status: ' + str(response['status']) + '  -  ' + ' Protocol : ' + str(response['protocol']),
                     'test_name': f'Device Interface {interface} Status Test.',
@@ -121,15 +189,15 @@ class Access_Sw_Tests():
                      'italic':False,
                      'font_color':'FFFF0000'
                        }
-        return self.device.get_ip_interface_brief('genie')
+        return self.snapshot.parse('show ip interface brief', 'genie')
     
 
     def check_cdp_neighbor_number(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Switch CDP Neighbor Number Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = len(self.device.get_cdp_neighbor('genie')['cdp']['index'].keys())
+        response = len(self.snapshot.parse('show cdp neighbor', 'genie')['cdp']['index'].keys())
         if response > 2:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'PASSED',
                     'response': response,
                     'test_name': 'Number of CDP Neighbor per device.',
@@ -138,7 +206,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
         else:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'FAILED',
                     'response': response,
                     'test_name': 'Number of CDP Neighbor per device.',
@@ -162,10 +230,10 @@ class Access_Sw_Tests():
         """
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Switch POLR Interface Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_cdp_neighbor('genie')['cdp']['index']
+        response = self.snapshot.parse('show cdp neighbor', 'genie')['cdp']['index']
         for dev in response.keys():
             if response[dev]['local_interface'] == 'GigabitEthernet1/0/9' and ("C819" in response[dev]['platform'] or "C1111" in response[dev]['platform']):
-                Access_Sw_Tests.TEST_NUMBER +=1
+                Access_Sw_Tests.count_test()
                 return {'test_status': 'PASSED',
                     'response': 'GigabitEthernet1/0/9 is connected to Cellular Router',
                     'test_name': 'Switch Stack POLR connection Test',
@@ -173,7 +241,7 @@ class Access_Sw_Tests():
                      'italic':False,
                      'font_color':'FF000000'
                        }
-        Access_Sw_Tests.TEST_NUMBER +=1
+        Access_Sw_Tests.count_test()
         return {'test_status': 'FAILED',
                     'response': 'GigabitEthernet1/0/9 is not connected to Cellular Router',
                     'test_name': 'Switch Stack POLR connection Test.',
@@ -183,19 +251,19 @@ class Access_Sw_Tests():
                        }
     
     def check_psu_status(self):
-        response = self.device.get_ps_info('genie')['slot']
+        response = self.snapshot.parse('show environment power all', 'genie')['slot']
         return response
 
     def check_platform(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Switch Platform Test \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_platform('genie')['slot']
+        response = self.snapshot.parse('show platform', 'genie')['slot']
         platform_list = []
         for dev in list(response.keys()):
             platform_list.append(list(response[dev]["rp"].keys()))
         for inner_list in platform_list:
             if standards.SW_9300_PLATFORM in inner_list[0] or standards.SW_3660_PLATFORM in inner_list[0]:
-                Access_Sw_Tests.TEST_NUMBER +=1
+                Access_Sw_Tests.count_test()
                 return {'test_status': 'PASSED',
                     'response': str(platform_list),
                     'test_name': 'Switch Platform Test',
@@ -204,7 +272,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
             else:
-                Access_Sw_Tests.TEST_NUMBER +=1
+                Access_Sw_Tests.count_test()
                 return {'test_status': 'FAILED',
                     'response': str(platform_list),
                     'test_name': 'Switch Platform Test',
@@ -216,9 +284,12 @@ class Access_Sw_Tests():
     def check_interface_description(self, interface=None):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Interface Description Test -  {interface} - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_interface_description_individual(interface=interface)
+        try:
+            response = self.snapshot.parse('show interfaces description', 'genie')['interfaces'][interface]['description']
+        except KeyError:
+            raise ValueError(f"interface {interface} not found")
         if response == standards.int_description_dict[interface]:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'PASSED',
                     'response': response,
                     'test_name': f'{interface} description test',
@@ -227,7 +298,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
         else:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'FAILED',
                     'response': response,
                     'test_name': f'{interface} description test',
@@ -236,12 +307,91 @@ class Access_Sw_Tests():
                      'font_color':'FFFF0000'
                        }
 
+    def check_interface_descriptions(self, standard=None):
+        """
+        Audits the description of every port of the stack in one pass, joining
+        the parsed "show interfaces description" against the standards map.
+
+        Besides a result per port of the standard, a FAILED result is returned
+        for every standard port the device does not have and for every device
+        port on a module the standard covers (e.g. GigabitEthernet2/0/) that
+        the standard does not list. Ports of other modules, VLANs and uplinks
+        are not audited.
+
+        Args:
+            standard (Dict[str, str], optional): The expected description per
+                interface. Defaults to standards.int_description_dict.
+
+        Returns:
+            List[Dict]: One result per audited interface, in the same format as
+            check_interface_description().
+        """
+        if environment.VERBOSE:
+            print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Interface Description Audit - \033[1;33m{self.device.hostname}\033[0m')
+        if standard is None:
+            standard = standards.int_description_dict
+        interfaces = self.snapshot.parse('show interfaces description', 'genie').get('interfaces', {})
+        # A module is an interface name without its port number, e.g. GigabitEthernet1/0/.
+        modules = {interface.rstrip('0123456789') for interface in standard}
+
+        results = []
+        for interface, expected in standard.items():
+            if interface not in interfaces:
+                results.append(self._description_result(interface, 'FAILED', 'Interface not found on the device'))
+                continue
+            response = interfaces[interface].get('description', '')
+            results.append(self._description_result(interface, 'PASSED' if response == expected else 'FAILED', response))
+        for interface, details in interfaces.items():
+            if interface not in standard and interface.rstrip('0123456789') in modules:
+                results.append(self._description_result(interface, 'FAILED',
+                                                         f"Interface not in the standards, description: {details.get('description', '')}"))
+        return results
+
+    def _description_result(self, interface, test_status, response):
+        Access_Sw_Tests.count_test()
+        return {'test_status': test_status,
+                'response': response,
+                'test_name': f'{interface} description test',
+                'bold':False,
+                'italic':False,
+                'font_color':'FF000000' if test_status == 'PASSED' else 'FFFF0000'
+                }
+
+    def check_rules(self, rules=None):
+        """
+        Evaluates declarative rules against the snapshot. Commands the rules
+        need that are not in the snapshot yet are collected in one batch; the
+        snapshot itself is left as it is, as other checks may be reading it
+        on other threads. Collect them up front with collect(rules.commands)
+        to share them.
+
+        Args:
+            rules (RuleSet, optional): The rules to evaluate. Defaults to
+                STANDARD_RULES, compiled from standards.RULES.
+
+        Returns:
+            List[Dict]: One result per rule, in rule order.
+        """
+        if rules is None:
+            rules = STANDARD_RULES
+        if environment.VERBOSE:
+            print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Standards Rules Test ({len(rules)} rules) - \033[1;33m{self.device.hostname}\033[0m')
+        snapshot = self.snapshot
+        missing = [command for command in rules.commands if command not in snapshot]
+        if missing:
+            snapshot = DeviceSnapshot(snapshot.hostname, {**snapshot.results, **self.device.capture_commands(missing)},
+                                      privileged=snapshot.privileged)
+        results = rules.evaluate(snapshot)
+        for _ in results:
+            Access_Sw_Tests.count_test()
+        return results
+
     def check_aaa_configuration(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Device AAA Configuration Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.find_prompt()
+        response = self.snapshot.privileged
         if response:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'PASSED',
                     'response': response,
                     'test_name': 'Device AAA Configuration Test',
@@ -250,7 +400,7 @@ class Access_Sw_Tests():
                      'font_color':'FF000000'
                        }
         else:
-            Access_Sw_Tests.TEST_NUMBER +=1
+            Access_Sw_Tests.count_test()
             return {'test_status': 'FAILED',
                     'response': response,
                     'test_name': 'Device AAA Configuration Test',
@@ -262,7 +412,7 @@ class Access_Sw_Tests():
     def check_psu_status(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Device PSU Status Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_ps_info('textfsm')
+        response = self.snapshot.parse('show environment power all', 'textfsm')
         for d in response:
             if d['status'] != 'OK' or d['sys_pwr'] != 'Good':
                 return {'test_status': 'FAILED',
@@ -283,9 +433,9 @@ class Access_Sw_Tests():
     def check_number_of_psu(self):
         if environment.VERBOSE:
             print(f'\033[1;32mTest-{Access_Sw_Tests.TEST_NUMBER}\033[0m : Device Active PSU Number Test - \033[1;33m{self.device.hostname}\033[0m')
-        response = self.device.get_ps_info('textfsm')
+        response = self.snapshot.parse('show environment power all', 'textfsm')
         
-        if int(len(response)) == int(self.device.get_number_of_sw_stack_info()):
+        if int(len(response)) == int(self._facts().number_of_stack_members):
             return {'test_status': 'PASSED',
                     'response': f'Active PSU number is {len(response)}',
                     'test_name': 'Device Active PSU Number Test',
@@ -0,0 +1,340 @@
+"""
+The fast_parsers module holds lightweight parsers for the show commands the
+compliance checks run most often:
+
+- show ip interface brief
+- show interfaces description
+- show cdp neighbors
+- show version
+
+Each parser is built from precompiled regular expressions and returns the
+same dict as the genie parser for the same command on the Catalyst 9000
+outputs they were written for, keys and values (see each parser for the
+keys; Tests/unit/test_fast_parsers.py compares both ways with genie). They
+need no genie import, which keeps collector startup short, and they are
+cheap enough that parsing no longer costs more than the SSH round trip.
+
+Use them through CiscoDevice.execute_command(command, parser='fast'), or
+directly with parse(command, output).
+"""
+
+import re
+
+
+# Abbreviations IOS uses in "show interfaces description" and
+# "show cdp neighbors", expanded the same way genie's Common.convert_intf_name
+# does. Unknown prefixes (e.g. "Ap") are left untouched, as genie does.
+INTERFACE_ABBREVIATIONS = {
+    'Eth': 'Ethernet',
+    'Et': 'Ethernet',
+    'Fa': 'FastEthernet',
+    'Fas': 'FastEthernet',
+    'Gi': 'GigabitEthernet',
+    'Gig': 'GigabitEthernet',
+    'GE': 'GigabitEthernet',
+    'Tw': 'TwoGigabitEthernet',
+    'Two': 'TwoGigabitEthernet',
+    'Te': 'TenGigabitEthernet',
+    'Ten': 'TenGigabitEthernet',
+    'Twe': 'TwentyFiveGigE',
+    'TF': 'TwentyFiveGigE',
+    'Fo': 'FortyGigabitEthernet',
+    'For': 'FortyGigabitEthernet',
+    'Hu': 'HundredGigE',
+    'Hun': 'HundredGigE',
+    'Lo': 'Loopback',
+    'Vl': 'Vlan',
+    'Po': 'Port-channel',
+    'Tu': 'Tunnel',
+    'Se': 'Serial',
+    'Mu': 'Multilink',
+    'Di': 'Dialer',
+    'Vi': 'Virtual-Access',
+}
+
+_INTERFACE_NAME = re.compile(r'^(?P<type>[a-zA-Z\-]+)\s*(?P<number>\d[\d/.:]*)$')
+
+
+def convert_interface_name(name):
+    """
+    Expands an abbreviated interface name, e.g. "Gi1/0/1" or "Gig 1/0/1" to
+    "GigabitEthernet1/0/1". Names that are already complete, or whose prefix
+    is not a known abbreviation, are returned unchanged.
+    """
+    match = _INTERFACE_NAME.match(name.strip())
+    if not match or match.group('type') not in INTERFACE_ABBREVIATIONS:
+        return name.strip()
+    return INTERFACE_ABBREVIATIONS[match.group('type')] + match.group('number')
+
+
+_IP_INTERFACE_BRIEF = re.compile(
+    r'^(?P<interface>[a-zA-Z0-9/.\-]+)\s+(?P<ip_address>[a-z0-9.]+)\s+(?P<interface_is_ok>[A-Z]+)\s+'
+    r'(?P<method>[a-zA-Z]+)\s+(?P<status>up|down|administratively down|deleted)\s+(?P<protocol>\w+)$')
+
+
+def parse_ip_interface_brief(output):
+    """
+    Parses "show ip interface brief" into
+    {'interface': {<name>: {'ip_address', 'interface_is_ok', 'method', 'status', 'protocol'}}}.
+    """
+    interfaces = {}
+    for line in output.splitlines():
+        match = _IP_INTERFACE_BRIEF.match(line.strip())
+        if match:
+            group = match.groupdict()
+            interface = group.pop('interface')
+            interfaces[interface] = group
+    return {'interface': interfaces} if interfaces else {}
+
+
+_INTERFACES_DESCRIPTION = re.compile(
+    r'^(?P<interface>\S+)\s+(?P<status>up|down|admin down|deleted)\s+(?P<protocol>up|down)(?:\s+(?P<description>.*))?$')
+
+
+def parse_interfaces_description(output):
+    """
+    Parses "show interfaces description" into
+    {'interfaces': {<name>: {'status', 'protocol', 'description'}}}.
+    """
+    interfaces = {}
+    for line in output.splitlines():
+        match = _INTERFACES_DESCRIPTION.match(line.strip())
+        if match:
+            interfaces[convert_interface_name(match.group('interface'))] = {
+                'status': match.group('status'),
+                'protocol': match.group('protocol'),
+                'description': match.group('description') or '',
+            }
+    return {'interfaces': interfaces} if interfaces else {}
+
+
+_CDP_TOTAL = re.compile(r'^Total cdp entries displayed ?: ?(?P<total_entries>\d+)$')
+_CDP_HEADER = re.compile(r'^Device[ -]ID\s+Local Intrfce\s+Hold', re.I)
+_CDP_ENTRY = re.compile(
+    r'^(?P<local_interface>[a-zA-Z\-]+ ?\d[\d/.:]*)\s+(?P<hold_time>\d+)\s+'
+    r'(?:(?P<capability>(?:[RTBSHIrPDCMsV] )*[RTBSHIrPDCMsV])\s+)?'
+    r'(?P<platform>.*?)\s*(?P<port_id>[a-zA-Z\-]+ ?\d[\d/.:]*|\S+)$')
+
+
+def parse_cdp_neighbors(output):
+    """
+    Parses "show cdp neighbors" into
+    {'cdp': {'index': {1: {'device_id', 'local_interface', 'hold_time',
+    'capability', 'platform', 'port_id'}, ...}, 'total_entries': <count>}}.
+
+    Long device IDs that IOS wraps onto their own line are joined with the
+    line that follows them.
+    """
+    lines = iter(output.splitlines())
+    for line in lines:
+        if _CDP_HEADER.match(line):
+            break
+    else:
+        return {}
+
+    neighbors = {}
+    total_entries = None
+    device_id = None
+    for line in lines:
+        match = _CDP_TOTAL.match(line.strip())
+        if match:
+            total_entries = int(match.group('total_entries'))
+            continue
+        if not line.strip():
+            continue
+        if not line[0].isspace():
+            # A new entry starts with the device ID, possibly alone on its line.
+            device_id, _, line = line.partition(' ')
+            if not line.strip():
+                continue
+        match = _CDP_ENTRY.match(line.strip())
+        if device_id is None or not match:
+            continue
+        neighbors[len(neighbors) + 1] = {
+            'device_id': device_id,
+            'local_interface': convert_interface_name(match.group('local_interface')),
+            'hold_time': int(match.group('hold_time')),
+            'capability': match.group('capability') or '',
+            'platform': match.group('platform'),
+            'port_id': convert_interface_name(match.group('port_id')),
+        }
+        device_id = None
+    if not neighbors:
+        return {}
+    cdp = {'index': neighbors}
+    if total_entries is not None:
+        cdp['total_entries'] = total_entries
+    return {'cdp': cdp}
+
+
+_VERSION_LINES = [
+    re.compile(r'^Cisco IOS XE Software, Version (?P<xe_version>\S+)$'),
+    re.compile(r'^Cisco IOS Software(?: \[(?P<location>\S+)\])?, (?P<platform>.+) Software \((?P<image_id>[\w\-]+)\), '
+               r'(?:Experimental )?Version (?P<version>[\w.:()\-]+),?(?: (?P<label>.+))?$'),
+    re.compile(r'^Copyright \(c\) (?P<copyright_years>\d+-\d+)'),
+    re.compile(r'^Compiled (?P<compiled_date>.+) by (?P<compiled_by>\S+)$'),
+    re.compile(r'^ROM: (?P<rom>.+)$'),
+    re.compile(r'^BOOTLDR: (?P<bootldr>.+)$'),
+    re.compile(r'^(?P<hostname>\S+) uptime is (?P<uptime>.+)$'),
+    re.compile(r'^Uptime for this control processor is (?P<uptime_this_cp>.+)$'),
+    re.compile(r'^System returned to ROM by (?P<returned_to_rom_by>.+)$'),
+    re.compile(r'^System image file is "(?P<system_image>[^"]+)"$'),
+    re.compile(r'^Last reload reason: (?P<last_reload_reason>.+)$'),
+    re.compile(r'^[Cc]isco (?P<chassis>\S+) \((?P<processor_type>[^)]+)\) processor .*with '
+               r'(?P<main_mem>\d+)K(?:/\d+K)? bytes of memory\.$'),
+    re.compile(r'^Processor board ID (?P<chassis_sn>\S+)$'),
+    re.compile(r'^Configuration register is (?P<curr_config_register>\S+)'),
+]
+_VERSION_SWITCH = re.compile(
+    r'^(?P<active>\*)?\s*(?P<switch>\d+)\s+(?P<ports>\d+)\s+(?P<model>\S+)\s+(?P<sw_ver>\S+)\s+'
+    r'(?P<sw_image>\S+)\s+(?P<mode>\S+)$')
+_VERSION_INTERFACES = re.compile(r'^(?P<count>\d+) (?P<type>.+?) interfaces?$')
+_VERSION_DISK = re.compile(r'^(?P<disk_size>\d+)K bytes of (?P<type_of_disk>.+) at (?P<disk>\S+)$')
+_VERSION_MEMORY = re.compile(r'^(?P<size>\d+)K bytes of (?P<type>[\w\- ]+) memory\.$')
+_VERSION_LICENSE = re.compile(r'^(?P<license_level>[\w\-]+)\s{2,}(?P<license_type>(?:\w+ )+)\s{2,}'
+                              r'(?P<next_reload_license_level>\S+)$')
+_VERSION_MEMBER = re.compile(r'^[Ss]witch 0(?P<switch>\d+)$')
+_VERSION_MEMBER_DETAIL = re.compile(r'^(?P<name>[A-Za-z ]+?) +: +(?P<value>.+)$')
+# The per stack member lines of "show version", by genie key.
+MEMBER_DETAILS = {
+    'Switch uptime': 'uptime',
+    'Base Ethernet MAC Address': 'mac_address',
+    'Motherboard Assembly Number': 'mb_assembly_num',
+    'Motherboard Serial Number': 'mb_sn',
+    'Model Revision Number': 'model_rev_num',
+    'Motherboard Revision Number': 'mb_rev_num',
+    'Model Number': 'model_num',
+    'System Serial Number': 'system_sn',
+    'CLEI Code Number': 'clei_code_num',
+}
+
+
+def _router_type(chassis):
+    # The router families genie names, the chassis for everything else.
+    for family, name in (('C3850', 'Edison'), ('C3650', 'Edison'), ('ASR1', 'ASR1K'),
+                         ('CSR1000V', 'CSR1000V'), ('C11', 'ISR')):
+        if family in chassis:
+            return name
+    return chassis
+
+
+def parse_version(output):
+    """
+    Parses "show version" into {'version': {...}} with the keys genie returns
+    for the Catalyst 9000 stacks: version, version_short, xe_version, os,
+    platform, image_id, image_type, label, location, copyright_years,
+    hostname, uptime, uptime_this_cp, system_image, chassis, chassis_sn,
+    rtr_type, processor_type, main_mem, mem_size, number_of_intfs, disks,
+    rom, bootldr, compiled_date, compiled_by, returned_to_rom_by,
+    last_reload_reason, curr_config_register, license_package (and
+    license_level, license_type and next_reload_license_level for a single
+    package) and switch_num (per stack member: active, ports, model, sw_ver,
+    sw_image, mode, uptime and the hardware details of MEMBER_DETAILS).
+    Lines genie reads on other platforms, e.g. the CPU or power supply
+    details, are not parsed.
+    """
+    version = {}
+    switch_num = {}
+    # The hardware details of the active member come first, without a header.
+    active_details = {}
+    details = active_details
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _VERSION_SWITCH.match(line)
+        if match:
+            group = match.groupdict()
+            switch = group.pop('switch')
+            group['active'] = bool(group['active'])
+            switch_num.setdefault(switch, {}).update(group)
+            continue
+        match = _VERSION_MEMBER.match(line)
+        if match:
+            details = switch_num.setdefault(match.group('switch'), {})
+            continue
+        match = _VERSION_MEMBER_DETAIL.match(line)
+        if match and match.group('name') in MEMBER_DETAILS:
+            details.setdefault(MEMBER_DETAILS[match.group('name')], match.group('value'))
+            continue
+        if line.startswith('Technical Support: http'):
+            version.setdefault('image_type', 'production image')
+            continue
+        match = _VERSION_INTERFACES.match(line)
+        if match:
+            version.setdefault('number_of_intfs', {})[match.group('type')] = match.group('count')
+            continue
+        match = _VERSION_DISK.match(line)
+        if match:
+            version.setdefault('disks', {})[match.group('disk')] = {'disk_size': match.group('disk_size'),
+                                                                     'type_of_disk': match.group('type_of_disk')}
+            continue
+        match = _VERSION_MEMORY.match(line)
+        if match:
+            version.setdefault('mem_size', {})[match.group('type')] = match.group('size')
+            continue
+        match = _VERSION_LICENSE.match(line)
+        if match:
+            group = match.groupdict()
+            group['license_type'] = group['license_type'].strip()
+            version.setdefault('license_package', {})[group['license_level']] = group
+            continue
+        for pattern in _VERSION_LINES:
+            match = pattern.match(line)
+            if match:
+                for key, value in match.groupdict().items():
+                    if value is not None:
+                        version.setdefault(key, value)
+                break
+
+    if not version:
+        return {}
+    if 'copyright_years' in version:
+        version.setdefault('image_type', 'developer image')
+    if 'version' in version:
+        version['version_short'] = '.'.join(version['version'].split('.')[:2])
+    if 'chassis' in version:
+        version['rtr_type'] = _router_type(version['chassis'])
+    version['os'] = 'IOS-XE' if 'xe_version' in version else 'IOS'
+    if len(version.get('license_package', {})) == 1:
+        version.update(next(iter(version['license_package'].values())))
+    for member in switch_num.values():
+        if member.get('active'):
+            if 'uptime_this_cp' in version:
+                member['uptime'] = version['uptime_this_cp']
+            member.update(active_details)
+    if switch_num:
+        version['switch_num'] = switch_num
+    return {'version': version}
+
+
+PARSERS = {
+    'show ip interface brief': parse_ip_interface_brief,
+    'show interfaces description': parse_interfaces_description,
+    'show interface description': parse_interfaces_description,
+    'show cdp neighbors': parse_cdp_neighbors,
+    'show cdp neighbor': parse_cdp_neighbors,
+    'show version': parse_version,
+}
+
+
+def has_parser(command):
+    return ' '.join(command.split()) in PARSERS
+
+
+def parse(command, output):
+    """
+    Parses the output of a command with its fast parser.
+
+    Args:
+        command (str): The command that produced the output.
+        output (str): The raw output of the command.
+
+    Returns:
+        Dict: The parsed output, in genie's shape. An empty dict when nothing
+        in the output could be parsed.
+
+    Raises:
+        KeyError: If there is no fast parser for the command.
+    """
+    return PARSERS[' '.join(command.split())](output)
@@ -0,0 +1,178 @@
+"""
+The fleet module runs the same piece of work against many devices at once.
+
+FleetRunner takes a list of hostnames and either a callable or a list of
+commands, runs them on at most max_workers threads and streams a FleetResult per
+host as soon as that host is done. A failing or hanging host never stops the
+rest of the run: its exception, or a TimeoutError once it has run longer than
+the per-host timeout, is reported in its FleetResult instead, and a hung host
+gives up its place to the next one.
+
+Example:
+
+    runner = FleetRunner(max_workers=50, timeout=120)
+    for result in runner.run(hostnames, commands=['show version'], parser='genie'):
+        print(result.hostname, result.ok)
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from cisco_device import CiscoDevice
+
+
+@dataclass
+class FleetResult():
+    """
+    The outcome of the work run against one host.
+    """
+    hostname: str
+    result: object = None
+    error: Exception = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class FleetRunner():
+
+    def __init__(self, max_workers=32, timeout=300, device_factory=CiscoDevice, poll_interval=0.5):
+        """
+        The constructor for the FleetRunner class.
+
+        Args:
+            max_workers (int, optional): The number of hosts worked on at the
+                same time. Defaults to 32.
+            timeout (float, optional): Seconds a single host may run before it
+                is reported as timed out. None disables the timeout. Defaults to 300.
+            device_factory (callable, optional): Builds the device object for a
+                hostname. It must support the context manager protocol.
+                Defaults to CiscoDevice.
+            poll_interval (float, optional): How often, in seconds, running hosts
+                are checked against the timeout. Defaults to 0.5.
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.device_factory = device_factory
+        self.poll_interval = poll_interval
+
+    def _run_host(self, hostname, task, clock):
+        try:
+            with self.device_factory(hostname) as device:
+                clock['device'] = device
+                result = task(device)
+            return FleetResult(hostname, result=result, elapsed=time.monotonic() - clock['start'])
+        except Exception as e:
+            return FleetResult(hostname, error=e, elapsed=time.monotonic() - clock['start'])
+
+    @staticmethod
+    def _abandon(clock):
+        # Abandoning the device closes its session and keeps it from logging
+        # in again, so a thread blocked on it fails rather than hang on or
+        # carry on with the work; its result is dropped either way. Devices
+        # without abandon() are only closed.
+        device = clock.get('device')
+        abandon = getattr(device, 'abandon', None) or getattr(device, 'close', None)
+        if abandon is not None:
+            try:
+                abandon()
+            except Exception:
+                pass
+
+    def run(self, hostnames, task=None, commands=None, parser=None, callback=None):
+        """
+        Runs the work against every host and yields a FleetResult per host in
+        the order the hosts finish.
+
+        At most max_workers hosts are worked on at a time, each on a thread of
+        its own started when a place frees up, so the per-host timeout starts
+        counting when the host does. A timed-out host is reported right away
+        and its device abandoned (see CiscoDevice.abandon), so its thread
+        cannot log in again; its place goes to the next host and its late
+        result is discarded. Hosts that hang can therefore never hold up the
+        hosts behind them.
+
+        Args:
+            hostnames (Iterable[str]): The hosts to run against.
+            task (callable, optional): Called with the connected device, its
+                return value becomes FleetResult.result.
+            commands (List[str], optional): Commands to run with
+                execute_commands() when no task is given.
+            parser (str, optional): The parser used together with commands.
+            callback (callable, optional): Called with every FleetResult as soon
+                as it is available.
+
+        Yields:
+            FleetResult: The outcome for each host.
+
+        Raises:
+            ValueError: If neither a task nor commands are given.
+        """
+        if task is None:
+            if not commands:
+                raise ValueError("Either a task or a list of commands is required")
+            task = lambda device: device.execute_commands(commands, parser=parser)
+
+        hosts = iter(hostnames)
+        # The hosts being worked on, keyed by a token of their own, as a
+        # hostname may be given twice.
+        running = {}
+        results = queue.Queue()
+
+        def work(token, hostname, clock):
+            results.put((token, self._run_host(hostname, task, clock)))
+
+        def start_next():
+            for hostname in hosts:
+                token, clock = object(), {'start': time.monotonic()}
+                running[token] = (hostname, clock)
+                threading.Thread(target=work, args=(token, hostname, clock), daemon=True).start()
+                return
+
+        for _ in range(self.max_workers):
+            start_next()
+
+        while running:
+            finished = []
+            try:
+                token, result = results.get(timeout=self.poll_interval)
+                while True:
+                    # An abandoned host's late result is dropped.
+                    if running.pop(token, None) is not None:
+                        finished.append(result)
+                    token, result = results.get_nowait()
+            except queue.Empty:
+                pass
+
+            if self.timeout is not None:
+                now = time.monotonic()
+                for token, (hostname, clock) in list(running.items()):
+                    if now - clock['start'] > self.timeout:
+                        del running[token]
+                        self._abandon(clock)
+                        finished.append(FleetResult(hostname,
+                                                    error=TimeoutError(f"{hostname} did not finish within {self.timeout} seconds"),
+                                                    elapsed=now - clock['start']))
+
+            for result in finished:
+                start_next()
+                if callback is not None:
+                    callback(result)
+                yield result
+
+    def run_all(self, hostnames, task=None, commands=None, parser=None, callback=None):
+        """
+        Same as run(), but waits for every host and returns the results in the
+        order the hostnames were given.
+
+        Returns:
+            List[FleetResult]: The outcome for each host.
+        """
+        hostnames = list(hostnames)
+        results = {}
+        for result in self.run(hostnames, task=task, commands=commands, parser=parser, callback=callback):
+            results.setdefault(result.hostname, result)
+        return [results[hostname] for hostname in dict.fromkeys(hostnames)]
@@ -0,0 +1,130 @@
+"""
+The instrumentation module records where the time of a device run goes.
+
+An Instrumentation object is handed to one or more CiscoDevice instances, which
+then record, per command, the time spent in each phase of the hot path:
+
+- connect: the TCP connection to the device's SSH port.
+- authenticate: the SSH handshake, the login (TACACS) and netmiko's session
+  preparation, i.e. the rest of the login once the TCP connection is up.
+- prompt: finding the device prompt, which netmiko does before every command.
+- transfer: sending the command and reading its output back to the prompt.
+- parse: parsing the output (genie, textfsm or fast).
+
+along with the output size in bytes. connect and authenticate are recorded
+under the command name '(login)'.
+
+The samples can be exported as a JSON summary with count, total, percentiles
+and a latency histogram per command and phase, which tells whether a slow
+store run is down to TACACS, the WAN link or the parser.
+
+Example:
+
+    timings = Instrumentation()
+    with CiscoDevice('NER0502X01', instrumentation=timings) as device:
+        device.get_os_version_info()
+    timings.to_json('timings.json')
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Instrumentation():
+
+    PHASES = ('connect', 'authenticate', 'prompt', 'transfer', 'parse')
+    LOGIN = '(login)'
+    # Upper bounds, in milliseconds, of the histogram buckets.
+    BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, float('inf'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+        self._bytes = defaultdict(list)
+        self._hosts = set()
+        self.started = time.time()
+
+    def record(self, command, phase, seconds, hostname=None):
+        """
+        Records the time spent in one phase of a command.
+
+        Raises:
+            ValueError: If the phase is unknown.
+        """
+        if phase not in self.PHASES:
+            raise ValueError(f"Invalid phase: {phase}")
+        with self._lock:
+            self._samples[(command, phase)].append(seconds)
+            if hostname:
+                self._hosts.add(hostname)
+
+    def record_bytes(self, command, size):
+        with self._lock:
+            self._bytes[command].append(size)
+
+    @contextmanager
+    def timer(self, command, phase, hostname=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(command, phase, time.perf_counter() - start, hostname)
+
+    @classmethod
+    def _percentile(cls, samples, fraction):
+        return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+    @classmethod
+    def _histogram(cls, samples):
+        counts = [0] * len(cls.BUCKETS_MS)
+        for sample in samples:
+            counts[bisect_left(cls.BUCKETS_MS, sample * 1000)] += 1
+        labels = [f'<={upper:g}ms' for upper in cls.BUCKETS_MS[:-1]] + [f'>{cls.BUCKETS_MS[-2]:g}ms']
+        return dict(zip(labels, counts))
+
+    @classmethod
+    def _describe(cls, samples):
+        samples = sorted(samples)
+        return {'count': len(samples),
+                'total_s': sum(samples),
+                'min_ms': samples[0] * 1000,
+                'p50_ms': cls._percentile(samples, 0.50) * 1000,
+                'p90_ms': cls._percentile(samples, 0.90) * 1000,
+                'p99_ms': cls._percentile(samples, 0.99) * 1000,
+                'max_ms': samples[-1] * 1000,
+                'histogram': cls._histogram(samples)}
+
+    def summary(self):
+        """
+        Returns the recorded samples summarized per command and phase, plus the
+        totals per phase over all commands.
+
+        Returns:
+            Dict: {'hosts', 'duration_s', 'phases': {phase: stats},
+            'commands': {command: {phase: stats, 'bytes': {...}}}}
+        """
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            sizes = {key: list(values) for key, values in self._bytes.items()}
+            hosts = len(self._hosts)
+
+        commands = defaultdict(dict)
+        phases = defaultdict(list)
+        for (command, phase), values in samples.items():
+            commands[command][phase] = self._describe(values)
+            phases[phase].extend(values)
+        for command, values in sizes.items():
+            commands[command]['bytes'] = {'count': len(values), 'total': sum(values), 'max': max(values)}
+
+        return {'hosts': hosts,
+                'duration_s': time.time() - self.started,
+                'phases': {phase: self._describe(phases[phase]) for phase in self.PHASES if phases[phase]},
+                'commands': dict(commands)}
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=4)
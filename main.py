@@ -1,127 +1,225 @@
-import json
 from cisco_device import CiscoDevice
-from box2 import BoxClient
-from device_integration_tests import Access_Sw_Tests
-from utility import XLSWriter, PingDevice
-import os
+from instrumentation import Instrumentation
+from check_runner import CheckRunner
+from compliance_cache import ComplianceCache
+from result_sink import JsonlSink, XlsxSink, PdfSink, SlackSink, FanoutSink
+from upload_queue import UploadQueue
+from utility import XLSWriter, PDFReport
+from reachability import ReachabilitySweep
+import sys
+import glob
+import collections
 import datetime
 import argparse
 
 
-
-now = datetime.datetime.now()
-date_time_string = now.strftime("%Y-%m-%d_%H-%M-%S")
-
-
-parser = argparse.ArgumentParser()
-parser.add_argument("-d", "--data", help="Store Type and 4 digits of the store number", required=True)
-args = parser.parse_args()
-
-cisco_switch = args.data + 'X01'
-cisco_cellular_router = args.data + 'C01'
-wti = args.data + 'S01'
-vce = args.data + 'D01'
-store_number = args.data
-
-
-device = CiscoDevice(cisco_switch)
-
-if device.find_prompt():
-    print( device.find_prompt())
-    base_device_list = [cisco_switch] #print(#cisco_cellular_router, wti, vce)
-
-device_list=[]
-
-for device in base_device_list:
-    if PingDevice(device).ping():
-        device_list.append(device)
-
-#device_list = [f'{args}X01']
-
-#device_list=['10.60.31.132', '10.61.111.132']
-box_folder_id = '195121193192'
-
-xls_writer = XLSWriter(f'{store_number}_{date_time_string}_store_test_results.xlsx')
-xls_writer.add_sheet(sheetname="Sheet")
-xls_writer.write_single_row_data(sheetname='Sheet', data=["DEVICE", "TEST", "DEVICE RESPONSE", "RESULT"],bold=True, italic=False, font_color='FF000000')
-
-for dev in device_list:
-    device = CiscoDevice(dev)
-    test = Access_Sw_Tests(device)
-
-    #ADD HERE MORE TESTS
-    test_list = [test.check_os_version(), 
-                 test.check_cdp_neighbor_number(),
-                 test.check_cdp_cellular_router_interface(),
-                 test.check_platform(),
-                 test.check_number_of_sw_per_stack(),
-                 test.check_modes_of_sw_stack(),
-                 test.check_device_interface_status(interface='GigabitEthernet1/0/1'),
-                 test.check_device_interface_status(interface='GigabitEthernet1/0/3'),
-                 test.check_device_interface_status(interface='GigabitEthernet1/0/4'),
-                 test.check_device_interface_status(interface='GigabitEthernet1/0/5'),
-                 test.check_device_interface_status(interface='GigabitEthernet1/0/9'),
-                 test.check_device_interface_status(interface='GigabitEthernet1/0/10'),
-                 test.check_device_interface_status(interface='GigabitEthernet2/0/1'),
-                 test.check_device_interface_status(interface='GigabitEthernet2/0/3'),
-                 test.check_device_interface_status(interface='GigabitEthernet2/0/4'),
-                 test.check_device_interface_status(interface='GigabitEthernet2/0/5'),
-                 test.check_device_interface_status(interface='GigabitEthernet2/0/10'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/1'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/2'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/3'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/4'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/5'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/6'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/7'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/8'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/9'),
-                 test.check_interface_description(interface='GigabitEthernet1/0/10'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/1'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/2'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/3'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/4'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/5'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/6'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/7'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/8'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/9'),
-                 test.check_interface_description(interface='GigabitEthernet2/0/10'),
-                 test.check_aaa_configuration(),
-                 test.check_psu_status(),
-                 test.check_number_of_psu()
-                 ]
-
-    for test in test_list:
-        test_result = test
-        xls_writer.write_single_row_data(sheetname='Sheet', data=[device.hostname, test_result['test_name'], test_result['response'],test_result['test_status']],bold=test_result['bold'], italic=test_result['italic'], font_color=test_result['font_color'])
-        xls_writer.save()
-
-
-box_client = BoxClient()
-
-client = BoxClient().get_client()
-
-box_client.upload_file(client, folder_id=box_folder_id, file_name=f'{store_number}_{date_time_string}_store_test_results.xlsx')
-
-
-#print(box_client.get_folder_contents(client, folder_id=box_folder_id))
-#box_client.get_url_link(client, file_id=None)
-
-box_folder_content=box_client.get_folder_contents(client, folder_id=box_folder_id)
-
-for file in box_folder_content:
-    if file['name'] == f'{store_number}_{date_time_string}_store_test_results.xlsx':
-        link_description = box_client.get_url_link(client, file_id=file['id'])
-        link = link_description['url']
-        box_directory = f'https://nike.ent.box.com/folder/{box_folder_id}'
+BOX_FOLDER_ID = '195121193192'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--data", nargs='+', default=[], help="Store Type and 4 digits of the store number, several stores can be given")
+    parser.add_argument("-f", "--file", nargs='+', default=[], help="Files, or globs of files, listing one store per line; lines starting with # are skipped")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Devices tested at the same time")
+    parser.add_argument("-r", "--report", choices=('store', 'aggregated'), default='store', help="store: one report per store, aggregated: one report for all the stores")
+    parser.add_argument("-m", "--mode", choices=CiscoDevice.MODES, default='live', help="live: talk to the devices, record: also save every output to --snapshot-dir, replay: run the tests against --snapshot-dir without network")
+    parser.add_argument("-s", "--snapshot-dir", help="Directory of the recorded device outputs, used by --mode record and replay")
+    parser.add_argument("-c", "--cache-dir", help="Keep the test results here between runs and only re-evaluate the tests whose device outputs or standards changed")
+    parser.add_argument("--changed-only", action='store_true', help="With --cache-dir, only report the tests that were re-evaluated")
+    parser.add_argument("--pdf", action='store_true', help="Also write, and upload, every report as a PDF")
+    parser.add_argument("--slack-webhook", help="Also post the failed tests to this Slack incoming webhook")
+    parser.add_argument("--probe-timeout", type=float, default=1.0, help="Seconds to wait for a switch to accept a connection on port 22 in the pre-flight sweep")
+    parser.add_argument("-t", "--timings", help="Write a JSON summary of the connect, authenticate, prompt, transfer and parse times to this file")
+    args = parser.parse_args(argv)
+    if not args.data and not args.file:
+        parser.error("at least one store is required, use --data or --file")
+    return args
+
+
+def load_stores(data, files):
+    """
+    Returns the stores given on the command line and in the store files, in
+    order and without duplicates.
+
+    Raises:
+        FileNotFoundError: If a file, or glob, matches no file.
+    """
+    stores = list(data)
+    for pattern in files:
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            raise FileNotFoundError(f"No store file matches {pattern}")
+        for path in paths:
+            with open(path, 'r') as f:
+                stores.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith('#'))
+    return list(dict.fromkeys(stores))
+
+
+def preflight(stores, args):
+    """
+    Probes the switch of every store at once and returns the stores whose
+    switch accepts a connection on port 22. Nothing is probed in replay mode.
+    """
+    if args.mode == 'replay':
+        return list(stores)
+    sweep = ReachabilitySweep(methods=('tcp',), port=22, timeout=args.probe_timeout, retries=1)
+    results = sweep.sweep(store + 'X01' for store in stores)
+    reachable = []
+    for store in stores:
+        result = results[store + 'X01']
+        if result.reachable:
+            reachable.append(store)
+        else:
+            print(f'\033[1;31m{result.host}: unreachable ({result.error!r})\033[0m')
+    return reachable
+
+
+def find_devices(store):
+    """
+    Returns the devices of a store to test. The devices are expected to have
+    passed preflight(); whether they give a privileged prompt is checked by
+    the run itself, over the session the tests use, so each device is only
+    logged into once.
+    """
+    cisco_switch = store + 'X01'
+    cisco_cellular_router = store + 'C01'
+    wti = store + 'S01'
+    vce = store + 'D01'
+
+    return [cisco_switch] #print(#cisco_cellular_router, wti, vce)
+
+
+def open_report(name, date_time_string, args):
+    """
+    Opens the result sinks of one report. Every result is streamed to the
+    JSONL file as soon as its device is done; the XLSX report (and the PDF
+    report and Slack) consume the same stream.
+
+    Returns:
+        Tuple[FanoutSink, List[str]]: The sink and the file names of the
+        reports to upload.
+    """
+    report_name = f'{name}_{date_time_string}_store_test_results'
+    sinks = [JsonlSink(f'{report_name}.jsonl'),
+             XlsxSink(XLSWriter(f'{report_name}.xlsx', write_only=True))]
+    reports = [f'{report_name}.xlsx']
+    if args.pdf:
+        sinks.append(PdfSink(PDFReport(f'{report_name}.pdf', title=report_name)))
+        reports.append(f'{report_name}.pdf')
+    if args.slack_webhook:
+        sinks.append(SlackSink(args.slack_webhook))
+    return FanoutSink(*sinks), reports
+
+
+def run_tests(devices, args, date_time_string, instrumentation=None, on_report=None):
+    """
+    Runs the tests against the devices of every store and writes the reports.
+
+    Args:
+        devices (Dict[str, List[str]]): The devices to test, keyed by store.
+        on_report (callable, optional): Called with the file name of each
+            report as soon as it is complete, while the other stores are
+            still being tested.
+
+    Returns:
+        Tuple[List[str], List[str]]: The reports written, and the devices
+        that could not be tested.
+    """
+    store_of = {device: store for store, device_list in devices.items() for device in device_list}
+    key_of = lambda store: 'stores' if args.report == 'aggregated' else store
+    # The devices of each report, in input order. Devices finish in any
+    # order; a result is held back until the devices before it in its report
+    # are written, so a report is the same from run to run and each device
+    # comes out in one piece.
+    order = {}
+    for store, device_list in devices.items():
+        order.setdefault(key_of(store), collections.deque()).extend(device_list)
+
+    #ADD MORE TESTS TO check_runner.DEFAULT_CHECKS
+    runner = CheckRunner(device_factory=lambda hostname: CiscoDevice(hostname, mode=args.mode, snapshot_dir=args.snapshot_dir, instrumentation=instrumentation),
+                         device_workers=args.workers,
+                         cache=ComplianceCache(args.cache_dir) if args.cache_dir else None,
+                         changed_only=args.changed_only,
+                         require_privileged=True)
+
+    reports, failed = {}, []
+    open_sinks, done = {}, {}
+    try:
+        for fleet_result in runner.stream(store_of):
+            if not fleet_result.ok:
+                print(f'\033[1;31m{fleet_result.hostname}: {fleet_result.error!r}\033[0m')
+            done[fleet_result.hostname] = fleet_result
+            key = key_of(store_of[fleet_result.hostname])
+            pending = order[key]
+            while pending and pending[0] in done:
+                fleet_result = done.pop(pending.popleft())
+                if key not in open_sinks:
+                    # A store report is only open while its store is being tested.
+                    open_sinks[key], reports[key] = open_report(key, date_time_string, args)
+                if fleet_result.ok:
+                    for test_result in fleet_result.result:
+                        open_sinks[key].write(fleet_result.hostname, test_result)
+                else:
+                    failed.append(fleet_result.hostname)
+
+            if not pending and key in open_sinks:
+                open_sinks.pop(key).close()
+                if on_report is not None:
+                    for report in reports[key]:
+                        on_report(report)
+    finally:
+        for key, sink in open_sinks.items():
+            sink.close()
+            if on_report is not None:
+                for report in reports[key]:
+                    on_report(report)
+
+    return [report for store_reports in reports.values() for report in store_reports], failed
+
+
+def print_links(uploads, folder_id=BOX_FOLDER_ID):
+    """
+    Prints the download link of every uploaded report, and the error of every
+    report that could not be uploaded.
+    """
+    box_directory = f'https://nike.ent.box.com/folder/{folder_id}'
+    for upload in uploads:
+        if not upload.ok:
+            print(f'\033[1;31m{upload.file_name}: upload failed ({upload.error!r}), the report is kept locally\033[0m')
+            continue
         print('\033[1;31m---------------------------------------------------------------------------\033[0m')
         print(f'\033[1;34mBOX DIRECTORY: ~~~> \033[0m \033[1;35m{box_directory}\033[0m')
-        print(f'\033[1;34mREPORT NAME:   ~~~> \033[0m \033[1;35m{store_number}_{date_time_string}_store_test_results.xlsx\033[0m')
+        print(f'\033[1;34mREPORT NAME:   ~~~> \033[0m \033[1;35m{upload.file_name}\033[0m')
         print('\n')
-        print(f'\033[1;34mDOWNLOAD LINK  ~~~> \033[0m \033[1;36m{link}\033[0m')
-             
-file_path = f'{store_number}_{date_time_string}_store_test_results.xlsx'
+        print(f'\033[1;34mDOWNLOAD LINK  ~~~> \033[0m \033[1;36m{upload.url}\033[0m')
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    date_time_string = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    instrumentation = Instrumentation() if args.timings else None
+    stores = load_stores(args.data, args.file)
+    reachable = preflight(stores, args)
+
+    devices = {store: find_devices(store) for store in reachable}
+    unreachable = [store for store in stores if store not in devices]
+
+    # Every report is uploaded as soon as its store is done, while the next
+    # stores are still being tested; the run ends once the uploads are done.
+    with UploadQueue(BOX_FOLDER_ID) as uploads:
+        reports, failed = run_tests(devices, args, date_time_string, instrumentation, on_report=uploads.put)
+
+        if instrumentation is not None:
+            instrumentation.to_json(args.timings)
+            print(f'Timings written to {args.timings}')
+
+    print_links(uploads.results)
+
+    if unreachable or failed:
+        print(f'\033[1;31mNot tested: {", ".join(unreachable + failed)}\033[0m')
+        return 1
+    return 0 if all(upload.ok for upload in uploads.results) else 1
+
 
-# Remove the file
-os.remove(file_path)
+if __name__ == '__main__':
+    sys.exit(main())
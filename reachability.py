@@ -0,0 +1,247 @@
+"""
+The reachability module checks which of many hosts answer, all at once.
+
+ReachabilitySweep probes every host concurrently on one asyncio event loop,
+with a TCP connect to the SSH port and/or an ICMP echo, and returns a
+ReachabilityResult per host with the round trip time of the probe that
+answered. Thousands of hosts take about as long as the slowest single probe,
+instead of one blocking ping subprocess after the other.
+
+ICMP echoes are sent through a single shared socket: an unprivileged ping
+socket where the kernel allows it (net.ipv4.ping_group_range), a raw socket
+when running as root, and otherwise one "ping -c 1" subprocess per probe.
+
+Example:
+
+    sweep = ReachabilitySweep(methods=('tcp', 'icmp'), timeout=0.5, retries=1, rate=2000)
+    results = sweep.sweep(hostnames)
+    reachable = [host for host, result in results.items() if result.reachable]
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import socket
+import struct
+from dataclasses import dataclass
+
+
+@dataclass
+class ReachabilityResult():
+    """
+    The outcome of the probes sent to one host.
+    """
+    host: str
+    reachable: bool = False
+    rtt: float = None
+    method: str = None
+    attempts: int = 0
+    error: Exception = None
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+class _IcmpSocket():
+    """
+    One ICMP socket shared by every echo of a sweep. Replies are matched to
+    their echo by sequence number.
+    """
+
+    ECHO_REQUEST, ECHO_REPLY = 8, 0
+    PAYLOAD = b'devnet_library reachability'
+
+    def __init__(self, loop):
+        self.loop = loop
+        try:
+            # Unprivileged ping socket, the kernel fills in the identifier and
+            # strips the IP header of the replies.
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.raw = False
+        except OSError:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.raw = True
+        self.sock.setblocking(False)
+        self.identifier = os.getpid() & 0xffff
+        self._sequence = itertools.count(1)
+        self._waiting = {}
+        loop.add_reader(self.sock.fileno(), self._read)
+
+    def _read(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+            if self.raw:
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < 8:
+                continue
+            kind, _, _, identifier, sequence = struct.unpack('!BBHHH', data[:8])
+            if kind != self.ECHO_REPLY or (self.raw and identifier != self.identifier):
+                continue
+            waiter = self._waiting.get(sequence)
+            if waiter is not None and waiter[0] == address[0] and not waiter[1].done():
+                waiter[1].set_result(self.loop.time())
+
+    async def echo(self, address, timeout):
+        """
+        Sends one echo request and returns the round trip time in seconds.
+
+        Raises:
+            asyncio.TimeoutError: If no reply comes within the timeout.
+        """
+        sequence = next(self._sequence) & 0xffff
+        header = struct.pack('!BBHHH', self.ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        checksum = _checksum(header + self.PAYLOAD)
+        packet = struct.pack('!BBHHH', self.ECHO_REQUEST, 0, checksum, self.identifier, sequence) + self.PAYLOAD
+        reply = self.loop.create_future()
+        self._waiting[sequence] = (address, reply)
+        try:
+            sent = self.loop.time()
+            await self.loop.sock_sendto(self.sock, packet, (address, 0))
+            return await asyncio.wait_for(reply, timeout) - sent
+        finally:
+            self._waiting.pop(sequence, None)
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+class ReachabilitySweep():
+
+    METHODS = ('tcp', 'icmp')
+
+    def __init__(self, methods=('tcp',), port=22, timeout=0.5, retries=1, rate=None, concurrency=1000):
+        """
+        The constructor for the ReachabilitySweep class.
+
+        Args:
+            methods (Iterable[str], optional): The probes to try, in order, 'tcp'
+                and/or 'icmp'. A host is reachable as soon as one of them
+                answers. Defaults to ('tcp',).
+            port (int, optional): The port of the TCP probe. Defaults to 22.
+            timeout (float, optional): Seconds to wait for each probe. Defaults to 0.5.
+            retries (int, optional): How many times a probe that got no answer
+                is sent again. Defaults to 1.
+            rate (float, optional): The most probes started per second. Defaults
+                to None, which does not limit the rate.
+            concurrency (int, optional): The most hosts probed at the same time,
+                which bounds the open sockets. Defaults to 1000.
+
+        Raises:
+            ValueError: If a method is not one of METHODS.
+        """
+        for method in methods:
+            if method not in self.METHODS:
+                raise ValueError(f"Unknown method {method!r}, expected one of {', '.join(self.METHODS)}")
+        self.methods = tuple(methods)
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.rate = rate
+        self.concurrency = concurrency
+
+    async def _throttle(self, loop, state):
+        if not self.rate:
+            return
+        now = loop.time()
+        start = max(now, state['next_start'])
+        state['next_start'] = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _probe_tcp(self, loop, address, state):
+        start = loop.time()
+        _, writer = await asyncio.wait_for(asyncio.open_connection(address, self.port), self.timeout)
+        rtt = loop.time() - start
+        writer.close()
+        return rtt
+
+    async def _probe_icmp(self, loop, address, state):
+        if state['icmp'] is not None:
+            return await state['icmp'].echo(address, self.timeout)
+        start = loop.time()
+        process = await asyncio.create_subprocess_exec('ping', '-c', '1', '-W', str(max(1, math.ceil(self.timeout))), address,
+                                                       stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        try:
+            returncode = await asyncio.wait_for(process.wait(), self.timeout + 1)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        if returncode != 0:
+            raise ConnectionError(f'ping exited with {returncode}')
+        return loop.time() - start
+
+    async def _probe_host(self, loop, host, semaphore, state):
+        result = ReachabilityResult(host)
+        async with semaphore:
+            try:
+                infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+                address = infos[0][4][0]
+            except OSError as e:
+                result.error = e
+                return result
+            for method in self.methods:
+                probe = self._probe_tcp if method == 'tcp' else self._probe_icmp
+                for _ in range(self.retries + 1):
+                    await self._throttle(loop, state)
+                    result.attempts += 1
+                    try:
+                        result.rtt = await probe(loop, address, state)
+                    except (OSError, asyncio.TimeoutError) as e:
+                        result.error = e
+                        if isinstance(e, ConnectionRefusedError):
+                            # The host answered, the port is closed: asking again will not help.
+                            break
+                        continue
+                    result.reachable, result.method, result.error = True, method, None
+                    return result
+        return result
+
+    async def sweep_async(self, hosts):
+        """
+        Probes every host on the running event loop.
+
+        Args:
+            hosts (Iterable[str]): Hostnames or IP addresses.
+
+        Returns:
+            Dict[str, ReachabilityResult]: The result for each host, in the
+            order the hosts were given.
+        """
+        hosts = list(dict.fromkeys(hosts))
+        loop = asyncio.get_running_loop()
+        # The pacing and the ICMP socket belong to this sweep, so one
+        # ReachabilitySweep can run several sweeps at the same time.
+        state = {'next_start': loop.time(), 'icmp': None}
+        if 'icmp' in self.methods:
+            try:
+                state['icmp'] = _IcmpSocket(loop)
+            except OSError:
+                pass
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            results = await asyncio.gather(*(self._probe_host(loop, host, semaphore, state) for host in hosts))
+        finally:
+            if state['icmp'] is not None:
+                state['icmp'].close()
+        return {result.host: result for result in results}
+
+    def sweep(self, hosts):
+        """
+        Probes every host and returns {host: ReachabilityResult}, see
+        sweep_async(). Must not be called from a running event loop.
+        """
+        return asyncio.run(self.sweep_async(hosts))
@@ -0,0 +1,237 @@
+"""
+The result_sink module streams check results out of a run as they are
+produced, instead of keeping them all in memory until the end.
+
+Every sink takes results one at a time with write(hostname, result), where
+result is a check result dict (test_name, response, test_status and styling):
+
+- JsonlSink appends one JSON line per result to a file or stdout and flushes
+  it, so an interrupted run leaves every finished result on disk.
+- XlsxSink, PdfSink, CsvSink and SlackSink turn the results into the reports.
+- FanoutSink passes every result on to several sinks.
+
+The reports can also be rebuilt from a JSONL file afterwards with replay(),
+e.g. after an interrupted run.
+
+Example:
+
+    with FanoutSink(JsonlSink('results.jsonl'), CsvSink('results.csv')) as sink:
+        for result in test_results:
+            sink.write('NER0502X01', result)
+"""
+
+from utility import CSVWriter
+import json
+import sys
+
+
+class ResultSink():
+    """
+    The interface of the sinks. Sinks are context managers that close
+    themselves on exit.
+    """
+
+    def write(self, hostname, result):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+
+    def __init__(self, path=None, mode='a'):
+        """
+        Args:
+            path (str, optional): The JSONL file. Defaults to None, which
+                writes to stdout.
+            mode (str, optional): 'a' appends to an existing file, 'w'
+                replaces it. Defaults to 'a'.
+        """
+        self.path = path
+        self.stream = sys.stdout if path is None else open(path, mode, encoding='UTF8')
+
+    def write(self, hostname, result):
+        # Responses may be parsed outputs, anything JSON does not know is written as text.
+        self.stream.write(json.dumps({'hostname': hostname, **result}, default=str) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        if self.path is not None and not self.stream.closed:
+            self.stream.close()
+
+
+class XlsxSink(ResultSink):
+
+    HEADER = ["DEVICE", "TEST", "DEVICE RESPONSE", "RESULT"]
+
+    def __init__(self, xls_writer, sheetname='Sheet'):
+        """
+        Args:
+            xls_writer (XLSWriter): The workbook the rows are written to. It is
+                saved once, when the sink is closed.
+            sheetname (str, optional): The sheet, which is created with a
+                header row. Defaults to 'Sheet'.
+        """
+        self.xls_writer = xls_writer
+        self.sheetname = sheetname
+        self.xls_writer.add_sheet(sheetname=sheetname)
+        self.xls_writer.write_single_row_data(sheetname=sheetname, data=self.HEADER, bold=True, italic=False, font_color='FF000000')
+
+    def write(self, hostname, result):
+        self.xls_writer.write_single_row_data(sheetname=self.sheetname,
+                                              data=[hostname, result['test_name'], result['response'], result['test_status']],
+                                              bold=result['bold'], italic=result['italic'], font_color=result['font_color'])
+
+    def close(self):
+        self.xls_writer.save()
+
+
+class PdfSink(ResultSink):
+
+    HEADER = ['TEST', 'DEVICE RESPONSE', 'RESULT']
+    # The width of an A4 page inside the default margins.
+    COL_WIDTHS = [190, 270, 63]
+
+    def __init__(self, pdf_report):
+        """
+        Args:
+            pdf_report (PDFReport): The report the results are written to, one
+                table per device. It is closed, and written, with the sink.
+        """
+        self.pdf_report = pdf_report
+        self._hostname = None
+
+    def write(self, hostname, result):
+        if hostname != self._hostname:
+            self.pdf_report.add_heading(hostname)
+            self.pdf_report.start_table(self.HEADER, self.COL_WIDTHS)
+            self._hostname = hostname
+        self.pdf_report.add_row([result['test_name'], result['response'], result['test_status']], result['font_color'])
+
+    def close(self):
+        self.pdf_report.close()
+
+
+class CsvSink(ResultSink):
+
+    HEADER = ['device', 'test', 'response', 'result']
+
+    def __init__(self, path, mode='w', buffer_size=1000):
+        """
+        Args:
+            path (str): The CSV file, gzip compressed if its name ends in .gz.
+            mode (str, optional): 'w' replaces the file, 'a' appends to it.
+                Defaults to 'w'.
+            buffer_size (int, optional): Rows written at a time, see
+                utility.CSVWriter. Defaults to 1000.
+        """
+        self.writer = CSVWriter(path, self.HEADER, mode=mode, buffer_size=buffer_size).open()
+
+    def write(self, hostname, result):
+        self.writer.writerow([hostname, result['test_name'], result['response'], result['test_status']])
+
+    def close(self):
+        self.writer.close()
+
+
+class SlackSink(ResultSink):
+
+    def __init__(self, webhook_url, only_failed=True, batch_size=20, timeout=10, username='Store Test Tool'):
+        """
+        Posts results to a Slack incoming webhook with slack2.SlackNotifier,
+        batch_size results per message. Slack is a side channel: a batch that
+        fails to post is reported on the console, kept and sent again with the
+        next one, and never stops the run or the other sinks.
+
+        Args:
+            webhook_url (str): The incoming webhook URL.
+            only_failed (bool, optional): Only post FAILED results. Defaults to True.
+            batch_size (int, optional): Results per message. Defaults to 20.
+            timeout (float, optional): Seconds to wait for Slack. Defaults to 10.
+            username (str, optional): The name the messages are posted under.
+        """
+        # slack2 imports requests, only the runs posting to Slack pay for it.
+        from slack2 import SlackNotifier
+        self.notifier = SlackNotifier(webhook_url, timeout=timeout)
+        self.only_failed = only_failed
+        self.batch_size = batch_size
+        self.username = username
+        self._pending = 0
+
+    def write(self, hostname, result):
+        if self.only_failed and result['test_status'] != 'FAILED':
+            return
+        self.notifier.message(f"{result['test_status']} {hostname} - {result['test_name']}: {result['response']}")
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        # notify() only clears the message once Slack accepted it.
+        try:
+            self.notifier.notify(self.username)
+        except Exception as e:
+            print(f'\033[1;31mSlack: {self._pending} results not posted, retrying with the next batch ({e!r})\033[0m')
+            return
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        if self._pending:
+            print(f'\033[1;31mSlack: {self._pending} results could not be posted\033[0m')
+
+
+class FanoutSink(ResultSink):
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, hostname, result):
+        for sink in self.sinks:
+            sink.write(hostname, result)
+
+    def close(self):
+        """
+        Closes every sink, even when one of them fails to close.
+        """
+        errors = []
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+
+def read_jsonl(path):
+    """
+    Yields (hostname, result) for every line of a JsonlSink file. A line cut
+    short by an interrupted run is skipped.
+    """
+    with open(path, 'r', encoding='UTF8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            yield result.pop('hostname'), result
+
+
+def replay(path, sink):
+    """
+    Writes every result of a JsonlSink file to the sink, e.g. to rebuild the
+    XLSX report of an interrupted run.
+    """
+    with sink:
+        for hostname, result in read_jsonl(path):
+            sink.write(hostname, result)
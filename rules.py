@@ -0,0 +1,226 @@
+"""
+The rules module evaluates the infrastructure standards as data.
+
+A Rule states which command to read, which value to extract from its parsed
+output, how to compare it and what to expect, e.g.
+
+    - name: System Image Test
+      command: show version
+      path: version.system_image
+      comparator: eq
+      standard: SW_9300_SYSTEM_IMAGE
+
+Rules are loaded from YAML or from Python dicts (see standards.RULES), compiled
+once into evaluators and grouped by command and parser. A RuleSet is evaluated
+against a DeviceSnapshot: every output is parsed once and each rule is a few
+dict lookups, so a new standard on an already collected command costs no
+device round trip and thousands of rules evaluate in milliseconds.
+
+Paths:
+    Keys separated by dots, or a list of keys when a key contains a dot.
+    '*' matches every key of a dict or every item of a list; the comparison
+    then has to hold for all matched values, or for any when quantifier is 'any'.
+    Integer keys of lists are given as numbers, e.g. 'slot.0.status'.
+
+Comparators:
+    eq, ne, lt, le, gt, ge, in (value in expected), contains (expected in
+    value), startswith, regex (re.search) and count (len(value) == expected).
+"""
+
+import hashlib
+import json
+import operator
+import re
+from dataclasses import dataclass, field, fields
+from typing import Any, List, Union
+import standards
+
+
+COMPARATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'in': lambda value, expected: value in expected,
+    'contains': lambda value, expected: expected in value,
+    'startswith': lambda value, expected: str(value).startswith(expected),
+    'regex': lambda value, expected: expected.search(str(value)) is not None,
+    'count': lambda value, expected: len(value) == expected,
+}
+
+QUANTIFIERS = {'all': all, 'any': any}
+
+_MISSING = object()
+
+
+@dataclass
+class Rule():
+    """
+    One standard, see the module docstring. When `standard` names a constant
+    of the standards module, its value is the expected value.
+    """
+    name: str
+    command: str
+    path: Union[str, List[Any]]
+    expected: Any = None
+    comparator: str = 'eq'
+    parser: str = 'genie'
+    quantifier: str = 'all'
+    standard: str = None
+    keys: List[Any] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.comparator not in COMPARATORS:
+            raise ValueError(f"Invalid comparator selected: {self.comparator} in rule '{self.name}'")
+        if self.quantifier not in QUANTIFIERS:
+            raise ValueError(f"Invalid quantifier selected: {self.quantifier} in rule '{self.name}'")
+        if self.standard is not None:
+            if not hasattr(standards, self.standard):
+                raise ValueError(f"Unknown standard {self.standard} in rule '{self.name}'")
+            self.expected = getattr(standards, self.standard)
+        self.keys = self.path.split('.') if isinstance(self.path, str) else list(self.path)
+
+    def compile(self):
+        """
+        Returns the evaluator of the rule: a function taking the parsed output
+        of the command and returning a (passed, response) tuple.
+        """
+        keys = self.keys
+        compare = COMPARATORS[self.comparator]
+        expected = re.compile(self.expected) if self.comparator == 'regex' else self.expected
+        quantify = QUANTIFIERS[self.quantifier]
+        wildcard = '*' in keys
+
+        def evaluate(parsed):
+            values = _extract(parsed, keys)
+            if not values:
+                return False, f"{'.'.join(map(str, keys))} not found"
+            try:
+                if not wildcard:
+                    return compare(values[0], expected), values[0]
+                if self.comparator == 'count':
+                    return compare(values, expected), len(values)
+                return quantify(compare(value, expected) for value in values), values
+            except TypeError as e:
+                return False, f'Cannot compare: {e}'
+
+        return evaluate
+
+
+def _extract(data, keys):
+    """
+    Follows the keys into the parsed output and returns the list of matched
+    values, which is empty when the path does not exist.
+    """
+    values = [data]
+    for key in keys:
+        matched = []
+        for value in values:
+            if key == '*':
+                if isinstance(value, dict):
+                    matched.extend(value.values())
+                elif isinstance(value, list):
+                    matched.extend(value)
+                continue
+            try:
+                item = value[key]
+            except (KeyError, IndexError, TypeError):
+                item = _MISSING
+            if item is _MISSING and isinstance(key, str) and key.isdigit():
+                # Dot paths give every key as text, lists are indexed by number.
+                try:
+                    item = value[int(key)]
+                except (KeyError, IndexError, TypeError):
+                    pass
+            if item is not _MISSING:
+                matched.append(item)
+        values = matched
+    if '*' in keys:
+        return values
+    return values[:1]
+
+
+class RuleSet():
+
+    def __init__(self, rules):
+        """
+        Compiles the rules and groups them by command and parser.
+
+        Args:
+            rules (Iterable[Union[Rule, Dict]]): The rules, as Rule objects or
+                dicts of Rule fields.
+
+        Raises:
+            ValueError: If a rule has an invalid comparator, quantifier or
+                standard.
+        """
+        self.rules = [rule if isinstance(rule, Rule) else Rule(**rule) for rule in rules]
+        self.groups = {}
+        for index, rule in enumerate(self.rules):
+            self.groups.setdefault((rule.command, rule.parser), []).append((index, rule, rule.compile()))
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def fingerprint(self):
+        """
+        A digest of the rules, the same in every process for the same rules,
+        e.g. to tell RuleSets apart in the compliance cache.
+        """
+        rules = [{item.name: getattr(rule, item.name) for item in fields(rule) if item.init} for rule in self.rules]
+        return hashlib.sha256(json.dumps(rules, sort_keys=True, default=repr).encode()).hexdigest()
+
+    @classmethod
+    def from_yaml(cls, path):
+        """
+        Loads the rules from a YAML file holding a list of rules, or a mapping
+        with the list under 'rules'.
+        """
+        import yaml
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, dict):
+            data = data.get('rules', [])
+        return cls(data)
+
+    @property
+    def commands(self):
+        """
+        The distinct commands the rules read, in the order they first appear.
+        """
+        return list(dict.fromkeys(command for command, _ in self.groups))
+
+    def evaluate(self, snapshot):
+        """
+        Evaluates every rule against the snapshot, parsing each command output
+        once per parser.
+
+        Args:
+            snapshot (DeviceSnapshot): The collected device outputs.
+
+        Returns:
+            List[Dict]: One result per rule, in rule order, in the format of
+            the Access_Sw_Tests checks. A rule whose command was not collected
+            fails.
+        """
+        results = [None] * len(self.rules)
+        for (command, parser), group in self.groups.items():
+            if command in snapshot:
+                parsed = snapshot.parse(command, parser)
+            else:
+                parsed = _MISSING
+            for index, rule, evaluate in group:
+                if parsed is _MISSING:
+                    passed, response = False, f"'{command}' was not collected"
+                else:
+                    passed, response = evaluate(parsed)
+                results[index] = {'test_status': 'PASSED' if passed else 'FAILED',
+                                  'response': response if isinstance(response, (str, int, float)) else str(response),
+                                  'test_name': rule.name,
+                                  'bold': False,
+                                  'italic': False,
+                                  'font_color': 'FF000000' if passed else 'FFFF0000'}
+        return results
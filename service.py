@@ -0,0 +1,331 @@
+"""
+The service module runs the compliance audits from a long-running process,
+next to main.py which runs them once and exits.
+
+The process pays the imports (genie, netmiko, the parsers and compiled rules)
+once, and keeps the SSH session of every device open between audits in a
+DevicePool, so an audit only costs the device round trips. Audits run on a
+schedule and on demand, through a small HTTP API served on localhost or on a
+Unix socket:
+
+    GET  /health              The service status and the warm sessions.
+    GET  /results             The results of the last audit.
+    GET  /results/<hostname>  The results of one device in the last audit.
+    POST /audit               Runs an audit now and returns its results. The
+                              body may be {"hostnames": [...]}, defaults to
+                              every device of the service.
+
+Example:
+
+    python service.py -f stores.txt --interval 3600 --port 8080
+    curl -X POST localhost:8080/audit -d '{"hostnames": ["NER0502X01"]}'
+    curl --unix-socket /run/audit.sock localhost/results
+"""
+
+from check_runner import CheckRunner
+from cisco_device import CiscoDevice
+from compliance_cache import ComplianceCache
+from result_sink import JsonlSink
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import datetime
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+
+class DevicePool():
+
+    REAP_INTERVAL = 60
+
+    def __init__(self, device_factory=CiscoDevice, idle_timeout=900):
+        """
+        Keeps one device object, and its SSH session, per host between audits.
+
+        Args:
+            device_factory (callable, optional): Builds the device object for a
+                hostname. Defaults to CiscoDevice.
+            idle_timeout (float, optional): Seconds a session may stay unused
+                before reap() closes it. Defaults to 900.
+        """
+        self.device_factory = device_factory
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._next_reap = time.monotonic()
+
+    @contextmanager
+    def lease(self, hostname):
+        """
+        Yields the connected device of a host, opening its session only if
+        there is none or it has dropped. The session is left open afterwards,
+        unless it failed. A device is used by one audit at a time.
+
+        The command outputs cached by the device are dropped first, every
+        audit sees the device as it is now. Idle sessions are reaped here as
+        well, at most every REAP_INTERVAL seconds, so they are closed even
+        when audits only come through the API.
+        """
+        now = time.monotonic()
+        if now >= self._next_reap:
+            self._next_reap = now + min(self.REAP_INTERVAL, self.idle_timeout)
+            self.reap()
+        with self._lock:
+            # A device the runner abandoned after a timeout is not used again.
+            if hostname not in self._devices or getattr(self._devices[hostname]['device'], 'abandoned', False) is True:
+                self._devices[hostname] = {'device': self.device_factory(hostname),
+                                           'lock': threading.Lock(), 'last_used': time.monotonic()}
+            entry = self._devices[hostname]
+        with entry['lock']:
+            device = entry['device']
+            device.invalidate_cache()
+            try:
+                device.connect()
+                yield device
+            except Exception:
+                device.close()
+                raise
+            finally:
+                entry['last_used'] = time.monotonic()
+
+    def reap(self):
+        """
+        Closes the sessions unused for longer than idle_timeout.
+
+        Returns:
+            List[str]: The hosts whose session was closed.
+        """
+        closed = []
+        now = time.monotonic()
+        with self._lock:
+            for hostname, entry in list(self._devices.items()):
+                if now - entry['last_used'] < self.idle_timeout or not entry['lock'].acquire(blocking=False):
+                    continue
+                try:
+                    entry['device'].close()
+                    del self._devices[hostname]
+                    closed.append(hostname)
+                finally:
+                    entry['lock'].release()
+        return closed
+
+    def hostnames(self):
+        with self._lock:
+            return list(self._devices)
+
+    def close(self):
+        with self._lock:
+            for entry in self._devices.values():
+                entry['device'].close()
+            self._devices = {}
+
+
+class AuditService():
+
+    def __init__(self, hostnames, interval=None, checks=None, device_factory=CiscoDevice, device_workers=8,
+                 idle_timeout=900, cache=None, results_dir=None):
+        """
+        The constructor for the AuditService class.
+
+        Args:
+            hostnames (List[str]): The devices audited by default.
+            interval (float, optional): Seconds between scheduled audits.
+                Defaults to None, which only audits on demand.
+            checks (List[Tuple[str, Dict]], optional): The checks to run.
+                Defaults to check_runner.DEFAULT_CHECKS.
+            device_factory (callable, optional): Builds the device object for a
+                hostname. Defaults to CiscoDevice.
+            device_workers (int, optional): Devices audited at the same time.
+                Defaults to 8.
+            idle_timeout (float, optional): See DevicePool. Defaults to 900.
+            cache (ComplianceCache, optional): See CheckRunner. Defaults to None.
+            results_dir (str, optional): Also write the results of every audit
+                to a JSONL file in this directory. Defaults to None.
+        """
+        self.hostnames = list(hostnames)
+        self.interval = interval
+        self.results_dir = results_dir
+        self.pool = DevicePool(device_factory=device_factory, idle_timeout=idle_timeout)
+        self.runner = CheckRunner(checks=checks, device_workers=device_workers,
+                                  device_factory=self.pool.lease, cache=cache)
+        self.last_audit = None
+        self._stop = threading.Event()
+        self._scheduler = None
+
+    def audit(self, hostnames=None):
+        """
+        Runs the checks against the devices over their warm sessions.
+
+        Args:
+            hostnames (List[str], optional): Defaults to None, which audits
+                every device of the service.
+
+        Returns:
+            Dict: The start and end time of the audit, the results keyed by
+            hostname and the errors of the devices that could not be audited.
+        """
+        started = datetime.datetime.now()
+        audit = {'started': started.isoformat(timespec='seconds'), 'results': {}, 'errors': {}}
+        sink = None
+        if self.results_dir:
+            sink = JsonlSink(os.path.join(self.results_dir, f'audit_{started.strftime("%Y-%m-%d_%H-%M-%S")}.jsonl'))
+        try:
+            for fleet_result in self.runner.stream(hostnames or self.hostnames):
+                if not fleet_result.ok:
+                    audit['errors'][fleet_result.hostname] = repr(fleet_result.error)
+                    continue
+                audit['results'][fleet_result.hostname] = fleet_result.result
+                if sink is not None:
+                    for result in fleet_result.result:
+                        sink.write(fleet_result.hostname, result)
+        finally:
+            if sink is not None:
+                sink.close()
+        audit['finished'] = datetime.datetime.now().isoformat(timespec='seconds')
+        self.last_audit = audit
+        return audit
+
+    def _schedule(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.audit()
+            except Exception as e:
+                print(f'\033[1;31mScheduled audit failed: {e!r}\033[0m')
+            self.pool.reap()
+
+    def start(self):
+        """
+        Starts the scheduled audits, if an interval is set, on a background
+        thread.
+        """
+        if self.interval and self._scheduler is None:
+            self._scheduler = threading.Thread(target=self._schedule, daemon=True)
+            self._scheduler.start()
+
+    def stop(self):
+        """
+        Stops the scheduled audits and closes every session.
+        """
+        self._stop.set()
+        if self._scheduler is not None:
+            self._scheduler.join()
+            self._scheduler = None
+        self.pool.close()
+
+
+class AuditRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the API of the AuditService set on the server as server.service.
+    """
+
+    def _reply(self, status, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.rstrip('/')
+        if path == '/health':
+            self._reply(200, {'status': 'ok', 'devices': len(service.hostnames),
+                              'warm_sessions': service.pool.hostnames(),
+                              'last_audit': service.last_audit and service.last_audit['finished']})
+        elif path == '/results':
+            self._reply(200, service.last_audit or {})
+        elif path.startswith('/results/'):
+            hostname = path[len('/results/'):]
+            results = (service.last_audit or {}).get('results', {})
+            if hostname in results:
+                self._reply(200, results[hostname])
+            else:
+                self._reply(404, {'error': f'No results for {hostname}'})
+        else:
+            self._reply(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/audit':
+            self._reply(404, {'error': f'Unknown path {self.path}'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._reply(400, {'error': 'The body is not valid JSON'})
+            return
+        self._reply(200, self.server.service.audit(body.get('hostnames')))
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, port=8080, socket_path=None):
+    """
+    Returns the HTTP server of the API, listening on localhost:port, or on the
+    Unix socket socket_path when it is given.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, AuditRequestHandler)
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', port), AuditRequestHandler)
+    server.service = service
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--data", nargs='+', default=[], help="Store Type and 4 digits of the store number, several stores can be given")
+    parser.add_argument("-f", "--file", nargs='+', default=[], help="Files, or globs of files, listing one store per line; lines starting with # are skipped")
+    parser.add_argument("-i", "--interval", type=float, help="Seconds between scheduled audits, without it the devices are only audited on demand")
+    parser.add_argument("-p", "--port", type=int, default=8080, help="The localhost port of the API")
+    parser.add_argument("--socket", help="Serve the API on this Unix socket instead of a port")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Devices audited at the same time")
+    parser.add_argument("--idle-timeout", type=float, default=900, help="Seconds an unused SSH session is kept open")
+    parser.add_argument("-m", "--mode", choices=CiscoDevice.MODES, default='live', help="See main.py")
+    parser.add_argument("-s", "--snapshot-dir", help="See main.py")
+    parser.add_argument("-c", "--cache-dir", help="See main.py")
+    parser.add_argument("-o", "--results-dir", help="Also write the results of every audit to a JSONL file in this directory")
+    args = parser.parse_args(argv)
+    if not args.data and not args.file:
+        parser.error("at least one store is required, use --data or --file")
+    return args
+
+
+def main(argv=None):
+    # main.py is only needed for its store list parsing.
+    from main import load_stores
+    args = parse_args(argv)
+    hostnames = [store + 'X01' for store in load_stores(args.data, args.file)]
+    service = AuditService(hostnames, interval=args.interval, device_workers=args.workers,
+                           device_factory=lambda hostname: CiscoDevice(hostname, mode=args.mode, snapshot_dir=args.snapshot_dir),
+                           idle_timeout=args.idle_timeout,
+                           cache=ComplianceCache(args.cache_dir) if args.cache_dir else None,
+                           results_dir=args.results_dir)
+    server = make_server(service, port=args.port, socket_path=args.socket)
+    service.start()
+    print(f'Auditing {len(hostnames)} devices, API on {args.socket or f"127.0.0.1:{args.port}"}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,8 +9,9 @@ class SlackNotifier:
     SLACK_URL = os.environ.get("SLACK_URL")
     text = ""
 
-    def __init__(self, slack_url=SLACK_URL):
+    def __init__(self, slack_url=SLACK_URL, timeout=10):
         self.slack_url = slack_url
+        self.timeout = timeout
         self.text = ""
 
     def message(self, msg="") -> str:
@@ -33,7 +34,7 @@ class SlackNotifier:
             "username": username,
         }
 
-        response = requests.post(self.slack_url, json=payload, headers={'Content-Type': 'application/json'})
+        response = requests.post(self.slack_url, json=payload, headers={'Content-Type': 'application/json'}, timeout=self.timeout)
 
         if response.status_code != 200:
             raise ValueError(
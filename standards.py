@@ -11,6 +11,7 @@ The following infrastructure standards are currently defined in this module:
 - SW_9300_LICENCE_PACKAGE: the license package for the Cisco Catalyst 9300 switch.
 - SW_9300_SYSTEM_IMAGE: the system image for the Cisco Catalyst 9300 switch.
 - SW_MODE: the software installation mode for the Cisco Catalyst switches.
+- RULES: the standards above as declarative rules, evaluated by the rules module.
 
 By utilizing these predefined standards, development teams can reduce errors, improve efficiency, and ensure consistency across infrastructure components. These standards are subject to review and update as needed to keep pace with evolving infrastructure requirements.
 """
@@ -325,3 +326,27 @@ int_description_dict = {'GigabitEthernet1/0/1':'VCE1_LAN3',
                         'GigabitEthernet3/0/8':'WAP',
                         'GigabitEthernet3/0/9':'WAP'
                         }
+
+
+
+#DECLARATIVE RULES
+####################################
+# Evaluated by rules.RuleSet against the collected device outputs, see the
+# rules module for the fields. A rule on a command that is already collected
+# costs no extra round trip to the device.
+
+RULES = [
+    {'name': 'System Image Test',
+     'command': 'show version',
+     'path': 'version.system_image',
+     'expected': SW_9300_SYSTEM_IMAGE},
+    {'name': 'Platform Info Test',
+     'command': 'show version',
+     'path': 'version.platform',
+     'expected': SW_9300_PLATFORM_INFO},
+    {'name': 'Stack Member Model Test',
+     'command': 'show version',
+     'path': 'version.switch_num.*.model',
+     'comparator': 'in',
+     'expected': [SW_9300_PLATFORM, SW_3660_PLATFORM]},
+]
@@ -0,0 +1,137 @@
+"""
+The upload_queue module uploads reports to Box in the background.
+
+UploadQueue takes report files with put() as soon as they are written and
+uploads them on worker threads, so the tests of the next store carry on while
+Box is busy. Each report gets its download link once uploaded and the local
+file is removed. close() waits for the queue to drain and returns an
+UploadResult per report; a failed upload is reported there instead of
+stopping the other uploads.
+
+Example:
+
+    with UploadQueue(folder_id='195121193192') as uploads:
+        for report in write_reports():
+            uploads.put(report)
+    for result in uploads.results:
+        print(result.file_name, result.url or result.error)
+"""
+
+import os
+import queue
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class UploadResult():
+    """
+    The outcome of the upload of one report.
+    """
+    file_name: str
+    file_id: str = None
+    url: str = None
+    error: Exception = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class UploadQueue():
+
+    _STOP = object()
+
+    def __init__(self, folder_id, box_client=None, max_workers=2, remove=True):
+        """
+        The constructor for the UploadQueue class.
+
+        Args:
+            folder_id (str): The Box folder the reports are uploaded to.
+            box_client (BoxClient, optional): Defaults to None, which creates a
+                BoxClient, and imports boxsdk, on the first upload. It is
+                authenticated once, by the first upload.
+            max_workers (int, optional): The number of uploads running at the
+                same time. Defaults to 2.
+            remove (bool, optional): Remove each local file once uploaded.
+                Defaults to True.
+        """
+        self.folder_id = folder_id
+        self.box_client = box_client
+        self.max_workers = max_workers
+        self.remove = remove
+        self.results = []
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._client = None
+        self._workers = []
+
+    def _get_client(self):
+        with self._lock:
+            if self.box_client is None:
+                from box2 import BoxClient
+                self.box_client = BoxClient()
+            if self._client is None:
+                self._client = self.box_client.get_client()
+                if self._client is None:
+                    raise ConnectionError('Box authentication failed')
+            return self._client
+
+    def _upload(self, file_name):
+        result = UploadResult(file_name)
+        try:
+            client = self._get_client()
+            uploaded = self.box_client.upload_file(client, folder_id=self.folder_id, file_name=file_name)
+            result.file_id = uploaded.get('file_id')
+            if result.file_id is None:
+                for item in self.box_client.get_folder_contents(client, folder_id=self.folder_id):
+                    if item['name'] == file_name:
+                        result.file_id = item['id']
+            result.url = self.box_client.get_url_link(client, file_id=result.file_id)['url']
+            if self.remove:
+                os.remove(file_name)
+        except Exception as e:
+            result.error = e
+        return result
+
+    def _work(self):
+        while True:
+            file_name = self._queue.get()
+            if file_name is self._STOP:
+                return
+            result = self._upload(file_name)
+            with self._lock:
+                self.results.append(result)
+
+    def put(self, file_name):
+        """
+        Queues a report for upload and returns right away. The workers are
+        started by the first report.
+        """
+        if not self._workers:
+            for _ in range(self.max_workers):
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        self._queue.put(file_name)
+
+    def close(self):
+        """
+        Waits for every queued report to be uploaded.
+
+        Returns:
+            List[UploadResult]: The result for each report, in the order the
+            uploads finished.
+        """
+        for _ in self._workers:
+            self._queue.put(self._STOP)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,42 +1,121 @@
+# The third party libraries (openpyxl, reportlab, yaml, ntplib, pytz, pysnmp,
+# nmap) are imported by the classes that use them, when they are first
+# used, so importing one helper does not pay for all of them.
 import csv
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Color, PatternFill
+import gzip
+import itertools
 import json
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from PyPDF2 import PdfFileMerger, PdfFileReader, PdfFileWriter
-import yaml
 import os
-import subprocess
-import ntplib
 from datetime import datetime
-import pytz
 import socket
-from pysnmp.hlapi import *
 import re
-import nmap
 import ipaddress
 
 
 
 class CSVWriter:
-    def __init__(self, filename:str, header:list, data:list):
+
+    '''
+        Writes rows to a CSV file as they come, so the rows never have to be
+        held in memory all at once.
+
+        data can be any iterable, e.g. a generator reading a MAC address table.
+        Rows are written buffer_size at a time. With mode='a' the rows are
+        appended to an existing file, and the header is only written when the
+        file is new or empty. Files whose name ends in .gz, or any file with
+        compress=True, are written gzip compressed.
+
+        writer = CSVWriter('arp.csv.gz', header=['ip', 'mac'], data=arp_rows())
+        writer.write()
+
+        The writer can also be fed rows one at a time:
+
+        with CSVWriter('arp.csv', header=['ip', 'mac'], mode='a') as writer:
+            for device in devices:
+                writer.writerows(device.arp_rows())
+    '''
+
+    def __init__(self, filename:str, header:list, data=(), mode='w', buffer_size=1000, compress=None):
+        if mode not in ('w', 'a'):
+            raise ValueError(f"Invalid mode {mode!r}, expected 'w' or 'a'")
         self.filename = filename
         self.header = header
         self.data = data
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.compress = filename.endswith('.gz') if compress is None else compress
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._buffer = []
+
+    def _check_open(self):
+        if self._file is None:
+            raise ValueError(f'{self.filename} is not open, call open() or use the writer as a context manager')
+
+    def open(self):
+        new_file = self.mode == 'w' or not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        self.rows = 0
+        if self.compress:
+            self._file = gzip.open(self.filename, self.mode + 't', encoding='UTF8', newline='')
+        else:
+            self._file = open(self.filename, self.mode, encoding='UTF8', newline='')
+        self._writer = csv.writer(self._file)
+        if new_file and self.header:
+            self._writer.writerow(self.header)
+        return self
+
+    def writerow(self, row):
+        self._check_open()
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def writerows(self, rows):
+        self._check_open()
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, self.buffer_size - len(self._buffer)))
+            if not chunk:
+                return
+            self._buffer.extend(chunk)
+            self.rows += len(chunk)
+            if len(self._buffer) >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        self._check_open()
+        self._writer.writerows(self._buffer)
+        self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._file = None
+            self._writer = None
 
     def write(self):
-        with open(self.filename, 'w', encoding='UTF8', newline='') as f:
-            writer = csv.writer(f)
+        """
+        Writes the header and every row of data.
+
+        Returns:
+            int: The number of rows written, the header aside.
+        """
+        with self:
+            self.writerows(self.data)
+        return self.rows
 
-            # write the header
-            writer.writerow(self.header)
+    def __enter__(self):
+        return self.open()
 
-            # write the data
-            for row in self.data:
-                writer.writerow(row)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 
@@ -54,16 +133,39 @@ class XLSWriter:
         DARKGREEN = 'FF008000'
         YELLOW = 'FFFFFF00'
         DARKYELLOW = 'FF808000'
+
+        With write_only=True the workbook is streamed: rows are written out as
+        they are added, memory stays flat however many rows there are, and the
+        file is written once, by save(). Write-only workbooks always start
+        empty and can only be saved once.
     '''
 
-    def __init__(self, filename:str):
+    def __init__(self, filename:str, write_only=False):
+        from openpyxl import Workbook, load_workbook
         self.filename = filename
-        if not os.path.exists(self.filename):
+        self.write_only = write_only
+        self._styles = {}
+        # The last row written per sheet; sheet.max_row scans every cell.
+        self._last_rows = {}
+        if write_only:
+            self.wb = Workbook(write_only=True)
+        elif not os.path.exists(self.filename):
             self.wb = Workbook()
             self.wb.save(self.filename)
         else:
             self.wb = load_workbook(self.filename)
 
+    def _style(self, font_color=None, bold=False, italic=False):
+        # One named style per font, registered once and shared by every cell.
+        key = (font_color, bold, italic)
+        if key not in self._styles:
+            from openpyxl.styles import Font, NamedStyle
+            name = f"xls_writer_{font_color or 'default'}_{int(bold)}_{int(italic)}"
+            if name not in self.wb.named_styles:
+                self.wb.add_named_style(NamedStyle(name=name, font=Font(color=font_color, bold=bold, italic=italic)))
+            self._styles[key] = name
+        return self._styles[key]
+
     def add_sheet(self, sheetname:str):
         sheet = self.wb.create_sheet(sheetname)
         return sheet
@@ -71,17 +173,27 @@ class XLSWriter:
     def write_bulk_data(self, sheet, data:list):
         for row in data:
             sheet.append(row)
+        self._last_rows.pop(sheet.title, None)
 
     def write_single_row_data(self, sheetname, data, font_color=None, bold=False, italic=False):
         sheet = self.wb[sheetname]
-        row = sheet.max_row + 1
+        style = self._style(font_color, bold, italic)
+        if self.write_only:
+            from openpyxl.cell import WriteOnlyCell
+            cells = []
+            for value in data:
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.style = style
+                cells.append(cell)
+            sheet.append(cells)
+            return
+        if sheetname not in self._last_rows:
+            self._last_rows[sheetname] = sheet.max_row
+        self._last_rows[sheetname] += 1
+        row = self._last_rows[sheetname]
         for col, value in enumerate(data, start=1):
             cell = sheet.cell(row=row, column=col, value=value)
-            if font_color:
-                font = Font(color=font_color, bold=bold, italic=italic)
-                cell.font = font
-            else:
-                cell.font = Font(bold=bold, italic=italic)
+            cell.style = style
 
     def save(self):
         self.wb.save(self.filename)
@@ -97,7 +209,9 @@ class PDFCreator:
     x: The x-coordinate of the text.
     y: The y-coordinate of the text.
     text: The text to add to the page.
-    create_pdf(self): Creates the PDF file using the filename specified in the constructor and the pages added with add_page. The PDF file is created using the Reportlab library to generate the PDF content and the PyPDF2 library to merge the pages and write the output file.
+    create_pdf(self): Creates the PDF file using the filename specified in the constructor and the pages added with add_page. The PDF file is written by the Reportlab library straight to the file, one page per add_page.
+
+    For reports with tables and page breaks, use PDFReport.
     '''
     def __init__(self, filename):
         self.filename = filename
@@ -107,33 +221,245 @@ class PDFCreator:
         self.pages.append(page)
     
     def create_pdf(self):
-        packet = BytesIO()
-        # create a new PDF with Reportlab
-        can = canvas.Canvas(packet, pagesize=letter)
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+        can = canvas.Canvas(self.filename, pagesize=letter)
         for page in self.pages:
             can.drawString(page['x'], page['y'], page['text'])
+            can.showPage()
         can.save()
 
-        # move to the beginning of the StringIO buffer
-        packet.seek(0)
 
-        # create a new PDF with PyPDF2
-        new_pdf = PdfFileReader(packet)
-        output = PdfFileWriter()
+class PDFReport:
+
+    '''
+        A paginated PDF report of headings, text and tables, e.g. the test
+        results of a store.
+
+        Content is laid out as it is added and a new page is started whenever
+        the current one is full; a table split over pages repeats its header
+        row. Every finished page is handed to Reportlab right away, so only the
+        page being filled is kept as drawing state, and the file is written
+        once, by close(), without reading anything back.
+
+        with PDFReport('NER0502_store_test_results.pdf', title='NER0502') as report:
+            report.add_heading('NER0502X01')
+            report.add_table(['TEST', 'DEVICE RESPONSE', 'RESULT'], rows,
+                             col_widths=[200, 250, 60])
+
+        Rows can also be added one at a time, with start_table() and
+        add_row(). Rows are lists of cell values. A row can be given a text
+        color as (cells, color), with color an ARGB hex string like the
+        XLSWriter colors, e.g. 'FFFF0000'. Long cells are wrapped, and cut
+        after max_cell_lines lines.
+    '''
+
+    # Wrapped cell text, shared by every report of the process.
+    _LINES = {}
+
+    def __init__(self, filename:str, title=None, pagesize=None, margin=36, font_size=8, max_cell_lines=8):
+        from reportlab.lib.colors import HexColor
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+        self.filename = filename
+        self.title = title
+        self.pagesize = pagesize or A4
+        self.margin = margin
+        self.font_size = font_size
+        self.leading = font_size * 1.25
+        self.padding = 2
+        self.max_cell_lines = max_cell_lines
+        self.page_number = 0
+        self.canvas = canvas.Canvas(filename, pagesize=self.pagesize, pageCompression=1)
+        if title:
+            self.canvas.setTitle(title)
+        self._colors = {}
+        self._header_fill = HexColor('#D9D9D9')
+        self._table = None
+        self._new_page()
+
+    @property
+    def width(self):
+        return self.pagesize[0] - 2 * self.margin
+
+    def _new_page(self):
+        if self.page_number:
+            self.canvas.showPage()
+        self.page_number += 1
+        self.y = self.pagesize[1] - self.margin
+        self.canvas.setLineWidth(0.25)
+        self.canvas.setFont('Helvetica', self.font_size - 1)
+        footer = f'{self.title} - page {self.page_number}' if self.title else f'page {self.page_number}'
+        self.canvas.drawRightString(self.pagesize[0] - self.margin, self.margin / 2, footer)
+
+    def _fits(self, height):
+        if self.y - height < self.margin:
+            self._new_page()
+            return False
+        return True
+
+    def _color(self, argb):
+        from reportlab.lib.colors import HexColor
+        if argb not in self._colors:
+            self._colors[argb] = HexColor('#' + argb[-6:]) if argb else HexColor('#000000')
+        return self._colors[argb]
+
+    def page_break(self):
+        self.end_table()
+        self._new_page()
+
+    def add_heading(self, text, size=None):
+        self.end_table()
+        size = size or self.font_size + 4
+        self._fits(size * 2)
+        self.y -= size * 1.5
+        self.canvas.setFillColor(self._color(None))
+        self.canvas.setFont('Helvetica-Bold', size)
+        self.canvas.drawString(self.margin, self.y, str(text))
+        self.y -= size * 0.5
+
+    def add_text(self, text):
+        from reportlab.lib.utils import simpleSplit
+        self.end_table()
+        self.canvas.setFillColor(self._color(None))
+        for line in simpleSplit(str(text), 'Helvetica', self.font_size, self.width):
+            self._fits(self.leading)
+            self.y -= self.leading
+            self.canvas.setFont('Helvetica', self.font_size)
+            self.canvas.drawString(self.margin, self.y, line)
+
+    def _cell_lines(self, value, width, font):
+        text = str('' if value is None else value)
+        key = (text, width, font, self.font_size, self.max_cell_lines)
+        lines = self._LINES.get(key)
+        if lines is None:
+            # Test names and many responses are the same in every report.
+            if len(self._LINES) >= 4096:
+                self._LINES.clear()
+            lines = self._LINES[key] = self._split_lines(text, width - 2 * self.padding, font)
+        return lines
+
+    def _split_lines(self, text, width, font):
+        from reportlab.lib.utils import simpleSplit
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        limit = self.max_cell_lines
+        # No Helvetica character is narrower than 0.19 em, text past what
+        # `limit` lines can hold is cut before it is measured.
+        text = text[:int((limit + 1) * width / (0.19 * self.font_size))]
+        lines = []
+        for part in text.splitlines() or ['']:
+            for line in simpleSplit(part, font, self.font_size, width) or ['']:
+                if stringWidth(line, font, self.font_size) <= width:
+                    lines.append(line)
+                else:
+                    # simpleSplit only breaks at spaces, words wider than the
+                    # cell are broken where they reach its edge.
+                    while len(line) > 1 and stringWidth(line, font, self.font_size) > width:
+                        low, high = 1, len(line) - 1
+                        while low < high:
+                            middle = (low + high + 1) // 2
+                            if stringWidth(line[:middle], font, self.font_size) <= width:
+                                low = middle
+                            else:
+                                high = middle - 1
+                        lines.append(line[:low])
+                        line = line[low:]
+                    lines.append(line)
+                if len(lines) > limit:
+                    return lines[:limit - 1] + ['...']
+        return lines
+
+    def _wrap(self, cells, col_widths, font):
+        wrapped = [self._cell_lines(value, width, font) for value, width in zip(cells, col_widths)]
+        return wrapped, max(len(lines) for lines in wrapped) * self.leading + 2 * self.padding
+
+    def _draw_row(self, wrapped, height, col_widths, font, color, fill=None):
+        top = self.y
+        if fill is not None:
+            self.canvas.setFillColor(fill)
+            self.canvas.rect(self.margin, top - height, sum(col_widths), height, stroke=0, fill=1)
+        self.canvas.setFillColor(color)
+        self.canvas.setFont(font, self.font_size)
+        x = self.margin
+        for lines, width in zip(wrapped, col_widths):
+            self.canvas.rect(x, top - height, width, height, stroke=1, fill=0)
+            text = self.canvas.beginText(x + self.padding, top - self.padding - self.font_size)
+            text.setLeading(self.leading)
+            text.textLines(lines)
+            self.canvas.drawText(text)
+            x += width
+        self.y -= height
+
+    def start_table(self, header, col_widths=None):
+        """
+        Starts a table, whose rows are then added with add_row(). The table
+        ends with the next heading, text, page break or table.
+
+        Args:
+            header (list): The column titles, repeated on every page.
+            col_widths (List[float], optional): Column widths in points.
+                Defaults to None, which shares the page width equally.
+        """
+        self.end_table()
+        col_widths = col_widths or [self.width / len(header)] * len(header)
+        header, header_height = self._wrap(header, col_widths, 'Helvetica-Bold')
+        self._table = (header, header_height, col_widths)
+        self._fits(header_height * 2)
+        self._draw_row(header, header_height, col_widths, 'Helvetica-Bold', self._color(None), fill=self._header_fill)
+
+    def add_row(self, cells, color=None):
+        """
+        Adds a row to the current table, on a new page, under a repeated
+        header, if it does not fit on this one.
+        """
+        header, header_height, col_widths = self._table
+        wrapped, height = self._wrap(cells, col_widths, 'Helvetica')
+        if not self._fits(height):
+            self._draw_row(header, header_height, col_widths, 'Helvetica-Bold', self._color(None), fill=self._header_fill)
+        self._draw_row(wrapped, height, col_widths, 'Helvetica', self._color(color))
+
+    def end_table(self):
+        if self._table is not None:
+            self._table = None
+            self.y -= self.leading
+
+    def add_table(self, header, rows, col_widths=None):
+        """
+        Adds a table, breaking it over pages as needed.
+
+        Args:
+            header (list): The column titles, repeated on every page.
+            rows (Iterable): The rows, as lists of cell values or (cells, color).
+                Rows are drawn as they are read, so a generator is not
+                materialised.
+            col_widths (List[float], optional): Column widths in points.
+                Defaults to None, which shares the page width equally.
+        """
+        self.start_table(header, col_widths)
+        for row in rows:
+            cells, color = row if isinstance(row, tuple) else (row, None)
+            self.add_row(cells, color)
+        self.end_table()
 
-        # add the pages of the new PDF to the output PDF
-        for i in range(new_pdf.getNumPages()):
-            output.addPage(new_pdf.getPage(i))
+    def close(self):
+        if self.canvas is None:
+            return
+        self.canvas.save()
+        self.canvas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        # write the output PDF to a file
-        with open(self.filename, 'wb') as f:
-            output.write(f)
 
 class JsonToYamlConverter:
     def __init__(self, json_data):
         self.json_data = json_data
     
     def convert(self):
+        import yaml
         try:
             yaml_data = yaml.dump(json.loads(self.json_data), default_flow_style=False)
             return yaml_data
@@ -149,8 +475,9 @@ class JsonToCsvConverter:
             # Load the JSON data
             data = json.loads(self.json_data)
             
-            # Get the fieldnames from the first row of the JSON data
-            fieldnames = list(data[0].keys())
+            # Get the fieldnames from every row of the JSON data, rows may
+            # not all have the same keys
+            fieldnames = list(dict.fromkeys(key for row in data for key in row))
             
             # Write the data to the CSV file
             with open(csv_file_path, 'w', newline='') as csv_file:
@@ -165,6 +492,178 @@ class JsonToCsvConverter:
             print("Error converting JSON to CSV:", e)
 
 
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JsonReader:
+    """
+    Reads JSON values one at a time from a file, holding only the value being
+    read and the rest of the current chunk in memory.
+    """
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _read(self, size=None):
+        chunk = self.file.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character, '' at the end.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                return ''
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r}, found {character or 'the end of the file'!r}")
+        self.pos += 1
+        return character
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value goes on in the next chunk. Large values double the
+                # read, so they are not decoded again for every chunk.
+                if self._read(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    continue
+                raise
+            # A number or literal at the end of the buffer may go on too.
+            if end == len(self.buffer) and not self.eof and self._read():
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_json_records(path, key=None, chunk_size=1 << 20):
+    """
+    Yields the records of a JSON file one at a time, without loading the
+    whole file.
+
+    Args:
+        path (str): A JSON array, JSON lines (one value per line), or an
+            object holding the array under `key`, like the DNAC
+            {"response": [...]} and NetBox {"results": [...]} replies. Files
+            ending in .gz are read as gzip.
+        key (str, optional): The key of the array when the file holds an
+            object. Defaults to None, which yields the object itself.
+        chunk_size (int, optional): Characters read at a time. Defaults to 1M.
+
+    Raises:
+        ValueError: If the file is not valid JSON, or has no `key` array.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='UTF8') as f:
+        reader = _JsonReader(f, chunk_size)
+        first = reader.peek()
+        if first == '[':
+            yield from reader.array()
+        elif first == '{' and key is not None:
+            reader.expect('{')
+            while reader.peek() != '}':
+                name = reader.decode()
+                reader.expect(':')
+                if name == key and reader.peek() == '[':
+                    yield from reader.array()
+                    return
+                # The other values are read, and dropped, one at a time.
+                reader.decode()
+                if reader.expect(',}') == '}':
+                    break
+            raise ValueError(f"No {key!r} array in {path}")
+        else:
+            while reader.peek():
+                yield reader.decode()
+
+
+class JsonStreamToCsvConverter:
+
+    '''
+        Converts a JSON file of records to CSV in constant memory, however
+        big the file. See iter_json_records() for the JSON layouts read.
+
+        The columns are the fieldnames given, records keys that are not in
+        them are left out; without fieldnames the file is read twice, the
+        first pass collects every key of every record, in the order they
+        are first seen. Nested values are written as JSON, missing ones as
+        empty cells.
+
+        converter = JsonStreamToCsvConverter('netbox_devices.json', key='results')
+        rows = converter.convert('netbox_devices.csv.gz')
+    '''
+
+    def __init__(self, json_file_path, fieldnames=None, key=None, chunk_size=1 << 20):
+        self.json_file_path = json_file_path
+        self.fieldnames = fieldnames
+        self.key = key
+        self.chunk_size = chunk_size
+
+    def records(self):
+        for index, record in enumerate(iter_json_records(self.json_file_path, self.key, self.chunk_size)):
+            if not isinstance(record, dict):
+                raise ValueError(f"Record {index} of {self.json_file_path} is not an object: {record!r:.80}")
+            yield record
+
+    def discover_fieldnames(self):
+        """
+        Returns every key of every record, in the order they are first seen.
+        """
+        fieldnames = {}
+        for record in self.records():
+            for name in record:
+                if name not in fieldnames:
+                    fieldnames[name] = None
+        return list(fieldnames)
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        return value
+
+    def convert(self, csv_file_path, buffer_size=1000):
+        """
+        Writes the CSV file, gzip compressed if its name ends in .gz.
+
+        Returns:
+            int: The number of records written.
+        """
+        fieldnames = self.fieldnames or self.discover_fieldnames()
+        rows = ([self._cell(record.get(name)) for name in fieldnames] for record in self.records())
+        return CSVWriter(csv_file_path, fieldnames, rows, buffer_size=buffer_size).write()
+
+
 class CsvToJsonConverter:
     def __init__(self, csv_file_path):
         self.csv_file_path = csv_file_path
@@ -178,23 +677,21 @@ class CsvToJsonConverter:
 
 
 class PingDevice:
-    def __init__(self, host):
+    def __init__(self, host, timeout=2, retries=1):
         self.host = host
+        self.timeout = timeout
+        self.retries = retries
 
     def ping(self):
-        try:
-            output = subprocess.check_output(["ping", "-c", "1", self.host])
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        # Use reachability.ReachabilitySweep directly to check many hosts at once.
+        from reachability import ReachabilitySweep
+        sweep = ReachabilitySweep(methods=('icmp',), timeout=self.timeout, retries=self.retries)
+        return sweep.sweep([self.host])[self.host].reachable
 
 
 
 
 class NTPClient:
-    import ntplib
-    from datetime import datetime
-    import pytz
   
     """
         Gets the current time from the NTP server and converts it to the specified timezone.
@@ -221,6 +718,8 @@ class NTPClient:
         self.server = server
         
     def get_time(self, timezone='CET'):
+        import ntplib
+        import pytz
         ntp_client = ntplib.NTPClient()
         response = ntp_client.request(self.server)
         utc_time = datetime.utcfromtimestamp(response.tx_time)
@@ -295,6 +794,8 @@ class SNMPQuery:
         self.priv_key = priv_key
 
     def get_vendor(self):
+        from pysnmp.hlapi import (getCmd, SnmpEngine, CommunityData, UsmUserData, UdpTransportTarget, ContextData,
+                                  ObjectType, ObjectIdentity, usmHMACSHAAuthProtocol, usmAesCfb128Protocol)
         if self.community:
             snmp_query = getCmd(
                 SnmpEngine(),
@@ -331,6 +832,7 @@ class SNMPQuery:
 
 class NmapScanner:
     def __init__(self, target):
+        import nmap
         self.target = target
         self.nm = nmap.PortScanner()
 